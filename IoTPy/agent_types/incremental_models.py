@@ -0,0 +1,338 @@
+"""
+This module has models that are fitted incrementally to the rows
+of a StreamArray, one batch of rows at a time, and an agent,
+model_map, that updates a model with each new segment of a stream
+and outputs a function of the model and the segment, e.g. the
+projections of the rows on the principal components, or the
+clusters of the rows. A model keeps sufficient statistics of the
+rows that it has seen rather than the rows, and so the cost of
+updating a model with a batch depends on the size of the batch but
+not on the number of rows seen earlier.
+
+Models in the module:
+   1. IncrementalPCA: principal components from the running mean
+      and scatter matrix of the rows.
+   2. MiniBatchKMeans: cluster centers updated with each batch
+      (Sculley, Web-scale k-means clustering).
+
+The models have the methods update(X) and copy(), and so they are
+also used with sketch_agent (see sketches.py) to output snapshots
+of the model, e.g. lambda model: model.copy(), each time that
+window_size rows have arrived. IncrementalPCA is also mergeable.
+
+Agents in the module:
+   1. model_map
+
+In addition functions that return streams are:
+   model_map_f
+
+"""
+import numpy as np
+
+from ..core.stream import StreamArray
+from ..core.agent import Agent
+# stream, agent are in ../core
+from .check_agent_parameter_types import *
+from .sketches import check_same_parameters
+
+class IncrementalPCA(object):
+    """
+    Principal component analysis of the rows seen so far.
+
+    Parameters
+    ----------
+    n_components: int
+       The number of principal components.
+    refresh_size: int, optional
+       The components are computed, by an eigendecomposition of the
+       covariance matrix, when they are used after at least
+       refresh_size rows have arrived since they were last
+       computed. The default, 1, computes the components whenever
+       the model has changed.
+
+    Notes
+    -----
+    Memory: the mean and the scatter matrix, i.e. (d + d*d) numbers
+    for rows with d features.
+    Cost: update(X) is O(len(X)*d*d); computing the components is
+    O(d*d*d).
+
+    """
+    def __init__(self, n_components, refresh_size=1):
+        assert n_components > 0 and refresh_size > 0
+        self.n_components = n_components
+        self.refresh_size = refresh_size
+        self.count = 0
+        self.mean = None
+        # scatter is the sum over rows x of outer(x - mean, x - mean).
+        self.scatter = None
+        self._components = None
+        self._variances = None
+        self.count_at_refresh = 0
+
+    def __repr__(self):
+        return 'IncrementalPCA(n_components={0})'.format(self.n_components)
+
+    def update(self, X):
+        X = np.asarray(X, dtype=float)
+        if len(X) == 0:
+            return
+        X = X.reshape(len(X), -1)
+        batch_mean = X.mean(axis=0)
+        centered = X - batch_mean
+        self.merge_statistics(len(X), batch_mean, centered.T.dot(centered))
+
+    def merge_statistics(self, count, mean, scatter):
+        # The scatter matrices of two sets of rows are combined as
+        # the variances are by Chan, Golub and LeVeque.
+        if self.count == 0:
+            assert mean.shape[0] >= self.n_components, \
+              'IncrementalPCA: n_components is more than the number of features'
+            self.count, self.mean, self.scatter = count, mean.copy(), scatter.copy()
+            return
+        total = self.count + count
+        delta = mean - self.mean
+        self.scatter += scatter + np.outer(delta, delta) * (
+            self.count * float(count) / total)
+        self.mean += delta * (float(count) / total)
+        self.count = total
+
+    def merge(self, other):
+        check_same_parameters(self, other, ['n_components'])
+        if other.count > 0:
+            self.merge_statistics(other.count, other.mean, other.scatter)
+        return self
+
+    def refresh(self):
+        assert self.count > 0, 'IncrementalPCA has not seen any rows'
+        if self._components is not None and \
+          self.count - self.count_at_refresh < self.refresh_size:
+            return
+        eigenvalues, eigenvectors = np.linalg.eigh(self.scatter)
+        order = np.argsort(eigenvalues)[::-1][:self.n_components]
+        components = eigenvectors[:, order].T
+        # The sign of each component is chosen so that its largest
+        # entry, in absolute value, is positive.
+        largest = np.argmax(np.abs(components), axis=1)
+        signs = np.sign(components[np.arange(len(components)), largest])
+        self._components = components * signs[:, np.newaxis]
+        self._variances = np.maximum(eigenvalues[order], 0) / max(
+            self.count - 1, 1)
+        self.count_at_refresh = self.count
+
+    @property
+    def components(self):
+        """
+        An array with one principal component, a unit vector, per
+        row, in decreasing order of variance.
+
+        """
+        self.refresh()
+        return self._components
+
+    @property
+    def explained_variance(self):
+        self.refresh()
+        return self._variances
+
+    @property
+    def covariance(self):
+        return self.scatter / max(self.count - 1, 1)
+
+    def transform(self, X):
+        """
+        Returns the projections of the rows of X on the components.
+
+        """
+        X = np.asarray(X, dtype=float)
+        return (X.reshape(len(X), -1) - self.mean).dot(self.components.T)
+
+    def copy(self):
+        pca = IncrementalPCA(self.n_components, self.refresh_size)
+        if self.count > 0:
+            pca.merge(self)
+        return pca
+
+    @property
+    def memory(self):
+        return 0 if self.count == 0 else self.mean.nbytes + self.scatter.nbytes
+
+
+class MiniBatchKMeans(object):
+    """
+    k-means clustering updated with each batch of rows. Each row of
+    a batch is assigned to its nearest center, and then each center
+    moves to the mean of all the rows that have been assigned to it.
+
+    Parameters
+    ----------
+    n_clusters: int
+    init_size: int, optional
+       The centers are initialized, by k-means++, from the first
+       init_size rows. The default is 3*n_clusters.
+    seed: int, optional
+       The seed of the random choices of k-means++.
+
+    Notes
+    -----
+    Memory: the centers and their counts.
+    Cost: update(X) and predict(X) are O(len(X)*n_clusters*d) for
+    rows with d features.
+
+    """
+    def __init__(self, n_clusters, init_size=None, seed=0):
+        assert n_clusters > 0
+        self.n_clusters = n_clusters
+        self.init_size = init_size or 3*n_clusters
+        assert self.init_size >= n_clusters
+        self.seed = seed
+        self.random = np.random.RandomState(seed)
+        self.count = 0
+        self.centers = None
+        # counts[j] is the number of rows assigned to center j.
+        self.counts = None
+        # The rows seen before the centers are initialized.
+        self.init_rows = []
+
+    def __repr__(self):
+        return 'MiniBatchKMeans(n_clusters={0})'.format(self.n_clusters)
+
+    @property
+    def min_samples(self):
+        return self.init_size
+
+    def update(self, X):
+        X = np.asarray(X, dtype=float)
+        if len(X) == 0:
+            return
+        X = X.reshape(len(X), -1)
+        self.count += len(X)
+        if self.centers is None:
+            self.init_rows.append(X)
+            if self.count < self.init_size:
+                return
+            X = np.concatenate(self.init_rows)
+            self.init_rows = []
+            self.initialize(X)
+        labels = self.predict(X)
+        batch_counts = np.bincount(labels, minlength=self.n_clusters)
+        batch_sums = np.zeros_like(self.centers)
+        np.add.at(batch_sums, labels, X)
+        self.counts += batch_counts
+        # Each center is the mean of the rows assigned to it.
+        changed = batch_counts > 0
+        self.centers[changed] += (
+            batch_sums[changed] -
+            batch_counts[changed, np.newaxis] * self.centers[changed]) / \
+            self.counts[changed, np.newaxis]
+
+    def initialize(self, X):
+        # k-means++: each center is a row chosen with probability
+        # proportional to its squared distance to the nearest
+        # center chosen so far.
+        centers = [X[self.random.randint(len(X))]]
+        distances = ((X - centers[0])**2).sum(axis=1)
+        for _ in range(1, self.n_clusters):
+            total = distances.sum()
+            if total > 0:
+                index = self.random.choice(len(X), p=distances/total)
+            else:
+                index = self.random.randint(len(X))
+            centers.append(X[index])
+            distances = np.minimum(distances, ((X - X[index])**2).sum(axis=1))
+        self.centers = np.array(centers)
+        self.counts = np.zeros(self.n_clusters, dtype=np.int64)
+
+    def distances(self, X):
+        """
+        Returns the squared distances of the rows of X to the
+        centers, one row per row of X.
+
+        """
+        assert self.centers is not None, \
+          'MiniBatchKMeans has seen fewer than init_size rows'
+        X = np.asarray(X, dtype=float)
+        X = X.reshape(len(X), -1)
+        return np.maximum(
+            (X**2).sum(axis=1)[:, np.newaxis] - 2*X.dot(self.centers.T) +
+            (self.centers**2).sum(axis=1), 0)
+
+    def predict(self, X):
+        """
+        Returns the index of the nearest center of each row of X.
+
+        """
+        return np.argmin(self.distances(X), axis=1)
+
+    def copy(self):
+        kmeans = MiniBatchKMeans(self.n_clusters, self.init_size, self.seed)
+        kmeans.random.set_state(self.random.get_state())
+        kmeans.count = self.count
+        if self.centers is not None:
+            kmeans.centers = self.centers.copy()
+            kmeans.counts = self.counts.copy()
+        kmeans.init_rows = list(self.init_rows)
+        return kmeans
+
+    @property
+    def memory(self):
+        return 0 if self.centers is None else \
+          self.centers.nbytes + self.counts.nbytes
+
+
+def model_map(model, func, in_stream, out_stream, call_streams=None,
+              name=None):
+    """
+    Parameters
+    ----------
+        model: object
+           A model, such as IncrementalPCA, with a method update(X).
+        func: function
+           func(model, X) returns the output for the rows X, one
+           element of out_stream per row, e.g.
+           lambda model, X: model.transform(X) or
+           lambda model, X: model.predict(X).
+        in_stream: StreamArray
+           A StreamArray with one row per element.
+        out_stream: StreamArray
+        call_streams: list of Stream
+           The list of call_streams. A new value in any stream in this
+           list causes a state transition of this agent.
+        name: Str
+           Name of the agent created by this function.
+    Returns
+    -------
+        Agent.
+         The agent created by this function.
+    Notes
+    -----
+        Each transition updates the model with all the new rows of
+        in_stream, and then outputs func(model, rows). If the model
+        has attributes min_samples and count, as MiniBatchKMeans
+        does, then the agent waits until min_samples rows have
+        arrived.
+
+    """
+    check_stream_type(name, 'in_stream', in_stream)
+    check_stream_type(name, 'out_stream', out_stream)
+    assert isinstance(in_stream, StreamArray), \
+      'In agent {0}, in_stream must be a StreamArray'.format(name)
+    min_samples = getattr(model, 'min_samples', None)
+
+    def transition(in_lists, state):
+        in_list = in_lists[0]
+        X = in_list.list[in_list.start:in_list.stop]
+        if len(X) == 0 or (min_samples is not None and
+                           model.count + len(X) < min_samples):
+            return ([[]], state, [in_list.start])
+        model.update(X)
+        return ([func(model, X)], state, [in_list.stop])
+
+    return Agent([in_stream], [out_stream], transition, None,
+                 call_streams, name)
+
+def model_map_f(model, func, in_stream, dimension=0, dtype=float):
+    out_stream = StreamArray('model_map:' + in_stream.name,
+                             dimension=dimension, dtype=dtype)
+    model_map(model, func, in_stream, out_stream)
+    return out_stream
@@ -0,0 +1,287 @@
+"""
+This module has sketches of the distribution of the values of a
+stream: estimates of quantiles, such as the median (p50) and p99 of
+latencies, and histograms. The sketches are stored in NumPy arrays
+and are updated with a whole segment of a stream at a time.
+
+Sketches in the module:
+   1. KLLSketch: quantiles with bounded rank error in memory that
+      grows only with the logarithm of the length of the stream.
+   2. Histogram: counts of values in fixed bins, with linear or
+      logarithmic bin edges.
+
+The sketches have the same interface as the sketches in
+sketches.py: update(values), merge(other) and copy(). So, they are
+used with sketch_agent for quantiles over a whole stream, with
+sketch_window for quantiles over sliding windows, and they are
+merged across the processes of a multicore application. A
+Histogram is also subtractable, and so sketch_window keeps the
+histogram of a window up to date rather than merging its panes.
+
+"""
+import math
+
+import numpy as np
+
+from .sketches import check_same_parameters
+
+class KLLSketch(object):
+    """
+    The KLL quantile sketch (Karnin, Lang and Liberty). The sketch
+    has a hierarchy of compactors; an item at level h stands for
+    2**h values of the stream. When a level is full, it is sorted
+    and every other item, starting at a random offset, is moved to
+    the next level.
+
+    Parameters
+    ----------
+    k: int
+       The capacity of the top level. Larger k is more accurate.
+    seed: int, optional
+       The seed of the random offsets of compactions.
+
+    Notes
+    -----
+    Memory: about 3*k values (8 bytes each) plus O(log(n/k)) for a
+    stream of n values.
+    Error: the rank of quantile(q) is within about (3.3/k)*n of q*n
+    with probability 0.99; e.g. 1.65% of n for k=200.
+
+    """
+    def __init__(self, k=200, seed=0):
+        assert k >= 8
+        self.k = k
+        self.seed = seed
+        self.random = np.random.RandomState(seed)
+        self.levels = [np.zeros(0)]
+        self.count = 0
+        self.min_value = np.inf
+        self.max_value = -np.inf
+
+    def __repr__(self):
+        return 'KLLSketch(k={0}, seed={1})'.format(self.k, self.seed)
+
+    def capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(2, int(math.ceil(self.k * (2.0/3.0)**depth)))
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float).ravel()
+        if len(values) == 0:
+            return
+        self.levels[0] = np.concatenate((self.levels[0], values))
+        self.count += len(values)
+        self.min_value = min(self.min_value, values.min())
+        self.max_value = max(self.max_value, values.max())
+        self.compress()
+
+    def compress(self):
+        level = 0
+        while level < len(self.levels):
+            if len(self.levels[level]) > self.capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.zeros(0))
+                items = np.sort(self.levels[level])
+                # An item is left at this level if the number of items
+                # is odd.
+                num_kept = len(items) % 2
+                offset = self.random.randint(2)
+                self.levels[level+1] = np.concatenate(
+                    (self.levels[level+1],
+                     items[num_kept + offset::2]))
+                self.levels[level] = items[:num_kept]
+            level += 1
+
+    def sorted_values_and_ranks(self):
+        """
+        Returns the values in the sketch in increasing order, and
+        the cumulative weights of the values.
+
+        """
+        values = np.concatenate(self.levels)
+        weights = np.concatenate(
+            [np.full(len(items), 2**level, dtype=np.int64)
+             for level, items in enumerate(self.levels)])
+        order = np.argsort(values, kind='stable')
+        return values[order], np.cumsum(weights[order])
+
+    def quantiles(self, qs):
+        """
+        Returns an array of the estimates of the quantiles qs, where
+        each q in qs is in [0, 1].
+
+        """
+        assert self.count > 0, 'quantiles of an empty KLLSketch'
+        qs = np.asarray(qs, dtype=float)
+        values, ranks = self.sorted_values_and_ranks()
+        indices = np.searchsorted(ranks, qs * ranks[-1], side='left')
+        result = values[np.minimum(indices, len(values) - 1)]
+        result = np.where(qs <= 0, self.min_value, result)
+        return np.where(qs >= 1, self.max_value, result)
+
+    def quantile(self, q):
+        return float(self.quantiles([q])[0])
+
+    def rank(self, value):
+        """
+        Returns the estimate of the fraction of values that are at
+        most value.
+
+        """
+        values, ranks = self.sorted_values_and_ranks()
+        index = np.searchsorted(values, value, side='right')
+        return 0.0 if index == 0 else ranks[index-1] / float(ranks[-1])
+
+    def merge(self, other):
+        check_same_parameters(self, other, ['k'])
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.zeros(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate((self.levels[level], items))
+        self.count += other.count
+        self.min_value = min(self.min_value, other.min_value)
+        self.max_value = max(self.max_value, other.max_value)
+        self.compress()
+        return self
+
+    def copy(self):
+        sketch = KLLSketch(self.k, self.seed)
+        sketch.random.set_state(self.random.get_state())
+        sketch.levels = [items.copy() for items in self.levels]
+        sketch.count = self.count
+        sketch.min_value = self.min_value
+        sketch.max_value = self.max_value
+        return sketch
+
+    @property
+    def memory(self):
+        return sum(items.nbytes for items in self.levels)
+
+
+class Histogram(object):
+    """
+    Counts of values in bins. Bin i, for 0 < i < len(bin_edges), has
+    the values in [bin_edges[i-1], bin_edges[i]). Bin 0 has the
+    values less than bin_edges[0], and the last bin has the values
+    at least bin_edges[-1].
+
+    Parameters
+    ----------
+    bin_edges: list or array
+       An increasing sequence of numbers. See also linear() and
+       logarithmic().
+
+    Notes
+    -----
+    Memory: 8*(len(bin_edges) + 1) bytes for the counts.
+    Error: quantile(q) is in the bin that has the q-th quantile, and
+    so its error is at most the width of the bin; the relative error
+    of logarithmic bins is at most (high/low)**(1/num_bins) - 1.
+
+    """
+    def __init__(self, bin_edges):
+        self.bin_edges = np.asarray(bin_edges, dtype=float)
+        assert self.bin_edges.ndim == 1 and len(self.bin_edges) > 1 and \
+          np.all(np.diff(self.bin_edges) > 0), \
+          'bin_edges of a Histogram must be increasing'
+        self.counts = np.zeros(len(self.bin_edges) + 1, dtype=np.int64)
+
+    @classmethod
+    def linear(cls, low, high, num_bins):
+        return cls(np.linspace(low, high, num_bins + 1))
+
+    @classmethod
+    def logarithmic(cls, low, high, num_bins):
+        """
+        Returns a histogram with bins whose edges are in geometric
+        progression from low to high, e.g. for latencies.
+
+        """
+        assert 0 < low < high
+        return cls(np.geomspace(low, high, num_bins + 1))
+
+    def __repr__(self):
+        return 'Histogram({0} bins from {1} to {2})'.format(
+            len(self.bin_edges) - 1, self.bin_edges[0], self.bin_edges[-1])
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float).ravel()
+        if len(values) == 0:
+            return
+        self.counts += np.bincount(
+            np.searchsorted(self.bin_edges, values, side='right'),
+            minlength=len(self.counts))
+
+    @property
+    def total(self):
+        return int(self.counts.sum())
+
+    def quantiles(self, qs):
+        """
+        Returns an array of the estimates of the quantiles qs, where
+        each q in qs is in [0, 1]. The estimate is interpolated
+        linearly in the bin that has the quantile. Values less than
+        bin_edges[0], or at least bin_edges[-1], are estimated as the
+        edge.
+
+        """
+        total = self.total
+        assert total > 0, 'quantiles of an empty Histogram'
+        qs = np.asarray(qs, dtype=float)
+        cumulative = np.cumsum(self.counts)
+        target = qs * total
+        bins = np.minimum(np.searchsorted(cumulative, target, side='left'),
+                          len(self.counts) - 1)
+        # Edges of the bins, with the underflow and overflow bins
+        # collapsed to the first and last edges.
+        edges = np.concatenate(([self.bin_edges[0]], self.bin_edges,
+                                [self.bin_edges[-1]]))
+        low, high = edges[bins], edges[bins + 1]
+        before = np.where(bins > 0, cumulative[bins - 1], 0)
+        fraction = (target - before) / np.maximum(self.counts[bins], 1)
+        return low + np.clip(fraction, 0, 1) * (high - low)
+
+    def quantile(self, q):
+        return float(self.quantiles([q])[0])
+
+    def check_same_bins(self, other):
+        assert type(self) is type(other) and (
+            self.bin_edges is other.bin_edges or
+            np.array_equal(self.bin_edges, other.bin_edges)), \
+          'Cannot merge histograms with different bins: {0} and {1}'.format(
+              self, other)
+
+    def merge(self, other):
+        self.check_same_bins(other)
+        self.counts += other.counts
+        return self
+
+    def subtract(self, other):
+        """
+        Removes the values counted by other, which must have been
+        counted by this histogram.
+
+        """
+        self.check_same_bins(other)
+        self.counts -= other.counts
+        return self
+
+    def empty(self):
+        """
+        Returns a histogram with the same bins and no values. The
+        histograms share bin_edges.
+
+        """
+        histogram = Histogram.__new__(Histogram)
+        histogram.bin_edges = self.bin_edges
+        histogram.counts = np.zeros_like(self.counts)
+        return histogram
+
+    def copy(self):
+        histogram = self.empty()
+        histogram.counts[:] = self.counts
+        return histogram
+
+    @property
+    def memory(self):
+        return self.counts.nbytes
@@ -0,0 +1,157 @@
+"""
+This module has agents that filter StreamArrays with FIR and IIR
+filters, e.g. filters designed with scipy.signal.butter or
+scipy.signal.firwin. A transition filters the whole new slice of
+the input stream with a single call, and the state of the filter
+(the delay line) is carried from one transition to the next. So,
+the output stream is the same as the output of filtering the
+entire input stream offline, e.g. with scipy.signal.lfilter.
+
+The input stream is a StreamArray with dimension 0 (one channel) or
+a positive dimension (one column per channel); the channels are
+filtered independently with the same filter.
+
+Agents in the module:
+   1. fir_filter
+   2. iir_filter
+   3. sos_filter
+
+In addition functions that return streams are:
+   fir_filter_f
+   iir_filter_f
+   sos_filter_f
+
+iir_filter and sos_filter require scipy. fir_filter uses
+scipy.signal.lfilter if scipy is installed and np.convolve
+otherwise.
+
+"""
+import numpy as np
+# scipy is required only for IIR and SOS filters.
+try:
+    import scipy.signal
+except ImportError:
+    scipy = None
+
+from ..core.stream import StreamArray
+from ..core.agent import Agent
+# stream, agent are in ../core
+from .check_agent_parameter_types import *
+
+def filter_agent(filter_slice, in_stream, out_stream, call_streams, name):
+    """
+    Returns an agent that puts filter_slice(x, state) into
+    out_stream for each new slice x of in_stream, where
+    filter_slice returns the filtered slice and the new state. The
+    state is None in the first transition.
+
+    """
+    check_stream_type(name, 'in_stream', in_stream)
+    check_stream_type(name, 'out_stream', out_stream)
+    assert isinstance(in_stream, StreamArray), \
+      'In agent {0}, in_stream must be a StreamArray'.format(name)
+
+    def transition(in_lists, state):
+        in_list = in_lists[0]
+        x = in_list.list[in_list.start:in_list.stop]
+        if len(x) == 0:
+            return ([x], state, [in_list.start])
+        y, state = filter_slice(x, state)
+        return ([y], state, [in_list.stop])
+
+    return Agent([in_stream], [out_stream], transition, None,
+                 call_streams, name)
+
+def fir_filter(in_stream, out_stream, b, call_streams=None, name=None):
+    """
+    Parameters
+    ----------
+        in_stream: StreamArray
+        out_stream: StreamArray
+           out_stream[n] = sum over k of b[k]*in_stream[n-k], where
+           in_stream[j] is 0 for j < 0.
+        b: list or array
+           The coefficients of the FIR filter.
+        call_streams: list of Stream
+           The list of call_streams. A new value in any stream in this
+           list causes a state transition of this agent.
+        name: Str
+           Name of the agent created by this function.
+    Returns
+    -------
+        Agent.
+         The agent created by this function.
+
+    """
+    b = np.asarray(b, dtype=float)
+    if scipy is not None:
+        return iir_filter(in_stream, out_stream, b, [1.0], call_streams, name)
+
+    # Without scipy, the state is the last len(b)-1 inputs.
+    def filter_slice(x, history):
+        if history is None:
+            history = np.zeros((len(b) - 1,) + x.shape[1:])
+        extended_x = np.concatenate((history, x))
+        if x.ndim == 1:
+            y = np.convolve(extended_x, b, mode='valid')
+        else:
+            y = np.column_stack(
+                [np.convolve(extended_x[:, j], b, mode='valid')
+                 for j in range(x.shape[1])])
+        return y, extended_x[len(extended_x) - len(history):]
+    return filter_agent(filter_slice, in_stream, out_stream, call_streams, name)
+
+def iir_filter(in_stream, out_stream, b, a, call_streams=None, name=None):
+    """
+    Same as fir_filter except that the filter is the IIR filter with
+    numerator b and denominator a; out_stream is the same as
+    scipy.signal.lfilter(b, a, in_stream, axis=0).
+
+    """
+    assert scipy is not None, 'iir_filter requires scipy'
+    b = np.asarray(b, dtype=float)
+    a = np.asarray(a, dtype=float)
+    order = max(len(a), len(b)) - 1
+
+    # The state is the delay line, zi, of lfilter.
+    def filter_slice(x, zi):
+        if zi is None:
+            zi = np.zeros((order,) + x.shape[1:])
+        return scipy.signal.lfilter(b, a, x, axis=0, zi=zi)
+    return filter_agent(filter_slice, in_stream, out_stream, call_streams, name)
+
+def sos_filter(in_stream, out_stream, sos, call_streams=None, name=None):
+    """
+    Same as fir_filter except that the filter is a cascade of
+    second-order sections, e.g. from
+    scipy.signal.butter(..., output='sos'); out_stream is the same
+    as scipy.signal.sosfilt(sos, in_stream, axis=0). Second-order
+    sections are more accurate than iir_filter for high orders.
+
+    """
+    assert scipy is not None, 'sos_filter requires scipy'
+    sos = np.asarray(sos, dtype=float)
+
+    def filter_slice(x, zi):
+        if zi is None:
+            zi = np.zeros((len(sos), 2) + x.shape[1:])
+        return scipy.signal.sosfilt(sos, x, axis=0, zi=zi)
+    return filter_agent(filter_slice, in_stream, out_stream, call_streams, name)
+
+def fir_filter_f(in_stream, b):
+    out_stream = StreamArray('fir:' + in_stream.name,
+                             dimension=in_stream.dimension, dtype=float)
+    fir_filter(in_stream, out_stream, b)
+    return out_stream
+
+def iir_filter_f(in_stream, b, a):
+    out_stream = StreamArray('iir:' + in_stream.name,
+                             dimension=in_stream.dimension, dtype=float)
+    iir_filter(in_stream, out_stream, b, a)
+    return out_stream
+
+def sos_filter_f(in_stream, sos):
+    out_stream = StreamArray('sos:' + in_stream.name,
+                             dimension=in_stream.dimension, dtype=float)
+    sos_filter(in_stream, out_stream, sos)
+    return out_stream
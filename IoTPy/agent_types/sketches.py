@@ -0,0 +1,631 @@
+"""
+This module has streaming sketches that are stored in NumPy arrays,
+and an agent, sketch_agent, that updates a sketch with the elements
+of a stream. A sketch is updated with a whole segment of a stream
+(a list or an array) at a time: the elements of the segment are
+hashed, and the sketch is updated, by NumPy operations on arrays
+rather than by a Python loop over the elements.
+
+Sketches in the module:
+   1. CountMinSketch: estimates of the number of occurrences of
+      each item.
+   2. HyperLogLog: an estimate of the number of distinct items.
+   3. BloomFilter: membership tests with false positives but no
+      false negatives.
+   4. MisraGries: the heavy hitters, i.e. the frequent items, and
+      estimates of their number of occurrences.
+
+Each sketch has the methods update(items), merge(other) and copy().
+Sketches are mergeable: if sketch_1 summarizes stream x and sketch_2
+summarizes stream y, and the sketches have the same parameters
+(including seed), then sketch_1.merge(sketch_2) summarizes x and y.
+So, a sketch can be computed in each process of a multicore
+application, and the sketches can be sent on a stream (sketches
+are pickled), and merged in a single process.
+
+sketch_window summarizes sliding windows of a stream. A window is
+a sequence of panes of step_size elements; the sketch of a window
+is the merge of the sketches of its panes. See also quantiles.py
+for sketches of quantiles and histograms.
+
+Hashes of items are computed by hash_items(). Hashes are the same
+in all processes (unlike the hash() of strings in Python), and so
+the sketches of different processes can be merged.
+
+Each sketch states its memory, in bytes, and its error bound.
+
+"""
+import collections
+import hashlib
+import math
+
+import numpy as np
+
+from ..core.stream import Stream
+from ..core.agent import Agent
+# stream, agent are in ../core
+from .check_agent_parameter_types import *
+
+#------------------------------------------------------------------
+#                     HASHING
+#------------------------------------------------------------------
+def splitmix64(keys):
+    """
+    Returns the SplitMix64 mixes of keys, an array of uint64.
+
+    """
+    z = keys + np.uint64(0x9E3779B97F4A7C15)
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return z ^ (z >> np.uint64(31))
+
+def hash_items(items, seed=0):
+    """
+    Returns an array of uint64: the 64-bit hashes of items, a list
+    or a 1-D array.
+
+    Numbers and strings are hashed with NumPy operations. Other
+    items, such as tuples, are hashed, one at a time, from their
+    repr(). An int and a float with the same value, e.g. 5 and 5.0,
+    have different hashes.
+
+    """
+    array = items if isinstance(items, np.ndarray) else np.asarray(items)
+    kind = array.dtype.kind
+    if array.ndim != 1 or kind not in 'biufUS':
+        # The items are hashed one at a time.
+        keys = np.array(
+            [int.from_bytes(hashlib.blake2b(repr(item).encode(),
+                                            digest_size=8).digest(), 'little')
+             for item in items], dtype=np.uint64)
+    elif kind in 'bi':
+        keys = array.astype(np.int64).view(np.uint64)
+    elif kind == 'u':
+        keys = array.astype(np.uint64)
+    elif kind == 'f':
+        keys = array.astype(np.float64).view(np.uint64)
+    else:
+        # A string is hashed by FNV-1a over its code units. Each row
+        # of codes is the code units of a string, padded with zeros.
+        code_type = np.uint32 if kind == 'U' else np.uint8
+        codes = np.ascontiguousarray(array).view(code_type).reshape(
+            len(array), -1)
+        keys = np.full(len(array), 0xCBF29CE484222325, dtype=np.uint64)
+        prime = np.uint64(0x100000001B3)
+        for column in range(codes.shape[1]):
+            keys = (keys ^ codes[:, column]) * prime
+    return splitmix64(keys ^ np.uint64(seed))
+
+def hash_indices(items, num_hashes, width, seed):
+    """
+    Returns an array with num_hashes rows and a column for each
+    item. Row i is the i-th hash of the items into range(width).
+    The hashes are computed from two hashes (Kirsch and
+    Mitzenmacher).
+
+    """
+    hashes = hash_items(items, seed)
+    hash_1 = hashes & np.uint64(0xFFFFFFFF)
+    hash_2 = (hashes >> np.uint64(32)) | np.uint64(1)
+    rows = np.arange(num_hashes, dtype=np.uint64)[:, np.newaxis]
+    return ((hash_1 + rows * hash_2) % np.uint64(width)).astype(np.intp)
+
+def check_same_parameters(sketch, other, names):
+    assert type(sketch) is type(other) and all(
+        getattr(sketch, name) == getattr(other, name) for name in names), \
+        'Cannot merge sketches with different parameters {0}: {1} and {2}'.\
+        format(names, sketch, other)
+
+#------------------------------------------------------------------
+#                     SKETCHES
+#------------------------------------------------------------------
+class CountMinSketch(object):
+    """
+    A Count-Min sketch (Cormode and Muthukrishnan) of the number of
+    occurrences of items.
+
+    Parameters
+    ----------
+    width: int
+    depth: int
+    seed: int, optional
+
+    Notes
+    -----
+    Memory: 8*width*depth bytes.
+    Error: an estimate is at least the number of occurrences of the
+    item, and, with probability at least 1 - exp(-depth), at most
+    that number plus (e/width)*total where total is the number of
+    items. Use from_error() to get a sketch with given error bounds.
+
+    """
+    def __init__(self, width, depth, seed=0):
+        self.width = width
+        self.depth = depth
+        self.seed = seed
+        self.table = np.zeros((depth, width), dtype=np.int64)
+        self.total = 0
+
+    @classmethod
+    def from_error(cls, epsilon, delta, seed=0):
+        """
+        Returns a sketch whose estimates exceed the number of
+        occurrences by at most epsilon*total with probability at
+        least 1 - delta.
+
+        """
+        return cls(int(math.ceil(math.e / epsilon)),
+                   int(math.ceil(math.log(1.0 / delta))), seed)
+
+    def __repr__(self):
+        return 'CountMinSketch(width={0}, depth={1}, seed={2})'.format(
+            self.width, self.depth, self.seed)
+
+    def update(self, items, counts=None):
+        """
+        Adds items. counts[j], if counts is not None, is the number
+        of occurrences of items[j].
+
+        """
+        if len(items) == 0:
+            return
+        indices = hash_indices(items, self.depth, self.width, self.seed)
+        # The index of row i, column j of the table in table.ravel()
+        # is i*width + j.
+        indices += (np.arange(self.depth) * self.width)[:, np.newaxis]
+        if counts is None:
+            counts = 1
+            self.total += len(items)
+        else:
+            counts = np.broadcast_to(np.asarray(counts, dtype=np.int64),
+                                     (self.depth, len(items)))
+            self.total += int(counts[0].sum())
+        np.add.at(self.table.reshape(-1), indices, counts)
+
+    def query(self, items):
+        """
+        Returns an array of the estimates of the number of
+        occurrences of items.
+
+        """
+        indices = hash_indices(items, self.depth, self.width, self.seed)
+        return self.table[np.arange(self.depth)[:, np.newaxis],
+                          indices].min(axis=0)
+
+    def merge(self, other):
+        check_same_parameters(self, other, ['width', 'depth', 'seed'])
+        self.table += other.table
+        self.total += other.total
+        return self
+
+    def subtract(self, other):
+        """
+        Removes the items summarized by other, which must have been
+        added to this sketch.
+
+        """
+        check_same_parameters(self, other, ['width', 'depth', 'seed'])
+        self.table -= other.table
+        self.total -= other.total
+        return self
+
+    def copy(self):
+        sketch = CountMinSketch(self.width, self.depth, self.seed)
+        sketch.table[:] = self.table
+        sketch.total = self.total
+        return sketch
+
+    @property
+    def memory(self):
+        return self.table.nbytes
+
+    @property
+    def epsilon(self):
+        return math.e / self.width
+
+    @property
+    def delta(self):
+        return math.exp(-self.depth)
+
+
+class HyperLogLog(object):
+    """
+    A HyperLogLog sketch (Flajolet et al.) of the number of distinct
+    items.
+
+    Parameters
+    ----------
+    precision: int
+       The sketch has 2**precision registers. 4 <= precision <= 18.
+    seed: int, optional
+
+    Notes
+    -----
+    Memory: 2**precision bytes.
+    Error: the standard error of count() is about
+    1.04/sqrt(2**precision) times the number of distinct items.
+
+    """
+    def __init__(self, precision=12, seed=0):
+        assert 4 <= precision <= 18
+        self.precision = precision
+        self.seed = seed
+        self.num_registers = 1 << precision
+        self.registers = np.zeros(self.num_registers, dtype=np.uint8)
+
+    def __repr__(self):
+        return 'HyperLogLog(precision={0}, seed={1})'.format(
+            self.precision, self.seed)
+
+    def update(self, items):
+        if len(items) == 0:
+            return
+        hashes = hash_items(items, self.seed)
+        # The first precision bits of a hash are the index of a
+        # register. rank is the position of the first 1 bit in the
+        # remaining bits. Only the first 53 of the remaining bits
+        # are used so that they are exact as float64; a hash whose
+        # first 53 remaining bits are 0 has probability 2**-53.
+        indices = (hashes >> np.uint64(64 - self.precision)).astype(np.intp)
+        remaining = (hashes << np.uint64(self.precision)) >> np.uint64(11)
+        bit_lengths = np.frexp(remaining.astype(np.float64))[1]
+        ranks = np.minimum(54 - bit_lengths, 64 - self.precision + 1)
+        np.maximum.at(self.registers, indices, ranks.astype(np.uint8))
+
+    def count(self):
+        """
+        Returns the estimate of the number of distinct items.
+
+        """
+        m = float(self.num_registers)
+        alpha = 0.7213 / (1.0 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(
+            np.ldexp(1.0, -self.registers.astype(np.int64)))
+        num_zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and num_zeros > 0:
+            # Linear counting for small numbers of distinct items.
+            estimate = m * math.log(m / num_zeros)
+        return estimate
+
+    def merge(self, other):
+        check_same_parameters(self, other, ['precision', 'seed'])
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def copy(self):
+        sketch = HyperLogLog(self.precision, self.seed)
+        sketch.registers[:] = self.registers
+        return sketch
+
+    @property
+    def memory(self):
+        return self.registers.nbytes
+
+    @property
+    def relative_error(self):
+        return 1.04 / math.sqrt(self.num_registers)
+
+
+class BloomFilter(object):
+    """
+    A Bloom filter: a set that may report that an item that was
+    not added is in the set (a false positive), but never reports
+    that an item that was added is not in the set.
+
+    Parameters
+    ----------
+    num_bits: int
+    num_hashes: int
+    seed: int, optional
+
+    Notes
+    -----
+    Memory: num_bits bytes (a bit is stored in a byte).
+    Error: after n distinct items are added, the probability of a
+    false positive is about (1 - exp(-num_hashes*n/num_bits))**num_hashes.
+    Use from_capacity() to get a filter with a given false positive
+    rate.
+
+    """
+    def __init__(self, num_bits, num_hashes, seed=0):
+        self.num_bits = num_bits
+        self.num_hashes = num_hashes
+        self.seed = seed
+        self.bits = np.zeros(num_bits, dtype=np.bool_)
+
+    @classmethod
+    def from_capacity(cls, capacity, false_positive_rate, seed=0):
+        """
+        Returns a filter whose false positive rate is at most
+        false_positive_rate after capacity distinct items are added.
+
+        """
+        num_bits = int(math.ceil(
+            -capacity * math.log(false_positive_rate) / math.log(2)**2))
+        num_hashes = max(1, int(round(num_bits / float(capacity) * math.log(2))))
+        return cls(num_bits, num_hashes, seed)
+
+    def __repr__(self):
+        return 'BloomFilter(num_bits={0}, num_hashes={1}, seed={2})'.format(
+            self.num_bits, self.num_hashes, self.seed)
+
+    def update(self, items):
+        if len(items) == 0:
+            return
+        self.bits[hash_indices(items, self.num_hashes, self.num_bits,
+                               self.seed).ravel()] = True
+
+    def contains(self, items):
+        """
+        Returns an array of bool: element j is True if items[j] may
+        have been added, and False if it has not been added.
+
+        """
+        return self.bits[hash_indices(items, self.num_hashes, self.num_bits,
+                                      self.seed)].all(axis=0)
+
+    def false_positive_rate(self):
+        """
+        Returns the probability of a false positive for the items
+        added so far.
+
+        """
+        return float(np.mean(self.bits)) ** self.num_hashes
+
+    def merge(self, other):
+        check_same_parameters(self, other, ['num_bits', 'num_hashes', 'seed'])
+        self.bits |= other.bits
+        return self
+
+    def copy(self):
+        sketch = BloomFilter(self.num_bits, self.num_hashes, self.seed)
+        sketch.bits[:] = self.bits
+        return sketch
+
+    @property
+    def memory(self):
+        return self.bits.nbytes
+
+
+class MisraGries(object):
+    """
+    The Misra-Gries summary of the heavy hitters of a stream, in the
+    mergeable form of Agarwal et al.: the summary has at most k
+    items, and their counts.
+
+    Parameters
+    ----------
+    k: int
+
+    Notes
+    -----
+    Memory: k items and counts.
+    Error: the count of an item, counts().get(item, 0), is at most
+    the number of occurrences of the item and at least that number
+    minus total/(k+1). So, every item that is more than a fraction
+    1/(k+1) of the stream is in the summary.
+
+    """
+    def __init__(self, k):
+        self.k = k
+        self.counters = {}
+        self.total = 0
+
+    def __repr__(self):
+        return 'MisraGries(k={0})'.format(self.k)
+
+    def update(self, items):
+        if len(items) == 0:
+            return
+        array = items if isinstance(items, np.ndarray) else np.asarray(items)
+        if array.ndim == 1 and array.dtype.kind in 'biufUS':
+            values, counts = np.unique(array, return_counts=True)
+            batch_counts = zip(values.tolist(), counts.tolist())
+        else:
+            batch_counts = collections.Counter(items).items()
+        self.total += len(items)
+        self.add_counts(batch_counts)
+
+    def add_counts(self, item_counts):
+        counters = self.counters
+        for item, count in item_counts:
+            counters[item] = counters.get(item, 0) + count
+        if len(counters) > self.k:
+            # Subtract the (k+1)-th largest count from every count,
+            # and keep the items with positive counts.
+            counts = np.fromiter(counters.values(), dtype=np.int64,
+                                 count=len(counters))
+            threshold = np.partition(counts, len(counts) - self.k - 1)[
+                len(counts) - self.k - 1]
+            self.counters = dict(
+                (item, count - threshold) for item, count in counters.items()
+                if count > threshold)
+
+    def counts(self):
+        """
+        Returns a dict: item -> estimate of the number of occurrences.
+
+        """
+        return dict(self.counters)
+
+    def heavy_hitters(self, fraction):
+        """
+        Returns the items in the summary whose estimated number of
+        occurrences is at least fraction*total.
+
+        """
+        return dict((item, count) for item, count in self.counters.items()
+                    if count >= fraction * self.total)
+
+    def merge(self, other):
+        check_same_parameters(self, other, ['k'])
+        self.total += other.total
+        self.add_counts(other.counters.items())
+        return self
+
+    def copy(self):
+        sketch = MisraGries(self.k)
+        sketch.counters = dict(self.counters)
+        sketch.total = self.total
+        return sketch
+
+#------------------------------------------------------------------
+#                     AGENT
+#------------------------------------------------------------------
+def sketch_agent(sketch, in_stream, out_stream=None, func=None,
+                 window_size=None, call_streams=None, name=None):
+    """
+    Parameters
+    ----------
+        sketch: object
+           A sketch, such as CountMinSketch, with a method
+           update(items) where items is a list or an array.
+        in_stream: Stream or StreamArray
+           The sketch is updated with each segment of in_stream.
+        out_stream: Stream, optional
+           If out_stream is specified then func(sketch) is appended
+           to out_stream each time that the length of in_stream
+           becomes a multiple of window_size.
+        func: function, optional
+           A function of the sketch, e.g. lambda s: s.count() or
+           lambda s: s.copy().
+        window_size: int, optional
+        call_streams: list of Stream
+           The list of call_streams. A new value in any stream in this
+           list causes a state transition of this agent.
+        name: Str
+           Name of the agent created by this function.
+    Returns
+    -------
+        Agent.
+         The agent created by this function.
+
+    """
+    check_stream_type(name, 'in_stream', in_stream)
+    out_streams = []
+    if out_stream is not None:
+        check_stream_type(name, 'out_stream', out_stream)
+        assert func is not None and window_size is not None and \
+          window_size > 0, \
+          'In sketch_agent {0}, func and window_size are required '\
+          'with out_stream'.format(name)
+        out_streams = [out_stream]
+
+    # state is the number of elements of in_stream since the last
+    # output.
+    def transition(in_lists, state):
+        in_list = in_lists[0]
+        segment = in_list.list[in_list.start:in_list.stop]
+        if out_stream is None:
+            sketch.update(segment)
+            return ([], state, [in_list.stop])
+        output_list = []
+        index = 0
+        # Update the sketch up to the end of each window, and output
+        # func(sketch) at the end of the window.
+        while len(segment) - index >= window_size - state:
+            end = index + window_size - state
+            sketch.update(segment[index:end])
+            output_list.append(func(sketch))
+            index, state = end, 0
+        sketch.update(segment[index:])
+        state += len(segment) - index
+        return ([output_list], state, [in_list.stop])
+
+    return Agent([in_stream], out_streams, transition, 0, call_streams, name)
+
+def sketch_agent_f(sketch, in_stream, func, window_size):
+    out_stream = Stream('sketch:' + in_stream.name)
+    sketch_agent(sketch, in_stream, out_stream, func, window_size)
+    return out_stream
+
+def sketch_window(make_sketch, func, in_stream, out_stream, window_size,
+                  step_size, call_streams=None, name=None):
+    """
+    Parameters
+    ----------
+        make_sketch: function
+           make_sketch() returns an empty sketch.
+        func: function
+           func(sketch) is appended to out_stream for each window,
+           where sketch summarizes the window.
+        in_stream: Stream or StreamArray
+        out_stream: Stream
+        window_size: int
+           A multiple of step_size.
+        step_size: int
+        call_streams: list of Stream
+           The list of call_streams. A new value in any stream in this
+           list causes a state transition of this agent.
+        name: Str
+           Name of the agent created by this function.
+    Returns
+    -------
+        Agent.
+         The agent created by this function.
+    Notes
+    -----
+        The windows are the same as those of map_window:
+        in_stream[j*step_size : j*step_size + window_size] for
+        j = 0, 1, 2, ... Each pane of step_size elements is
+        summarized once, and the sketch of a window is the merge of
+        the sketches of its window_size/step_size panes. If the
+        sketch has a method subtract(other), as linear sketches such
+        as CountMinSketch and Histogram do, then the sketch of a
+        window is kept up to date: the sketch of the new pane is
+        merged into it and the sketch of the expired pane is
+        subtracted from it.
+
+    """
+    check_stream_type(name, 'in_stream', in_stream)
+    check_stream_type(name, 'out_stream', out_stream)
+    assert step_size > 0 and window_size % step_size == 0, \
+      'In sketch_window {0}, window_size must be a multiple of step_size'.\
+      format(name)
+    num_panes = window_size // step_size
+
+    # state is (the sketches of the latest complete panes, the
+    # sketch of the current pane, the number of elements in the
+    # current pane, the sketch of the latest panes or None).
+    first_pane = make_sketch()
+    window_sketch = make_sketch() if hasattr(first_pane, 'subtract') else None
+    state = (collections.deque(), first_pane, 0, window_sketch)
+
+    def transition(in_lists, state):
+        panes, pane, pane_length, window_sketch = state
+        in_list = in_lists[0]
+        segment = in_list.list[in_list.start:in_list.stop]
+        output_list = []
+        index = 0
+        while len(segment) - index >= step_size - pane_length:
+            end = index + step_size - pane_length
+            pane.update(segment[index:end])
+            panes.append(pane)
+            if window_sketch is not None:
+                window_sketch.merge(pane)
+            if len(panes) > num_panes:
+                expired_pane = panes.popleft()
+                if window_sketch is not None:
+                    window_sketch.subtract(expired_pane)
+            if len(panes) == num_panes:
+                if window_sketch is not None:
+                    output_list.append(func(window_sketch))
+                else:
+                    merged_sketch = panes[0].copy()
+                    for i in range(1, num_panes):
+                        merged_sketch.merge(panes[i])
+                    output_list.append(func(merged_sketch))
+            pane, pane_length, index = make_sketch(), 0, end
+        pane.update(segment[index:])
+        pane_length += len(segment) - index
+        return ([output_list], (panes, pane, pane_length, window_sketch),
+                [in_list.stop])
+
+    return Agent([in_stream], [out_stream], transition, state,
+                 call_streams, name)
+
+def sketch_window_f(make_sketch, func, in_stream, window_size, step_size):
+    out_stream = Stream('sketch_window:' + in_stream.name)
+    sketch_window(make_sketch, func, in_stream, out_stream, window_size,
+                  step_size)
+    return out_stream
@@ -10,38 +10,104 @@ from .check_agent_parameter_types import *
 from .iot import iot
 # iot is in the current directory
 
+def array_windows(A, window_size, step_size, num_windows):
+    """
+    Returns a read-only view of A whose j-th row is the window
+    A[j*step_size : j*step_size + window_size]. The windows are not
+    copied.
+
+    """
+    return np.lib.stride_tricks.as_strided(
+        A, shape=(num_windows, window_size) + A.shape[1:],
+        strides=(step_size*A.strides[0],) + A.strides, writeable=False)
+
 class sliding_window_with_startup(object):
-    def __init__(self, func, in_stream, out_stream, window_size, step_size):
+    """
+    Outputs func(window) for each sliding window of in_stream. The
+    windows end at step_size, 2*step_size, 3*step_size, ... During
+    startup, the windows that end before window_size are partial:
+    they are the first step_size, 2*step_size, ... elements of
+    in_stream. The later windows have window_size elements.
+
+    Parameters
+    ----------
+        func: function
+           func(window) is an element of out_stream. If vectorized
+           is True then func operates on an array of windows, one
+           window per row, and returns an array with one element of
+           out_stream per window, e.g. lambda W: np.sum(W, axis=1).
+           During startup, func is called with arrays of one
+           partial window.
+        in_stream: Stream or StreamArray
+        out_stream: Stream or StreamArray
+        window_size: int
+        step_size: int
+        vectorized: bool, optional
+           in_stream must be a StreamArray if vectorized is True.
+    Notes
+    -----
+        The outputs of all the windows that are available when
+        in_stream is extended are put into out_stream with a single
+        extend.
+
+    """
+    def __init__(self, func, in_stream, out_stream, window_size, step_size,
+                 vectorized=False):
+        assert not vectorized or isinstance(in_stream, StreamArray), \
+          'sliding_window_with_startup: in_stream must be a StreamArray '\
+          'if vectorized is True'
         self.func = func
         self.in_stream = in_stream
         self.out_stream = out_stream
         self.window_size = window_size
         self.step_size = step_size
+        self.vectorized = vectorized
         self.starting = True
-        self.start_ptr = 0
+        # During startup, end_ptr is the end of the last partial window.
         self.end_ptr = 0
         iot(func=self.extend, in_stream=self.in_stream)
     def extend(self, A):
+        outputs = []
+        start = 0
         if self.starting:
-            while self.end_ptr < len(A):
-                self.end_ptr = self.end_ptr + self.step_size
-                if self.end_ptr > self.window_size:
-                    self.start_ptr = self.end_ptr - self.window_size
-                window = A[self.start_ptr : self.end_ptr]
-                self.out_stream.append(self.func(window))
-            if self.end_ptr > self.window_size:
-                self.starting = False
-                return self.start_ptr + self.step_size
-            else:
+            while (self.end_ptr + self.step_size < self.window_size and
+                   self.end_ptr + self.step_size <= len(A)):
+                self.end_ptr += self.step_size
+                window = A[:self.end_ptr]
+                if self.vectorized:
+                    outputs.append(self.func(window[np.newaxis]))
+                else:
+                    outputs.append(self.func(window))
+            if self.end_ptr + self.step_size < self.window_size:
+                self.output(outputs)
                 return 0
+            # The next window is the first window with window_size
+            # elements; it starts at start.
+            self.starting = False
+            start = self.end_ptr + self.step_size - self.window_size
+        if len(A) - start >= self.window_size:
+            num_windows = (len(A) - start - self.window_size)//self.step_size + 1
         else:
-            self.start_ptr = 0
-            while self.start_ptr + self.window_size <= len(A):
-                window = A[self.start_ptr : self.start_ptr + self.window_size]
-                self.out_stream.append(self.func(window))
-                self.start_ptr += self.step_size
-            return self.start_ptr
-
-    
-    
-    
+            num_windows = 0
+        if num_windows > 0:
+            if isinstance(A, np.ndarray):
+                windows = array_windows(
+                    A[start:], self.window_size, self.step_size, num_windows)
+                if self.vectorized:
+                    outputs.append(self.func(windows))
+                else:
+                    outputs.extend([self.func(window) for window in windows])
+            else:
+                outputs.extend(
+                    [self.func(A[i : i + self.window_size]) for i in
+                     range(start, start + num_windows*self.step_size,
+                           self.step_size)])
+        self.output(outputs)
+        return int(start + num_windows*self.step_size)
+    def output(self, outputs):
+        if not outputs:
+            return
+        if self.vectorized:
+            self.out_stream.extend(np.concatenate(outputs))
+        else:
+            self.out_stream.extend(outputs)
@@ -220,7 +220,7 @@ def source_func_to_stream(
     check_source_function_arguments(
         func, stream_name, time_interval, num_steps, window_size,
         state, name)
-    scheduler = Stream.scheduler
+    scheduler = out_stream.get_scheduler()
 
     def thread_target(
             func, stream_name, time_interval,
@@ -348,7 +348,7 @@ def source_file_to_stream(
     check_source_file_arguments(
         func, stream_name, filename, time_interval,
         num_steps, window_size, state, name)
-    scheduler = Stream.scheduler
+    scheduler = out_stream.get_scheduler()
 
     def thread_target(func, stream_name, filename, time_interval,
                       num_steps, window_size, state,
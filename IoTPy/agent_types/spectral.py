@@ -0,0 +1,224 @@
+"""
+This module has agents that process a StreamArray of samples, such
+as audio, in blocks with the FFT. A transition processes all the
+complete blocks of the new samples with one call of np.fft.rfft and
+one call of np.fft.irfft, and overlap-adds the blocks of output
+into the output StreamArray. The samples that are not yet in a
+complete block, and the parts of output blocks that overlap future
+blocks, are carried in the state of the agent.
+
+Agents in the module:
+   1. stft_process: short-time Fourier transform, a function of
+      the spectra of frames, and reconstruction by overlap-add.
+   2. fft_convolve: convolution with a long impulse response, e.g.
+      the impulse response of a room for reverberation.
+
+In addition functions that return streams are:
+   stft_process_f
+   fft_convolve_f
+
+"""
+import numpy as np
+
+from ..core.stream import StreamArray
+from ..core.agent import Agent
+# stream, agent are in ../core
+from .check_agent_parameter_types import *
+
+def overlap_add(blocks, hop_size, tail):
+    """
+    Adds blocks, an array with one block per row, where block j
+    starts at j*hop_size, to tail, the overlap of earlier blocks.
+    Returns (the first len(blocks)*hop_size samples, which no later
+    block overlaps, and the new tail).
+
+    """
+    num_blocks, block_length = blocks.shape
+    # Block j is split into num_parts parts of hop_size samples;
+    # part r of all the blocks is added with one vector operation.
+    num_parts = -(-block_length // hop_size)
+    padded = np.zeros((num_blocks, num_parts * hop_size))
+    padded[:, :block_length] = blocks
+    output = np.zeros((num_blocks + num_parts - 1) * hop_size)
+    output[:len(tail)] += tail
+    for r in range(num_parts):
+        output[r*hop_size : (r + num_blocks)*hop_size] += \
+          padded[:, r*hop_size : (r + 1)*hop_size].ravel()
+    end = num_blocks * hop_size
+    return output[:end], output[end : end + len(tail)]
+
+def frames_of(samples, frame_size, hop_size, num_frames):
+    # A read-only view whose row j is samples[j*hop_size : j*hop_size + frame_size].
+    return np.lib.stride_tricks.as_strided(
+        samples, shape=(num_frames, frame_size),
+        strides=(hop_size * samples.strides[0], samples.strides[0]),
+        writeable=False)
+
+def check_sample_streams(name, in_stream, out_stream):
+    check_stream_type(name, 'in_stream', in_stream)
+    check_stream_type(name, 'out_stream', out_stream)
+    assert isinstance(in_stream, StreamArray) and in_stream.dimension == 0, \
+      'In agent {0}, in_stream must be a StreamArray of samples '\
+      '(dimension 0)'.format(name)
+
+def stft_process(func, in_stream, out_stream, frame_size, hop_size,
+                 window=None, call_streams=None, name=None):
+    """
+    Parameters
+    ----------
+        func: function
+           func(spectra) returns an array with the same shape as
+           spectra. spectra is an array of complex numbers with one
+           row for each frame: row j is np.fft.rfft(window*frame j).
+           For example, func can scale or zero frequency bins.
+        in_stream: StreamArray
+           A StreamArray of samples (dimension 0).
+        out_stream: StreamArray
+           The overlap-add of the inverse FFTs of func(spectra).
+        frame_size: int
+        hop_size: int
+           Frame j starts at sample j*hop_size.
+        window: array, optional
+           The analysis window, an array of frame_size numbers.
+           The default is the periodic Hann window. The overlap-add
+           of the window, shifted by multiples of hop_size, must be
+           constant (e.g. Hann with hop_size frame_size/2 or
+           frame_size/4); the output is divided by the constant.
+        call_streams: list of Stream
+           The list of call_streams. A new value in any stream in this
+           list causes a state transition of this agent.
+        name: Str
+           Name of the agent created by this function.
+    Returns
+    -------
+        Agent.
+         The agent created by this function.
+    Notes
+    -----
+        out_stream[n] is the output for in_stream[n]: if func is
+        the identity then out_stream is the same as in_stream up to
+        rounding. out_stream lags in_stream by up to frame_size
+        samples because a sample is output only when all the frames
+        that contain it have arrived.
+
+    """
+    check_sample_streams(name, in_stream, out_stream)
+    assert 0 < hop_size <= frame_size
+    if window is None:
+        window = 0.5 - 0.5*np.cos(2*np.pi*np.arange(frame_size)/frame_size)
+    window = np.asarray(window, dtype=float)
+    assert window.shape == (frame_size,)
+    # The overlap-add of the window must be constant where every
+    # sample is in frame_size/hop_size frames.
+    overlap = overlap_add(np.tile(window, (frame_size // hop_size + 2, 1)),
+                          hop_size, np.zeros(frame_size - hop_size))[0]
+    steady_overlap = overlap[frame_size:]
+    assert np.allclose(steady_overlap, steady_overlap[0]) and \
+      steady_overlap[0] > 0, \
+      'In agent {0}, the window does not overlap-add to a constant with '\
+      'hop_size {1}'.format(name, hop_size)
+    scale = 1.0 / steady_overlap[0]
+    # The stream is padded at the start with frame_size - hop_size
+    # zeros so that every sample is in frame_size/hop_size frames.
+    # The outputs for the padding are discarded.
+    padding = frame_size - hop_size
+
+    # state is (the samples that are not yet in a complete frame,
+    # the tail of the overlap-add, the number of outputs to discard).
+    state = (np.zeros(padding), np.zeros(padding), padding)
+
+    def transition(in_lists, state):
+        pending, tail, num_discarded = state
+        in_list = in_lists[0]
+        samples = np.concatenate(
+            (pending, in_list.list[in_list.start:in_list.stop]))
+        if len(samples) < frame_size:
+            return ([np.zeros(0)], (samples, tail, num_discarded),
+                    [in_list.stop])
+        num_frames = (len(samples) - frame_size) // hop_size + 1
+        frames = frames_of(samples, frame_size, hop_size, num_frames)
+        spectra = func(np.fft.rfft(frames * window, axis=1))
+        output, tail = overlap_add(
+            np.fft.irfft(spectra, n=frame_size, axis=1), hop_size, tail)
+        output *= scale
+        discard = min(num_discarded, len(output))
+        pending = samples[num_frames * hop_size:]
+        return ([output[discard:]], (pending, tail, num_discarded - discard),
+                [in_list.stop])
+
+    return Agent([in_stream], [out_stream], transition, state,
+                 call_streams, name)
+
+def fft_convolve(in_stream, out_stream, impulse_response, block_size=None,
+                 call_streams=None, name=None):
+    """
+    Parameters
+    ----------
+        in_stream: StreamArray
+           A StreamArray of samples (dimension 0).
+        out_stream: StreamArray
+           out_stream[n] = sum over k of
+           impulse_response[k]*in_stream[n-k], i.e. out_stream is
+           np.convolve(in_stream, impulse_response) up to rounding,
+           truncated to the length of in_stream.
+        impulse_response: array
+        block_size: int, optional
+           The samples are convolved in blocks of block_size
+           samples, and so out_stream lags in_stream by up to
+           block_size samples. The default is the power of 2 that
+           is at least len(impulse_response); then the cost per
+           sample grows with the logarithm of the length of the
+           impulse response.
+        call_streams: list of Stream
+           The list of call_streams. A new value in any stream in this
+           list causes a state transition of this agent.
+        name: Str
+           Name of the agent created by this function.
+    Returns
+    -------
+        Agent.
+         The agent created by this function.
+
+    """
+    check_sample_streams(name, in_stream, out_stream)
+    impulse_response = np.asarray(impulse_response, dtype=float)
+    ir_length = len(impulse_response)
+    if block_size is None:
+        block_size = 1 << max(0, int(ir_length - 1).bit_length())
+    # The FFT of a block is long enough for its linear convolution.
+    fft_size = 1 << int(block_size + ir_length - 2).bit_length()
+    ir_spectrum = np.fft.rfft(impulse_response, n=fft_size)
+    # The output of a block has block_size + ir_length - 1 samples.
+    output_length = block_size + ir_length - 1
+
+    # state is (the samples that are not yet in a complete block, the
+    # tail of the overlap-add).
+    state = (np.zeros(0), np.zeros(output_length - block_size))
+
+    def transition(in_lists, state):
+        pending, tail = state
+        in_list = in_lists[0]
+        samples = np.concatenate(
+            (pending, in_list.list[in_list.start:in_list.stop]))
+        num_blocks = len(samples) // block_size
+        if num_blocks == 0:
+            return ([np.zeros(0)], (samples, tail), [in_list.stop])
+        blocks = samples[:num_blocks * block_size].reshape(num_blocks, block_size)
+        outputs = np.fft.irfft(np.fft.rfft(blocks, n=fft_size, axis=1) *
+                               ir_spectrum, n=fft_size, axis=1)
+        output, tail = overlap_add(outputs[:, :output_length], block_size, tail)
+        return ([output], (samples[num_blocks * block_size:], tail),
+                [in_list.stop])
+
+    return Agent([in_stream], [out_stream], transition, state,
+                 call_streams, name)
+
+def stft_process_f(func, in_stream, frame_size, hop_size, window=None):
+    out_stream = StreamArray('stft:' + in_stream.name, dtype=float)
+    stft_process(func, in_stream, out_stream, frame_size, hop_size, window)
+    return out_stream
+
+def fft_convolve_f(in_stream, impulse_response, block_size=None):
+    out_stream = StreamArray('fft_convolve:' + in_stream.name, dtype=float)
+    fft_convolve(in_stream, out_stream, impulse_response, block_size)
+    return out_stream
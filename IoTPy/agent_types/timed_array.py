@@ -0,0 +1,256 @@
+"""
+This module has time-window agents for StreamArrays of timed
+elements. The agents compute the same windows as timed_window in
+op.py, but a transition operates on NumPy arrays: window boundaries
+are found with np.searchsorted and windows are reduced with
+ufunc.reduceat. So, a transition has no Python loop over the
+elements of the stream.
+
+An element of a timed StreamArray is a record with fields 'time'
+and 'value'. The dtype of the StreamArray is timed_dtype(), e.g.
+    x = StreamArray('x', dtype=timed_dtype())
+The elements of a timed StreamArray must be in increasing order of
+time.
+
+A window is reduced by a NumPy ufunc, such as np.add, np.maximum or
+np.minimum. The output stream is a timed StreamArray; an element of
+the output stream is (time, value) where value is the reduction of
+the values in a window and time is the end time of the window.
+As with timed_window, windows that have no elements are not output.
+
+Agents in the module:
+   1. timed_window_array (hopping windows)
+   2. tumbling_window_array
+   3. session_window_array
+
+In addition functions that return streams are:
+   timed_window_array_f
+   tumbling_window_array_f
+   session_window_array_f
+
+"""
+import numpy as np
+
+from ..core.stream import StreamArray
+from ..core.agent import Agent
+# stream, agent are in ../core
+from .check_agent_parameter_types import *
+
+def timed_dtype(value_dtype=float, time_dtype=float):
+    """
+    Returns the dtype of a timed StreamArray.
+
+    """
+    return np.dtype([('time', time_dtype), ('value', value_dtype)])
+
+def check_timed_stream_array(name, parameter_name, stream):
+    check_stream_type(name, parameter_name, stream)
+    assert isinstance(stream, StreamArray) and stream.dimension == 0 and \
+      stream.dtype.names is not None and \
+      'time' in stream.dtype.names and 'value' in stream.dtype.names, \
+      'In agent {0}, {1} must be a StreamArray with dtype timed_dtype(). '\
+      'It is {2}'.format(name, parameter_name, stream)
+
+def make_output(out_stream, times, values):
+    output = np.empty(len(times), dtype=out_stream.dtype)
+    output['time'] = times
+    output['value'] = values
+    return output
+
+def reduce_windows(ufunc, values, starts, stops):
+    """
+    Returns the array whose j-th element is
+    ufunc.reduce(values[starts[j]:stops[j]]). Windows may overlap;
+    starts[j] < stops[j] for all j.
+
+    """
+    # ufunc.reduceat(a, indices) reduces a[indices[i]:indices[i+1]].
+    # Interleaving starts and stops reduces each window, and every
+    # other reduction, from a stop to the next start, is ignored.
+    # The value appended to values makes the last stop a valid
+    # index.
+    indices = np.empty(2*len(starts), dtype=np.intp)
+    indices[0::2] = starts
+    indices[1::2] = stops
+    extended_values = np.concatenate((values, values[:1]))
+    return ufunc.reduceat(extended_values, indices)[0::2]
+
+def timed_window_array(
+        ufunc, in_stream, out_stream, window_duration, step_time,
+        window_start_time=0, call_streams=None, name=None):
+    """
+    Parameters
+    ----------
+        ufunc: NumPy ufunc
+           The function, such as np.add or np.maximum, that reduces
+           the values in a window.
+        in_stream: StreamArray
+           The timed input stream. Its dtype is timed_dtype().
+        out_stream: StreamArray
+           The timed output stream. Its dtype is timed_dtype().
+        window_duration: number (int or float)
+           The duration, in units of time, of a window. A window
+           with start time S has the elements with times in
+           [S, S + window_duration).
+        step_time: number (int or float)
+           The length of time that the window is moved forward
+           at each step. The windows overlap (hop) if step_time
+           is less than window_duration.
+        window_start_time: number, optional
+           The start time of the first window.
+        call_streams: list of Stream
+           The list of call_streams. A new value in any stream in this
+           list causes a state transition of this agent.
+        name: Str
+           Name of the agent created by this function.
+    Returns
+    -------
+        Agent.
+         The agent created by this function.
+    Notes
+    -----
+        A window is output when an element with time at least the
+        end time of the window arrives.
+
+    """
+    check_timed_stream_array(name, 'in_stream', in_stream)
+    check_timed_stream_array(name, 'out_stream', out_stream)
+    assert window_duration > 0 and step_time > 0, \
+      'In agent {0}, window_duration and step_time must be positive'.format(name)
+    # The number of windows that contain an element is at most
+    # windows_per_element.
+    windows_per_element = int(np.ceil(window_duration / float(step_time)))
+    offsets = np.arange(windows_per_element)
+
+    # state is the start time of the next window. All windows with
+    # earlier start times have been output.
+    def transition(in_lists, state):
+        in_list = in_lists[0]
+        window_start_time = state
+        input_array = in_list.list[in_list.start:in_list.stop]
+        empty_output = make_output(out_stream, [], [])
+        if len(input_array) == 0:
+            return ([empty_output], state, [in_list.start])
+        times = input_array['time']
+        values = input_array['value']
+        # The windows k = 0, 1, ..., last_window, where window k
+        # starts at window_start_time + k*step_time, end at or before
+        # the time of the last element.
+        last_window = int(np.floor(
+            (times[-1] - window_duration - window_start_time) / step_time))
+        if last_window < 0:
+            return ([empty_output], state, [in_list.start])
+        # Window k contains an element with time t only if
+        # k <= floor((t - window_start_time)/step_time) < k + windows_per_element.
+        # latest_windows is sorted because times is sorted; so, its
+        # distinct values are found without sorting.
+        latest_windows = np.floor(
+            (times - window_start_time) / step_time).astype(np.int64)
+        windows = latest_windows[np.concatenate(
+            ([True], latest_windows[1:] != latest_windows[:-1]))]
+        if windows_per_element > 1:
+            windows = np.unique(
+                (windows[:, np.newaxis] - offsets).ravel())
+        windows = windows[(windows >= 0) & (windows <= last_window)]
+        start_times = window_start_time + windows * step_time
+        starts = np.searchsorted(times, start_times, side='left')
+        stops = np.searchsorted(times, start_times + window_duration,
+                                side='left')
+        # Output only the windows that have elements.
+        nonempty = starts < stops
+        starts, stops = starts[nonempty], stops[nonempty]
+        start_times = start_times[nonempty]
+        output = make_output(out_stream, start_times + window_duration,
+                             reduce_windows(ufunc, values, starts, stops))
+        window_start_time += (last_window + 1) * step_time
+        new_start = np.searchsorted(times, window_start_time, side='left')
+        return ([output], window_start_time, [in_list.start + int(new_start)])
+
+    return Agent([in_stream], [out_stream], transition, window_start_time,
+                 call_streams, name)
+
+def tumbling_window_array(
+        ufunc, in_stream, out_stream, window_duration,
+        window_start_time=0, call_streams=None, name=None):
+    """
+    Same as timed_window_array with step_time equal to
+    window_duration: the windows do not overlap.
+
+    """
+    return timed_window_array(
+        ufunc, in_stream, out_stream, window_duration, window_duration,
+        window_start_time, call_streams, name)
+
+def session_window_array(
+        ufunc, in_stream, out_stream, gap, call_streams=None, name=None):
+    """
+    Parameters
+    ----------
+        ufunc: NumPy ufunc
+           The function, such as np.add or np.maximum, that reduces
+           the values in a session.
+        in_stream: StreamArray
+           The timed input stream. Its dtype is timed_dtype().
+        out_stream: StreamArray
+           The timed output stream. Its dtype is timed_dtype().
+        gap: number (int or float)
+           A session is a maximal sequence of elements in which the
+           time between successive elements is less than gap.
+        call_streams: list of Stream
+           The list of call_streams. A new value in any stream in this
+           list causes a state transition of this agent.
+        name: Str
+           Name of the agent created by this function.
+    Returns
+    -------
+        Agent.
+         The agent created by this function.
+    Notes
+    -----
+        A session ends at T + gap where T is the time of its last
+        element, and the time of the output for the session is
+        T + gap. The output is produced when an element with time at
+        least T + gap arrives.
+
+    """
+    check_timed_stream_array(name, 'in_stream', in_stream)
+    check_timed_stream_array(name, 'out_stream', out_stream)
+    assert gap > 0, 'In agent {0}, gap must be positive'.format(name)
+
+    def transition(in_lists, state):
+        in_list = in_lists[0]
+        input_array = in_list.list[in_list.start:in_list.stop]
+        times = input_array['time']
+        # starts[j] is the index of the first element of session j.
+        # The last session may get more elements, and so it is not
+        # output.
+        starts = np.flatnonzero(np.diff(times) >= gap) + 1
+        if len(starts) == 0:
+            return ([make_output(out_stream, [], [])], state, [in_list.start])
+        starts = np.concatenate(([0], starts))
+        values = input_array['value'][:starts[-1]]
+        output = make_output(out_stream, times[starts[1:] - 1] + gap,
+                             ufunc.reduceat(values, starts[:-1]))
+        return ([output], state, [in_list.start + int(starts[-1])])
+
+    return Agent([in_stream], [out_stream], transition, None,
+                 call_streams, name)
+
+def timed_window_array_f(ufunc, in_stream, window_duration, step_time,
+                         window_start_time=0):
+    out_stream = StreamArray(ufunc.__name__+in_stream.name, dtype=in_stream.dtype)
+    timed_window_array(ufunc, in_stream, out_stream, window_duration,
+                       step_time, window_start_time)
+    return out_stream
+
+def tumbling_window_array_f(ufunc, in_stream, window_duration,
+                            window_start_time=0):
+    out_stream = StreamArray(ufunc.__name__+in_stream.name, dtype=in_stream.dtype)
+    tumbling_window_array(ufunc, in_stream, out_stream, window_duration,
+                          window_start_time)
+    return out_stream
+
+def session_window_array_f(ufunc, in_stream, gap):
+    out_stream = StreamArray(ufunc.__name__+in_stream.name, dtype=in_stream.dtype)
+    session_window_array(ufunc, in_stream, out_stream, gap)
+    return out_stream
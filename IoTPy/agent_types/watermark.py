@@ -0,0 +1,185 @@
+"""
+This module has agents for timed streams whose elements may arrive
+out of order. An element of a timed stream is a tuple or a list
+where element[0] is the time of the element (its event time).
+
+The timed agents, timed_zip, timed_window and timed_mix, require
+each input stream to be increasing in time. The agent reorder puts
+the elements of a stream that arrive out of order, by a bounded
+amount, into order of time.
+
+Watermarks
+----------
+A watermark W is a promise that no more elements with time less
+than W will arrive. reorder keeps the elements with time W or
+later in a reorder buffer (a heap), and outputs the elements with
+time less than W, in order of time, when the watermark advances to
+W. The watermark advances in two ways:
+(1) Punctuation: the stream contains Watermark(W).
+(2) Maximum lateness: if max_lateness is not None, then the
+    watermark is T - max_lateness where T is the latest time of
+    any element that has arrived.
+An element that arrives with time less than the watermark is late.
+Late elements are put into late_stream, if it is specified, and
+are otherwise discarded. So, the reorder buffer only has elements
+with times in [W, T], and its size is proportional to the lateness
+bound rather than to the length of the stream.
+
+Functions in the module:
+   1. reorder
+   2. reorder_f
+   3. watermark_timed_window
+   4. watermark_timed_zip
+   5. watermark_timed_mix
+
+"""
+import heapq
+
+from ..core.stream import Stream
+from ..core.agent import Agent
+# stream, agent are in ../core
+from .check_agent_parameter_types import *
+from .op import timed_window
+from .merge import timed_zip, merge_asynch
+
+class Watermark(object):
+    """
+    Punctuation in a timed stream: no more elements with time less
+    than self.time will arrive.
+
+    """
+    def __init__(self, time):
+        self.time = time
+    def __repr__(self):
+        return 'Watermark({0})'.format(self.time)
+
+def reorder(in_stream, out_stream, max_lateness=None, late_stream=None,
+            call_streams=None, name=None):
+    """
+    Parameters
+    ----------
+        in_stream: Stream
+           A timed stream, which may contain Watermark punctuation,
+           whose elements may arrive out of order.
+        out_stream: Stream
+           The elements of in_stream, other than late elements and
+           punctuation, in order of time. Elements with the same
+           time are in order of arrival.
+        max_lateness: number, optional
+           The watermark is at least the latest time of any element
+           minus max_lateness. If max_lateness is None then the
+           watermark is advanced only by punctuation.
+        late_stream: Stream, optional
+           The stream of late elements.
+        call_streams: list of Stream
+           The list of call_streams. A new value in any stream in this
+           list causes a state transition of this agent.
+        name: Str
+           Name of the agent created by this function.
+    Returns
+    -------
+        Agent.
+         The agent created by this function.
+
+    """
+    check_stream_type(name, 'in_stream', in_stream)
+    check_stream_type(name, 'out_stream', out_stream)
+    out_streams = [out_stream] if late_stream is None \
+      else [out_stream, late_stream]
+    # state is (heap, watermark, latest time, number of elements
+    # that have arrived). An entry of the heap is (time, arrival
+    # number, element); the arrival number keeps elements with the
+    # same time in order of arrival.
+    state = ([], None, None, 0)
+
+    def transition(in_lists, state):
+        heap, watermark, latest_time, num_arrivals = state
+        in_list = in_lists[0]
+        output_list = []
+        late_list = []
+        for element in in_list.list[in_list.start:in_list.stop]:
+            if isinstance(element, Watermark):
+                if watermark is None or element.time > watermark:
+                    watermark = element.time
+                continue
+            element_time = element[0]
+            if watermark is not None and element_time < watermark:
+                late_list.append(element)
+                continue
+            heapq.heappush(heap, (element_time, num_arrivals, element))
+            num_arrivals += 1
+            if latest_time is None or element_time > latest_time:
+                latest_time = element_time
+                if max_lateness is not None and (
+                        watermark is None or
+                        latest_time - max_lateness > watermark):
+                    watermark = latest_time - max_lateness
+        # Output the elements with times less than the watermark.
+        while heap and watermark is not None and heap[0][0] < watermark:
+            output_list.append(heapq.heappop(heap)[2])
+        output_lists = [output_list] if late_stream is None \
+          else [output_list, late_list]
+        return (output_lists, (heap, watermark, latest_time, num_arrivals),
+                [in_list.stop])
+
+    return Agent([in_stream], out_streams, transition, state, call_streams, name)
+
+def reorder_f(in_stream, max_lateness=None, late_stream=None):
+    out_stream = Stream('reorder:' + in_stream.name)
+    reorder(in_stream, out_stream, max_lateness, late_stream)
+    return out_stream
+
+def watermark_timed_window(
+        func, in_stream, out_stream, window_duration, step_time,
+        max_lateness=None, late_stream=None, window_start_time=0,
+        state=None, name=None):
+    """
+    Same as timed_window in op.py except that the elements of
+    in_stream may arrive out of order. See reorder for max_lateness
+    and late_stream. A window is output when the watermark passes
+    the end of the window.
+
+    """
+    ordered_stream = Stream('ordered:' + in_stream.name)
+    reorder(in_stream, ordered_stream, max_lateness, late_stream)
+    return timed_window(func, ordered_stream, out_stream, window_duration,
+                        step_time, window_start_time, state, None, name)
+
+def watermark_timed_zip(in_streams, out_stream, max_lateness=None,
+                        late_streams=None, name=None):
+    """
+    Same as timed_zip in merge.py except that the elements of each
+    stream in in_streams may arrive out of order. See reorder for
+    max_lateness. late_streams[i], if specified, is the stream of
+    late elements of in_streams[i].
+
+    """
+    ordered_streams = []
+    for i, in_stream in enumerate(in_streams):
+        ordered_stream = Stream('ordered:' + in_stream.name)
+        reorder(in_stream, ordered_stream, max_lateness,
+                None if late_streams is None else late_streams[i])
+        ordered_streams.append(ordered_stream)
+    return timed_zip(ordered_streams, out_stream, name=name)
+
+def watermark_timed_mix(in_streams, out_stream, max_lateness=None,
+                        late_stream=None, name=None):
+    """
+    Merges timed streams whose elements may arrive out of order. An
+    element of out_stream is (time, (i, value)) where (time, value)
+    is an element of in_streams[i]. Elements are in order of time;
+    unlike timed_mix in merge.py, elements with the same time are
+    not discarded. Watermark punctuation in any input stream applies
+    to all the input streams. See reorder for max_lateness and
+    late_stream.
+
+    """
+    def tag(index_and_element):
+        index, element = index_and_element
+        if isinstance(element, Watermark):
+            return element
+        return (element[0], (index, element[1]))
+    mixed_stream = Stream('mixed')
+    merge_asynch(tag, in_streams, mixed_stream)
+    return reorder(mixed_stream, out_stream, max_lateness, late_stream,
+                   name=name)
@@ -0,0 +1,201 @@
+"""
+This module has the brokers used by PikaPublisher and
+PikaSubscriber to send messages (see pika_publication_agent.py and
+pika_subscribe_agent.py).
+
+PikaBroker sends messages through a RabbitMQ server. A process
+that has many publishers uses a single connection, and a single
+channel, for each host: get_pika_broker(host) returns the same
+PikaBroker for all publishers of the host.
+
+LocalBroker is an in-process stand-in for a RabbitMQ server with
+direct exchanges. It is used to test and benchmark publishers and
+subscribers without RabbitMQ.
+
+A broker has the methods:
+    exchange_declare(exchange)
+    publish(exchange, routing_key, body, content_type)
+    consume(exchange, routing_key, prefetch_count, inactivity_timeout)
+    acknowledge(delivery_tag)
+    close()
+consume() binds a new queue to the exchange, and returns a
+generator of the messages (delivery_tag, body, content_type) in the
+queue; the generator yields None when no message arrives for
+inactivity_timeout seconds.
+acknowledge(delivery_tag) acknowledges all messages up to, and
+including, the message with delivery_tag.
+
+"""
+import threading
+import sys
+# Check the version of Python
+is_py2 = sys.version[0] == '2'
+if is_py2:
+    import Queue as queue
+else:
+    import queue as queue
+# pika is required only to connect to a RabbitMQ server.
+try:
+    import pika
+except ImportError:
+    pika = None
+
+# The content types of messages. A message with content type
+# SEGMENT_CONTENT_TYPE is a segment encoded by encode_segment() in
+# segment_encoding.py.
+JSON_CONTENT_TYPE = 'application/json'
+SEGMENT_CONTENT_TYPE = 'application/x-iotpy-segment'
+
+class PikaBroker(object):
+    """
+    A connection and a channel to the RabbitMQ server on host that
+    are shared by publishers. A BlockingConnection is not thread
+    safe, and so publishing is serialized by a lock.
+
+    """
+    def __init__(self, host):
+        assert pika is not None, 'pika is required to connect to RabbitMQ'
+        self.host = host
+        self.connection = pika.BlockingConnection(
+            pika.ConnectionParameters(host=self.host))
+        self.channel = self.connection.channel()
+        self.lock = threading.Lock()
+        self.exchanges = set()
+        self.properties = {}
+        # The number of users of this broker. See get_pika_broker().
+        self.num_users = 0
+
+    def exchange_declare(self, exchange):
+        with self.lock:
+            if exchange not in self.exchanges:
+                self.channel.exchange_declare(
+                    exchange=exchange, exchange_type='direct')
+                self.exchanges.add(exchange)
+
+    def publish(self, exchange, routing_key, body, content_type):
+        with self.lock:
+            if content_type not in self.properties:
+                self.properties[content_type] = pika.BasicProperties(
+                    content_type=content_type)
+            self.channel.basic_publish(
+                exchange=exchange, routing_key=routing_key, body=body,
+                properties=self.properties[content_type])
+
+    def consume(self, exchange, routing_key, prefetch_count,
+                inactivity_timeout):
+        # A consuming broker is used by a single thread. See
+        # PikaBatchSubscriber.
+        self.exchange_declare(exchange)
+        result = self.channel.queue_declare(queue='', exclusive=True)
+        queue_name = result.method.queue
+        self.channel.queue_bind(
+            exchange=exchange, queue=queue_name, routing_key=routing_key)
+        # The server sends at most prefetch_count messages that have
+        # not been acknowledged.
+        self.channel.basic_qos(prefetch_count=prefetch_count)
+        return self.messages(queue_name, inactivity_timeout)
+
+    def messages(self, queue_name, inactivity_timeout):
+        try:
+            for method, properties, body in self.channel.consume(
+                    queue_name, inactivity_timeout=inactivity_timeout):
+                if method is None:
+                    yield None
+                else:
+                    yield method.delivery_tag, body, properties.content_type
+        finally:
+            self.channel.cancel()
+
+    def acknowledge(self, delivery_tag):
+        self.channel.basic_ack(delivery_tag=delivery_tag, multiple=True)
+
+    def close(self):
+        """
+        Closes the connection when its last user closes it.
+
+        """
+        with _pika_brokers_lock:
+            if _pika_brokers.get(self.host) is self:
+                self.num_users -= 1
+                if self.num_users > 0:
+                    return
+                del _pika_brokers[self.host]
+        self.connection.close()
+
+# _pika_brokers[host] is the PikaBroker of host.
+_pika_brokers = {}
+_pika_brokers_lock = threading.Lock()
+
+def get_pika_broker(host):
+    """
+    Returns the PikaBroker of host, and creates it if this process
+    does not have one. Each call must be matched by a call to
+    close() of the broker.
+
+    """
+    with _pika_brokers_lock:
+        if host not in _pika_brokers:
+            _pika_brokers[host] = PikaBroker(host)
+        broker = _pika_brokers[host]
+        broker.num_users += 1
+        return broker
+
+
+class LocalBroker(object):
+    """
+    An in-process broker with direct exchanges. A message published
+    with a routing key is put into every queue bound to the exchange
+    with that routing key.
+
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        # bindings[(exchange, routing_key)] is a list of queues.
+        self.bindings = {}
+        self.num_messages = 0
+        self.num_acknowledgements = 0
+
+    def exchange_declare(self, exchange):
+        pass
+
+    def bind(self, exchange, routing_key):
+        """
+        Returns a new queue bound to exchange with routing_key. Each
+        element of the queue is a pair (body, content_type).
+
+        """
+        q = queue.Queue()
+        with self.lock:
+            self.bindings.setdefault((exchange, routing_key), []).append(q)
+        return q
+
+    def publish(self, exchange, routing_key, body, content_type):
+        with self.lock:
+            self.num_messages += 1
+            queues = list(self.bindings.get((exchange, routing_key), []))
+        for q in queues:
+            q.put((body, content_type))
+
+    def consume(self, exchange, routing_key, prefetch_count,
+                inactivity_timeout):
+        # Messages are not redelivered; so, prefetch_count is ignored.
+        return self.messages(self.bind(exchange, routing_key),
+                             inactivity_timeout)
+
+    def messages(self, q, inactivity_timeout):
+        delivery_tag = 0
+        while True:
+            try:
+                body, content_type = q.get(timeout=inactivity_timeout)
+            except queue.Empty:
+                yield None
+                continue
+            delivery_tag += 1
+            yield delivery_tag, body, content_type
+
+    def acknowledge(self, delivery_tag):
+        with self.lock:
+            self.num_acknowledgements += 1
+
+    def close(self):
+        pass
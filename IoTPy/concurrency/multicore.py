@@ -1,7 +1,10 @@
 """
 This module makes processes for a multicore application.
 It uses multiprocessing.Array to enable multiple processes to
-share access to streams efficiently.
+share access to streams efficiently. Streams of arbitrary
+Python objects (type 'x') and streams of rows of a NumPy dtype
+and shape are shared through buffers in
+multiprocessing.shared_memory; see shared_buffers.py.
 
 TO DO: remove source_keyword_args because you can have multiple
 sources.
@@ -20,16 +23,26 @@ import multiprocessing
 # be shared across processes.
 import threading
 import time
+# NumPy dtypes are used for StreamArray input streams.
+import numpy as np
 
 from ..agent_types.sink import sink_list, sink_element
 # sink, op are in ../agent_types.
 
 from ..core.compute_engine import ComputeEngine
-from ..core.stream import Stream
-from ..core.system_parameters import  BUFFER_SIZE, MAX_NUM_SOURCES, MAX_NUM_PROCESSES
+from ..core.stream import Stream, StreamArray
+from ..core.system_parameters import  BUFFER_SIZE
+from ..core.system_parameters import OBJECT_BUFFER_SIZE
 # compute_engine, stream and system_parameters are in ../core.
 from .utils import check_processes_connections_format, check_connections_validity
-# utils is in current folder.
+from .shared_buffers import SharedArrayBuffer, SharedObjectBuffer
+from .shared_buffers import SharedNDArrayBuffer, dtype_and_shape, row_size
+from .placement import make_placement, pin_process
+# utils, shared_buffers and placement are in current folder.
+
+# Colors of processes and of the token used in termination detection.
+WHITE = 0
+BLACK = 1
 
 #-----------------------------------------------------------------------
 class MulticoreProcess(object):
@@ -47,7 +60,13 @@ class MulticoreProcess(object):
     Streams is a list of 2-tuples:
         (stream_name, stream,type)
         stream_type is a single character: 'i', 'f', 'd'
-        for int, float, double, ... etc.
+        for int, float, double, ... etc. or 'x' for a
+        stream of arbitrary (picklable) Python objects.
+        stream_type can also be a NumPy dtype of the rows of
+        the stream. Examples: (np.float64, 3) for rows of 3
+        floats, ('f8', (2, 2)) for 2 x 2 arrays, and
+        [('time', 'f8'), ('value', 'f8', 3)] for records
+        with a time field.
         This is a list of all the streams that connect
         processes.
         
@@ -89,6 +108,10 @@ class MulticoreProcess(object):
        Default: empty list
        Inputs describes the input streams of the agent associated
        with this process.
+       An input stream whose type is a C datatype, such as 'i', or
+       a NumPy dtype is a StreamArray with the corresponding NumPy
+       dtype and the shape of its rows. An input stream of type 'x'
+       is a Stream.
     outputs : list
        Similar to inputs.
        Example of outputs = [('out', 'i')]
@@ -161,13 +184,31 @@ class MulticoreProcess(object):
        a source.
 
     """
-    def __init__(self, spec, connect_streams, name):
+    def __init__(self, spec, connect_streams, name,
+                 buffer_size=BUFFER_SIZE,
+                 object_buffer_size=OBJECT_BUFFER_SIZE,
+                 in_queue=None, slabs=None):
         """
         Parameters
         ----------
         spec: dict
         connect_streams: list
         name: str
+        buffer_size: int, optional
+           The number of elements in the buffer of each output
+           stream or source of a C datatype.
+        object_buffer_size: int, optional
+           The number of bytes in the buffer of each output stream
+           or source of type 'x'.
+        in_queue: multiprocessing.Queue, optional
+           The input queue of this process. A new queue is created
+           if in_queue is not specified.
+        slabs: dict, optional
+           slabs[out_stream_name] is the SharedSlab used by the buffer
+           of the output stream or source called out_stream_name. If
+           slabs is not specified then each buffer allocates its own
+           shared memory. Buffers are limited to the size of their
+           slabs. See multicore_pool.py.
 
         spec is the specification of this process.
         An example of spec is:
@@ -212,8 +253,8 @@ class MulticoreProcess(object):
         Step 3: Create out_to_buffer and the buffers associated with each
                 output stream. These buffers are used to share data across
                 processes.
-        Step 4: Create the parameters of this process including main_lock used
-                to control access to queues used for termination detection and
+        Step 4: Create the parameters of this process including parameters
+                used for termination detection and
                 out_to_q_and_in_stream_signal_names, in_queue....
 
         """
@@ -315,56 +356,77 @@ class MulticoreProcess(object):
         # ---------------------------------------------------------------------
         #  STEP 3: CREATE OUT_TO_BUFFER AND BUFFERS FOR EACH OUTPUT STREAM.
         # ---------------------------------------------------------------------
-        # out_to_buffer[out_stream_name] is (buffer, buffer_ptr) which is
-        # the buffer to which this out_stream_name or source_name is connected.
+        # out_to_buffer[out_stream_name] is the buffer to which this
+        # out_stream_name or source_name is connected. The buffer is a
+        # SharedArrayBuffer for a stream of a C datatype, and a
+        # SharedObjectBuffer for a stream of type 'x'. The buffer has a
+        # read cursor for each input stream connected to the output
+        # stream. See shared_buffers.py.
         # Next, compute out_to_buffer.
         self.out_to_buffer = {}
         # create a buffer for each out_stream and each source of this process.
-        # 1. Create a buffer for each out_stream of this process.
-        # self.out_to_buffer[out_stream_name] becomes the buffer for 
+        # self.out_to_buffer[out_stream_name] becomes the buffer for
         # the stream called out_stream_name.
-        # self.outputs is a list of pairs:
+        # self.outputs and self.sources are lists of pairs:
         #                   ( out_stream_name, out_stream_type)
-        for out_stream_name, out_stream_type in self.outputs:
-            if out_stream_type != 'x':
-                buffer = multiprocessing.Array(out_stream_type, BUFFER_SIZE)
-                # buffer_ptr is an integer with initial value of 0.
-                buffer_ptr = multiprocessing.Value('i', 0)
+        for out_stream_name, out_stream_type in self.outputs + self.sources:
+            # num_readers is the number of input streams connected to
+            # this output stream.
+            if out_stream_name in self.out_to_in:
+                num_readers = len(self.out_to_in[out_stream_name])
             else:
-                # out_stream_type of 'x' means a type that is not allowed
-                # in multiprocessing.Array. So, a buffer of this type cannot
-                # be used to share data across processors. Such a buffer can
-                # only be used in the process in which it is defined.
-                buffer = [0]*BUFFER_SIZE
-                # buffer_ptr is an integer with initial value of 0.
-                buffer_ptr = multiprocessing.Value('i', 0)
-                    
-            self.out_to_buffer[out_stream_name] =  (buffer, buffer_ptr)
-                
-        # 2. Create a buffer for each source of this process.
-        # self.out_to_buffer[source_name] is the buffer for the source called
-        # source_name
-        for source_name, source_type in self.sources:
-            #source_type  = source_type_and_func['type']
-            if source_type != 'x':
-                # This source generates data of a type accepted by
-                # multiprocessing.Array
-                buffer = multiprocessing.Array(source_type, BUFFER_SIZE)
-                # buffer_ptr is a shared integer with initial value of 0.
-                buffer_ptr = multiprocessing.Value('i', 0)
+                num_readers = 0
+            # slab is the reused shared memory of the buffer, if any.
+            if slabs is not None:
+                slab = slabs[out_stream_name]
             else:
-                # This source feeds a stream inside the same process in
-                # which the source thread runs. This source does not feed
-                # any other process. So, it does not need to use
-                # multiprocessing.Array.
-                # This source can generate arbitrary Python objects such as
-                # tuples.
-                # Note that if source_type == 'x' then buffer is a list and
-                # buffer_ptr is an integer.
-                buffer = [0]*BUFFER_SIZE
-                # buffer_ptr is an integer with initial value of 0.
-                buffer_ptr = 0
-            self.out_to_buffer[source_name] =  (buffer, buffer_ptr)
+                slab = None
+            if out_stream_type == 'x':
+                size = object_buffer_size
+                if slab is not None:
+                    size = min(size, slab.num_bytes)
+            else:
+                size = buffer_size
+                if slab is not None:
+                    size = min(size, slab.num_bytes // row_size(out_stream_type))
+            if is_typecode(out_stream_type):
+                # The buffer is a multiprocessing.Array of the C
+                # datatype specified by out_stream_type.
+                buffer = SharedArrayBuffer(
+                    out_stream_type, num_readers, size,
+                    name=out_stream_name, slab=slab)
+            elif out_stream_type != 'x':
+                # The buffer is an array of rows of the NumPy dtype and
+                # shape specified by out_stream_type, in shared memory.
+                buffer = SharedNDArrayBuffer(
+                    out_stream_type, num_readers, size,
+                    name=out_stream_name, slab=slab)
+            else:
+                # out_stream_type of 'x' means a type that is not allowed
+                # in multiprocessing.Array. Segments of the stream are
+                # pickled into a SharedObjectBuffer which is shared across
+                # processes.
+                buffer = SharedObjectBuffer(
+                    num_readers, size, name=out_stream_name, slab=slab)
+            self.out_to_buffer[out_stream_name] = buffer
+
+        # num_signals_sent[out_to_signal_id[out_stream_name]] is the
+        # number of signals that this process has sent to receivers
+        # of the output stream or source called out_stream_name.
+        # Each output stream or source is written by a single thread
+        # --- the compute thread or a source thread --- and so each
+        # element of num_signals_sent has a single writer, and no lock
+        # is needed.
+        # num_signals_received is the number of signals that this
+        # process has received and processed. It is written only by
+        # the compute thread of this process.
+        # These counts are used to detect termination. See idle().
+        self.out_to_signal_id = dict(
+            [(out_stream_name, i) for i, (out_stream_name, out_stream_type)
+             in enumerate(self.outputs + self.sources)])
+        self.num_signals_sent = multiprocessing.Array(
+            'q', max(len(self.out_to_signal_id), 1), lock=False)
+        self.num_signals_received = multiprocessing.Value('q', 0, lock=False)
 
         # ---------------------------------------------------------------------
         #  STEP 4: MAKE PARAMETERS OF THE PROCESS
@@ -385,7 +447,9 @@ class MulticoreProcess(object):
         self.out_to_q_and_in_stream_signal_names = {}
         # in_queue is the input queue of this process. Messages for
         #    the process' input streams are put in in_queue.
-        self.in_queue = multiprocessing.Queue()
+        if in_queue is None:
+            in_queue = multiprocessing.Queue()
+        self.in_queue = in_queue
         # process is initially None and is created later by calling
         #    the function make_process() with parameters
         #    process specification and connections.
@@ -395,25 +459,37 @@ class MulticoreProcess(object):
         #    in_to_out is filled in by the function
         #    make_in_to_out()
         self.in_to_out = {}
-        # in_to_buffer[in_stream_name] is a buffer. Data in this buffer
-        #    is copied into the input stream called in_stream_name.
+        # in_to_buffer[in_stream_name] is a pair (buffer, reader_id).
+        #    Data in this buffer is copied into the input stream called
+        #    in_stream_name. reader_id identifies the read cursor of the
+        #    input stream in the buffer.
         #    in_to_buffer is computed by the function make_in_to_out().
         self.in_to_buffer = {}
         # The following parameters are set by calling:
         #    multicore(process_specs, connect_streams)
         self.process_ids = {}
-        self.source_ids = {}
-        self.source_status = {}
-        self.queue_status = {}
         self.all_process_specs = {}
         self.all_procs = {}
-        # main_lock is the lock acquired to do operations on
-        #   in_queue of processes. These operations check whether the
-        #   input queues of all the processes are empty.
-        #   Termination of the multiprocess computation is detected
-        #   when all processes have empty input queues and all sources
-        #   have finished.
-        self.main_lock = None
+        # next_proc is the next process in the ring of processes
+        #   through which the termination detection token is passed.
+        self.next_proc = None
+        # The following parameters are used for termination detection.
+        #   See idle().
+        # unfinished_sources is the set of names of sources of this
+        #   process that have not finished.
+        self.unfinished_sources = set(
+            [source_name for source_name, source_type in self.sources])
+        # token is the termination detection token, a pair (count, color),
+        #   when this process holds the token, and None otherwise.
+        #   Initially the process with id 0 holds the token.
+        self.token = None
+        # color is BLACK if this process has received a signal since it
+        #   last forwarded the token.
+        self.color = WHITE
+        # cpus is the list of CPUs to which this process is pinned, or
+        #   None if the operating system places the process.
+        #   See placement.py.
+        self.cpus = None
         return
     #-----------------------------------------------------------------
     # FINISHED __init__()
@@ -423,8 +499,10 @@ class MulticoreProcess(object):
     def make_in_to_out(self, procs, connections):
         """
         Computes self.in_to_out and self.in_to_buffer
-        self.in_to_buffer[in_stream_name] is the buffer that feeds
-            the input stream called in_stream_name.
+        self.in_to_buffer[in_stream_name] is the pair (buffer, reader_id)
+            where buffer feeds the input stream called in_stream_name
+            and reader_id is the index of the read cursor of the input
+            stream in the buffer.
         self.in_to_out[in_stream_name] is the pair
             (out_process_name, out_stream_name) which identifies
             the output process and output stream connected to the
@@ -442,7 +520,8 @@ class MulticoreProcess(object):
         """
         for out_process_name, process_connections in connections.items():
             for out_stream_name, stream_connections in process_connections.items():
-                for in_process_name, in_stream_name in stream_connections:
+                for reader_id, (in_process_name, in_stream_name) in \
+                  enumerate(stream_connections):
                     if in_process_name == self.name:
                         # The out_stream called out_stream_name in the
                         # process called out_process_name is connected
@@ -455,7 +534,7 @@ class MulticoreProcess(object):
                         # Get the output buffer in which data from the sending
                         # stream is placed.
                         out_buffer = out_process.out_to_buffer[out_stream_name]
-                        self.in_to_buffer[in_stream_name] = out_buffer
+                        self.in_to_buffer[in_stream_name] = (out_buffer, reader_id)
         return
 
     def make_out_to_q_and_in_stream_signal_names(self, procs):
@@ -535,7 +614,23 @@ class MulticoreProcess(object):
         # input or output stream and the value is the stream itself.
         self.name_to_stream = {}
         for in_stream_name, in_stream_type in self.inputs:
-            in_stream = Stream(name=in_stream_name)
+            if in_stream_type != 'x':
+                # The in_stream is fed by an array of a C datatype or
+                # NumPy dtype. So, make the in_stream a StreamArray with
+                # the same NumPy dtype and row shape as the buffer.
+                # Segments of the buffer are copied into the stream
+                # without creating a Python object for each element.
+                dtype, shape = dtype_and_shape(in_stream_type)
+                if len(shape) == 0:
+                    dimension = 0
+                elif len(shape) == 1:
+                    dimension = shape[0]
+                else:
+                    dimension = shape
+                in_stream = StreamArray(
+                    name=in_stream_name, dimension=dimension, dtype=dtype)
+            else:
+                in_stream = Stream(name=in_stream_name)
             self.in_streams.append(in_stream)
             self.name_to_stream[in_stream_name] = in_stream
 
@@ -616,14 +711,15 @@ class MulticoreProcess(object):
             in_stream_signal = self.name_to_stream[in_stream_signal_name]
             # Get the in_stream from its name
             in_stream = self.name_to_stream[in_stream_name]
-            # Get the buffer that feeds this in_stream.
-            buffer, buffer_ptr = self.in_to_buffer[in_stream_name]
+            # Get the buffer that feeds this in_stream and the id of
+            # the read cursor of this in_stream in the buffer.
+            buffer, reader_id = self.in_to_buffer[in_stream_name]
             # Create agents
             sink_element(
                 func=copy_buffer_segment,
                 in_stream=in_stream_signal,
                 out_stream=in_stream,
-                buffer=buffer, in_stream_type=in_stream_type,
+                buffer=buffer, reader_id=reader_id,
                 name='copy_buffer_segment: in_stream is ' + in_stream.name)
         
     def create_source_threads(self):
@@ -641,84 +737,87 @@ class MulticoreProcess(object):
     # MAKE THE PROCESS.
     #---------------------------------------------------------------------
     def make_process(self):
-        def target():
-            """
-            This is the target function of this process. This function has the
-            following steps:
-            1. Create in_streams of the this process, i.e., the in_streams of
-               the agent of the process.
-            2. Create in_stream_signals, with an in_stream_signal corresponding
-               to each in_stream.
-            3. Create out_streams of this process, i.e. out_streams of the
-               agent of this process.
-            4. Create the computational agent (agent) of this process.
-            5. For each out_stream of agent, create an agent to copy the
-               out_stream to its buffer, and then copy the buffer to each
-               in_stream to which it is connected.
-            6. For each in_stream of agent, create an agent to copy its
-               input buffer into the in_stream.
-            7. Create the scheduler for this process. Starting the scheduler
-               starts the thread that executes agent for this agent.
-            8. Create the source threads for each source in this process. The
-               source_thread gets data from a source, puts the data into a
-               buffer, and then copies the buffer to each in_queue to which the
-               source is connected.
-            9. Start the scheduler and source threads.
-            10. Join the scheduler and source threads.
-               
-            """
-            # 1. Create input streams of this process.
-            self.create_in_streams_of_agent()
-            # 2. Create input signal streams corresponding to input streams.
-            self.create_in_stream_signals_for_C_datatypes()
-            # 3. Create output streams of this process.
-            self.create_out_streams_for_agent()
-            # 4. For each out_stream and each source, create an agent to
-            #    copy data from the out_stream or source to all the
-            #    in_streams to which it is connected.
-            self.create_agents_to_copy_each_out_stream_to_in_streams()
-            self.create_agents_to_copy_buffers_to_in_streams()
-
-            # CREATE A NEW STREAM.SCHEDULER FOR THIS PROCESS
-            # Specify the scheduler, input_queue and name_to_stream for
-            # this processes.
-            Stream.scheduler = ComputeEngine(self)
-            # input_queue is the queue into which all streams for this
-            # process are routed.
-            Stream.scheduler.input_queue = self.in_queue
-            # The scheduler for a process uses a dict, name_to_stream.
-            # name_to_stream[stream_name] is the stream with the name stream_name.
-            Stream.scheduler.name_to_stream = self.name_to_stream
-
-            # CREATE THE COMPUTE FUNCTION FOR THIS PROCESS.
-            # self.agent is a function that creates a network of agents.
-            self.agent(
-                self.in_streams, self.out_streams,
-                *self.args, **self.keyword_args)
-            
-            self.create_source_threads()
-
-            # START SOURCE THREADS AND START SCHEDULER.
-            # Starting the scheduler starts a thread --- the main thread --- of this
-            # process. The scheduler thread gets a ready agent from the in_queue of
-            # this process and then executes the next step of the agent.
-            Stream.scheduler.start()
-            for thread in self.threads: thread.start()
-            for thread in self.source_threads: thread.start()
-
-            # JOIN SOURCE THREADS AND JOIN SCHEDULER.
-            for thread in self.source_threads: thread.join()
-            Stream.scheduler.join()
-            # Put '_finished' on each of the output queues so that threads getting
-            # messages from these output queues can terminate upon getting a
-            # '_finished' message instead of hanging.
-            for output_queue in self.output_queues:
-                output_queue.put('_finished')
-            for thread in self.threads: thread.join()
-            return
-
         # Create the process.
-        self.process = multiprocessing.Process(target=target)
+        self.process = multiprocessing.Process(target=self.run)
+
+    def run(self):
+        """
+        This is the target function of this process. It is run in a
+        multiprocessing.Process made by make_process() or in a worker
+        of a MulticorePool. This function has the following steps:
+        0. Pin this process to its CPUs if a placement is specified.
+        1. Create in_streams of the this process, i.e., the in_streams of
+           the agent of the process.
+        2. Create in_stream_signals, with an in_stream_signal corresponding
+           to each in_stream.
+        3. Create out_streams of this process, i.e. out_streams of the
+           agent of this process.
+        4. Create the computational agent (agent) of this process.
+        5. For each out_stream of agent, create an agent to copy the
+           out_stream to its buffer, and then copy the buffer to each
+           in_stream to which it is connected.
+        6. For each in_stream of agent, create an agent to copy its
+           input buffer into the in_stream.
+        7. Create the scheduler for this process. Starting the scheduler
+           starts the thread that executes agent for this agent.
+        8. Create the source threads for each source in this process. The
+           source_thread gets data from a source, puts the data into a
+           buffer, and then copies the buffer to each in_queue to which the
+           source is connected.
+        9. Start the scheduler and source threads.
+        10. Join the scheduler and source threads.
+           
+        """
+        # 0. Pin this process to its CPUs.
+        pin_process(self.cpus)
+        # 1. Create input streams of this process.
+        self.create_in_streams_of_agent()
+        # 2. Create input signal streams corresponding to input streams.
+        self.create_in_stream_signals_for_C_datatypes()
+        # 3. Create output streams of this process.
+        self.create_out_streams_for_agent()
+        # 4. For each out_stream and each source, create an agent to
+        #    copy data from the out_stream or source to all the
+        #    in_streams to which it is connected.
+        self.create_agents_to_copy_each_out_stream_to_in_streams()
+        self.create_agents_to_copy_buffers_to_in_streams()
+
+        # CREATE A NEW STREAM.SCHEDULER FOR THIS PROCESS
+        # Specify the scheduler and name_to_stream for this process.
+        # The input_queue of the scheduler is self.in_queue, the
+        # multiprocessing.Queue into which all streams for this
+        # process are routed.
+        Stream.scheduler = ComputeEngine(self)
+        # The scheduler for a process uses a dict, name_to_stream.
+        # name_to_stream[stream_name] is the stream with the name stream_name.
+        Stream.scheduler.name_to_stream = self.name_to_stream
+
+        # CREATE THE COMPUTE FUNCTION FOR THIS PROCESS.
+        # self.agent is a function that creates a network of agents.
+        self.agent(
+            self.in_streams, self.out_streams,
+            *self.args, **self.keyword_args)
+        
+        self.create_source_threads()
+
+        # START SOURCE THREADS AND START SCHEDULER.
+        # Starting the scheduler starts a thread --- the main thread --- of this
+        # process. The scheduler thread gets a ready agent from the in_queue of
+        # this process and then executes the next step of the agent.
+        Stream.scheduler.start()
+        for thread in self.threads: thread.start()
+        for thread in self.source_threads: thread.start()
+
+        # JOIN SOURCE THREADS AND JOIN SCHEDULER.
+        for thread in self.source_threads: thread.join()
+        Stream.scheduler.join()
+        # Put '_finished' on each of the output queues so that threads getting
+        # messages from these output queues can terminate upon getting a
+        # '_finished' message instead of hanging.
+        for output_queue in self.output_queues:
+            output_queue.put('_finished')
+        for thread in self.threads: thread.join()
+        return
 
     #---------------------------------------------------------------------
     # COPY DATA FROM A BUFFER INTO A STREAM.
@@ -747,16 +846,22 @@ class MulticoreProcess(object):
                 (2) the list of pairs:
                 (receiving process queue, receiving input stream signal name).
         STEP 2: Copy data into the circular buffer which is the output buffer for
-                the stream called stream_name.
+                the stream called stream_name. If the buffer does not have
+                space for data that the receivers have not yet copied, then
+                this step waits until the receivers have copied enough data.
         STEP 3: Put a message into the queue of each receiving process that
                 is connected to this stream_name.
                 This message is put into an in_stream_signal of the receiving
                 process.
-        STEP 4: Update parameters to get ready for next call to this function.
+
+        A process whose agent both writes and reads the same buffer
+        (directly or through a cycle of processes) must have buffers
+        large enough for the data written in a single step; otherwise
+        the process waits for itself.
 
         """
         # STEP 1: GET BUFFER, QUEUE, STREAMS CONNECTED TO THIS STREAM
-        buffer, buffer_ptr = self.out_to_buffer[stream_name]
+        buffer = self.out_to_buffer[stream_name]
         # self.out_to_q_and_in_stream_signal_name is a dict where
         # self.out_to_q_and_in_stream_signal_names[stream_name] is
         # input queue of the receiver process and the list of in_stream
@@ -770,94 +875,144 @@ class MulticoreProcess(object):
         if n == 0:
             # Take no action if the message is empty.
             return None
-        assert n < BUFFER_SIZE, \
-          "The length of input data is greater than the buffer size"
-        if isinstance(buffer_ptr, int):
-            # This buffer is for a local stream.
-            # This buffer is a list and not a multiprocessing.Array
-            buffer_end_ptr = buffer_ptr + n
-            buffer_current_ptr = buffer_ptr
-        else:
-            # This buffer is a multiprocessing.Array
-            # buffer_ptr is  multiprocessing.Value
-            buffer_end_ptr = buffer_ptr.value + n
-            buffer_current_ptr = buffer_ptr.value
-        if buffer_end_ptr < BUFFER_SIZE:
-            # In this case, don't need to wrap around the
-            # end of the buffer.
-            buffer[buffer_current_ptr : buffer_end_ptr] = data
-        else:
-            # In this case, must wrap around the end of
-            # the circular buffer.
-            # remaining_space is the space remaining from
-            # buffer_ptr to the end of the buffer.
-            remaining_space = BUFFER_SIZE - buffer_end_ptr
-            # Copy remaining_space elements of the list
-            # to fill up the buffer.
-            buffer[buffer_current_ptr:] =  data[:remaining_space]
-            # That leaves n-remaining_space elements of the
-            # list that are yet to be copied into the buffer.
-            # Copy the remaining elements of list into the
-            # buffer starting from slot 0.
-            buffer[:n-remaining_space] = data[remaining_space:]
-            buffer_end_ptr = n-remaining_space
+        # buffer.write() waits for space in the buffer, copies data
+        # into the buffer and returns the positions of the segment.
+        # buffer.write() raises RuntimeError if the readers do not
+        # make space within MAX_WAIT_TIME seconds.
+        buffer_current_ptr, buffer_end_ptr = buffer.write(data)
 
         # STEP 3: TELL THE RECEIVER PROCESSES THAT THEY HAVE NEW
         # DATA.
-        # 1. Set the status of queues that will now get data to
-        # 'not empty' or 1.
-        # 2. Put a message into the queue of each process that
-        # receives a copy of data.
-
-        # Always acquire lock for operations on queue_status or
-        # source_status
-        self.main_lock.acquire()
-        # Step 3.1: Set queue status to "not empty" for queues that
-        #         receive this message.
-        for receiver in self.out_to_in[stream_name]:
-            # The output stream called stream_name is connected to the
-            # input stream called in_stream_name in the receiving
-            # process called receiver_proc_name.
-            receiver_proc_name, in_stream_name = receiver
-            receiver_process_id = self.process_ids[receiver_proc_name]
-            # queues status is 1 for not empty, 0 for empty.
-            self.queue_status[receiver_process_id] = 1
-        # Step 3.2: Send a message to the in_stream signal corresponding
-        #           to each in_stream saying that new data is available
-        #           in the buffer between pointers:
-        #             (buffer_ptr.value, buffer_end_ptr)
-        for q, in_stream_signal_name in q_and_in_stream_signal_names:
-            q.put((in_stream_signal_name, (buffer_current_ptr, buffer_end_ptr)))
-        self.main_lock.release()
-
-        # STEP 4: UPDATE BUFFER_PTR TO GET READY FOR NEXT INPUT.
-        if isinstance(buffer_ptr, int):
-            buffer_ptr = buffer_end_ptr
-        else:
-            buffer_ptr.value = buffer_end_ptr
+        # Put a message (a signal) into the queue of each process that
+        # receives a copy of data unless the receiver has a signal
+        # for this stream that it has not yet acknowledged. The
+        # receiver copies all the data in the buffer up to the latest
+        # write when it acknowledges a signal. So, signals are not
+        # sent while a receiver has an outstanding signal.
+        # The message says that new data is available in the buffer
+        # between pointers:
+        #             (buffer_current_ptr, buffer_end_ptr)
+        # The index of a receiver in q_and_in_stream_signal_names is
+        # the id of its read cursor in the buffer.
+        # A signal is counted as sent before it is put in a queue, so
+        # that the count of signals sent is never less than the count
+        # of signals received. Only this thread writes this count; so
+        # no lock is needed.
+        signal_id = self.out_to_signal_id[stream_name]
+        for reader_id, (q, in_stream_signal_name) in \
+          enumerate(q_and_in_stream_signal_names):
+            if buffer.notify(reader_id):
+                self.num_signals_sent[signal_id] += 1
+                q.put((in_stream_signal_name,
+                       (buffer_current_ptr, buffer_end_ptr)))
         return None
 
+    def stall_statistics(self):
+        """
+        Returns a dict where the keys are names of output streams and
+        sources of this process, and the values are the statistics of
+        waiting for receivers to copy data from the buffer of the
+        stream. See SharedBuffer.stall_statistics().
+        Can be called by the parent process after this process has
+        terminated.
+
+        """
+        return dict([(stream_name, buffer.stall_statistics()) for
+                     stream_name, buffer in self.out_to_buffer.items()])
+
+
+    def signal_received(self):
+        """
+        Called by the compute thread of this process after it has
+        processed a signal, i.e., after the step caused by the signal.
+
+        """
+        self.num_signals_received.value += 1
+        self.color = BLACK
+
+    def idle(self):
+        """
+        Called by the compute thread of this process when its input
+        queue is empty. If this process holds the termination detection
+        token and all sources of this process have finished, then the
+        process is passive and forwards the token to the next process
+        in the ring. The process with id 0 detects termination and
+        broadcasts 'stop'.
+
+        Notes
+        -----
+        This is Dijkstra's token-based termination detection algorithm
+        for a ring of processes (EWD 998). The count of a process is the
+        number of signals it has sent minus the number it has received.
+        The token is a pair (count, color). Each process adds its count
+        to the count of the token before forwarding it, and blackens the
+        token if the process has received a signal since it last
+        forwarded the token. When the token returns to process 0 white,
+        process 0 is white, and the count of the token plus the count of
+        process 0 is 0, then no signal is in transit and every process is
+        passive; so the computation has terminated. Otherwise process 0
+        starts a new round with a white token.
+        A process only reads and writes its own counts, and the token
+        is passed only by processes that are idle; so, the overhead of
+        termination detection does not depend on the number of processes.
+
+        """
+        if self.token is None or self.unfinished_sources:
+            return
+        token_count, token_color = self.token
+        self.token = None
+        count = sum(self.num_signals_sent) - self.num_signals_received.value
+        if self.process_ids[self.name] == 0:
+            if (token_color == WHITE and self.color == WHITE and
+                token_count + count == 0):
+                # Broadcast 'stop'
+                # The stream name and stream element are both 'stop'.
+                self.broadcast('stop', 'stop')
+                return
+            # Start a new round.
+            token_count, token_color = 0, WHITE
+        else:
+            token_count += count
+            if self.color == BLACK:
+                token_color = BLACK
+        self.color = WHITE
+        self.next_proc.in_queue.put(('_token_', (token_count, token_color)))
 
     def broadcast(self, receiver_stream_name, msg):
         for process_name in self.all_process_specs.keys():
             this_process = self.all_procs[process_name]
             this_process.in_queue.put((receiver_stream_name, msg))
 
+    def msg_to_all_other_processes(self, receiver_stream_name, msg):
+        for process_name in self.all_process_specs.keys():
+            if process_name != self.name:
+                this_process = self.all_procs[process_name]
+                this_process.in_queue.put((receiver_stream_name, msg))
+
     def finished_source(self, stream_name):
         """
-        Set the source_status of this stream to 0 to
-        indicate that this source has terminated execution.
+        Records that the source called stream_name has terminated
+        execution, and tells the compute thread of this process so
+        that it takes part in termination detection.
 
         Called by source thread functions.
         """
-        this_source_id = self.source_ids[self.name][stream_name]
-        self.source_status[this_source_id] = 0
-        self.broadcast('source_finished', (self.name, stream_name))
+        self.unfinished_sources.discard(stream_name)
+        self.in_queue.put(('source_finished', (self.name, stream_name)))
 
 #-----------------------------------------------------------------------    
 # FINISHED class MulticoreProcess
 #-----------------------------------------------------------------------
 
+def is_typecode(stream_type):
+    """
+    Returns True if stream_type is a typecode of multiprocessing.Array,
+    such as 'i' or 'd', i.e. a single character other than 'x'.
+
+    """
+    return (isinstance(stream_type, str) and len(stream_type) == 1 and
+            stream_type != 'x')
+
 def make_spec_from_multicore_specification(multicore_specification):
     """
     Converts from the multicore specification format to the process
@@ -1005,42 +1160,43 @@ def make_connections_from_connect_streams(connect_streams):
     return connections
     
 #-------------------------------------------------------------------
-def copy_buffer_segment(message, out_stream, buffer, in_stream_type):
+def copy_buffer_segment(message, out_stream, buffer, reader_id):
     """
     copy_buffer_segment() is the function executed by the agent
-    when a new message arrives. A message is (start, end).
-    This function extends out_stream with the segment of the buffer
-    between start and end.
+    when a new message arrives. A message is (start, end) where
+    start and end are the positions of the write that caused the
+    message. The message acknowledges the notification of the reader
+    and the buffer returns the position up to which the buffer has
+    been written; this position is end or later because the writer
+    does not send messages for writes made while a message is
+    outstanding. This function extends out_stream with the segment of
+    the buffer between the read cursor of out_stream and this
+    position, and then moves the read cursor to this position. So
+    consecutive writes are copied by a single call. The writer of the
+    buffer may overwrite the segment after the read cursor has moved.
+
+    If buffer is a SharedArrayBuffer then out_stream is a StreamArray.
+    The segment is copied from a NumPy view of the buffer into
+    out_stream.recent by a single vectorized copy (two copies when
+    the segment wraps around the end of the buffer), and no
+    intermediate list or array is created.
+
+    If buffer is a SharedObjectBuffer then the segment consists of
+    pickled records.
     """
-    start, end = message
+    start = buffer.read_ptrs[reader_id]
+    end = buffer.acknowledge(reader_id)
     if end == start:
         # Empty message. So take no action.
         return
-    if end > start:
-        # The end pointer hasn't crossed the termination of the
-        # circular buffer. So, this segment is the linear
-        # sequence from start to end.
-        return_value = buffer[start:end]
+    if isinstance(buffer, SharedObjectBuffer):
+        out_stream.extend(buffer.read(start, end))
     else:
-        # The return value is read from the circular buffer
-        # by going to the end of the buffer and adding values
-        # from the beginning of the buffer.
-        # The segment includes the values in the remaining_space
-        # in the buffer concatenated with the values in the
-        # buffer from cells 0 to end.
-        remaining_space = BUFFER_SIZE - start
-        segment_length = remaining_space + end
-        # Set up an array with appropriate length to be filled in.
-        return_value = multiprocessing.Array(in_stream_type, range(segment_length))
-        # Copy the buffer from start to the termination of the buffer into
-        # the first part of return_value.
-        return_value[:remaining_space] = \
-            multiprocessing.Array(in_stream_type, buffer[start:])
-        # Roll over the end of the circular buffer. Copy the buffer
-        # in cells 0 to end into the second part of remaining_space.
-        return_value[remaining_space:] = \
-            multiprocessing.Array(in_stream_type, buffer[:end])
-    out_stream.extend(list(return_value))
+        # Extending the stream once for each view avoids allocating
+        # an array for a segment that wraps around the buffer.
+        for segment in buffer.read(start, end):
+            out_stream.extend(segment)
+    buffer.set_read_ptr(reader_id, end)
     return
 #-------------------------------------------------------------------
 
@@ -1065,43 +1221,36 @@ def finished_source(proc, stream_name):
     proc: MulticomputerProcess
     stream_name: str
     
-    Set the source_status of this stream to 0 to
-    indicate that this source has terminated execution.
+    Indicate that this source has terminated execution.
     Used for detecting termination of a multicore
     application.
 
     Called by source thread functions.
     """
-    # Each source stream has a unique id which is a
-    # nonnegative integer. Get the id for the source with
-    # this stream_name in the process called proc.name
-    this_source_id = proc.source_ids[proc.name][stream_name]
-    # The source status for a given id is 0 when the corresponding
-    # source has finished, and is 1 otherwise. Initially it is 1.
-    proc.source_status[this_source_id] = 0
-    # Inform all processes that this source has finished. The
-    # other processes will terminate only after all sources are
-    # finished.
-    proc.broadcast('source_finished', (proc.name, stream_name))
+    proc.finished_source(stream_name)
     
-def make_multicore_processes(process_specs, connect_streams, **kwargs):
+def make_multicore_procs(process_specs, connect_streams,
+                         process_kwargs=None, **kwargs):
+    """
+    Makes a MulticoreProcess for each process specification, and
+    connects the MulticoreProcesses. Keyword arguments, such as
+    buffer_size, are passed to MulticoreProcess.
+    process_kwargs[name], if specified, is a dict of keyword
+    arguments, such as in_queue, passed only to the
+    MulticoreProcess called name.
+
+    Returns
+    -------
+       procs: dict
+          procs[name] is the MulticoreProcess called name.
+
+    """
     processes = process_specs
-    # source_status is an array of bytes, one for each source in
-    # the multiprocess system. Note that source_status is not restricted to
-    # the status of sources in a SINGLE process; it includes source
-    # statuses across ALL processes in the multicore application.
-    # source_status[j] = 1 if the j-th source is still generating values.
-    # source_status[j] = 0 if the j-th source has terminated.
-    # Initially source_status[j] = 1 for 0 <= j < MAX_NUM_SOURCES.
-    source_status = multiprocessing.Array('B', MAX_NUM_SOURCES)
-    # queue_status is an array of bytes, one for each process.
-    # queue_status[j] = 1 if the j-th queue is operational and
-    # queue_status[j] = 0 if the j-th queue has finished.
-    # Initially queue_status[j] = 1 for 0 <= j < MAX_NUM_PROCESSES.
-    queue_status = multiprocessing.Array('B', MAX_NUM_PROCESSES)
     connections = make_connections_from_connect_streams(connect_streams)
     #check_processes_connections_format(processes, connections)
     #check_connections_validity(processes, connections)
+    if process_kwargs is None:
+        process_kwargs = {}
     
     # Make a proc (i.e. a MulticoreProcess) for each spec (i.e.
     # process specification).
@@ -1109,7 +1258,10 @@ def make_multicore_processes(process_specs, connect_streams, **kwargs):
     # In the following name is a process name and
     # spec is the specification of the process.
     for name, spec in processes.items():
-        procs[name] = MulticoreProcess(spec, connect_streams, name)
+        this_process_kwargs = dict(kwargs)
+        this_process_kwargs.update(process_kwargs.get(name, {}))
+        procs[name] = MulticoreProcess(
+            spec, connect_streams, name, **this_process_kwargs)
 
     # Make the dict relating output streams to queues of receiving
     # processes and to in_stream_signal_names.
@@ -1121,59 +1273,69 @@ def make_multicore_processes(process_specs, connect_streams, **kwargs):
     for name in processes.keys():
         procs[name].make_in_to_out(procs, connections)
 
-    # Create source ids and set source_status to 1 for all sources.
-    # The source_id goes from 0, to 1, ... to the number of sources.
-    # We associate a source_id with each source. The source_id for
-    # each source across the multicore application is unique.
-    source_id_count=0
-    # source_ids is a dict. key is process_name. value is a dict where
-    # source_ids[process_name] is a dict. key: source_name, value: source_id.
-    # source_ids[process_name][source_name] is unique for each source in the
-    # multicore application.
-    source_ids = {}
-    for process_name, spec in processes.items():
-        source_ids[process_name] = {}
-        #sources_dict = spec['sources']
-        sources = spec['sources']
-        for source_name_and_type in sources:
-            source_name, source_type = source_name_and_type
-            source_ids[process_name][source_name] = source_id_count
-            source_status[source_id_count] = 1
-            source_id_count += 1
-
-    # Put the (global) source_ids and source_status in each process.
-    for process_name in processes.keys():
-        this_process = procs[process_name]
-        this_process.source_ids = source_ids
-        this_process.source_status = source_status
-
-    #Create main_lock and pass it to all processes.
-    main_lock = multiprocessing.Lock()
-
-    # Create process ids and set queue_status.
+    # Create process ids.
     # process_ids is a dict where process_ids[process_name]
     # is a unique process_id. This id is unique across all
-    # processes in the multicore application.
-    #
-    # This section of code assigns a unique id (which is
-    # process_id_count) to each process. This also sets the
-    # queue_status for this process to 1.
-    process_id_count=0
-    process_ids = {}
-    for process_name in processes.keys():
-        process_ids[process_name] = process_id_count
-        queue_status[process_id_count] = 1
-        process_id_count += 1
-
-    # Pass global information, such as main_lock, to each process.
-    for process_name in processes.keys():
+    # processes in the multicore application. The processes form
+    # a ring, in the order of their ids, through which the
+    # termination detection token is passed.
+    process_names = list(processes.keys())
+    process_ids = dict(
+        [(process_name, process_id) for process_id, process_name
+         in enumerate(process_names)])
+
+    # Pass global information to each process.
+    for process_name in process_names:
         this_process = procs[process_name]
         this_process.process_ids = process_ids
-        this_process.queue_status = queue_status
-        this_process.main_lock = main_lock
         this_process.NUM_PROCESSES = len(processes)
         this_process.all_process_specs = processes
         this_process.all_procs = procs
+        next_process_name = process_names[
+            (process_ids[process_name] + 1) % len(process_names)]
+        this_process.next_proc = procs[next_process_name]
+    # Initially the process with id 0 holds the token. The token is
+    # black so that the first round is not used to detect termination.
+    procs[process_names[0]].token = (0, BLACK)
+    return procs
+
+def make_multicore_processes(process_specs, connect_streams,
+                             placement=None, **kwargs):
+    """
+    Makes a MulticoreProcess for each process specification, and
+    a multiprocessing.Process for each MulticoreProcess.
+    Keyword arguments, such as buffer_size, are passed to
+    MulticoreProcess.
+
+    Parameters
+    ----------
+    process_specs: dict
+    connect_streams: list
+    placement: None, 'auto' or dict, optional
+       None: the operating system places the processes.
+       'auto': processes are pinned to CPUs so that processes with
+          many connections share a last-level cache. See
+          placement.make_placement().
+       dict: placement[process_name] is the list of CPUs to which
+          the process is pinned.
+
+    Returns
+    -------
+       process_list: list of multiprocessing.Process
+       procs: dict
+          procs[name] is the MulticoreProcess called name.
+
+    """
+    processes = process_specs
+    procs = make_multicore_procs(process_specs, connect_streams, **kwargs)
+    process_names = list(processes.keys())
+
+    # Pin processes to CPUs.
+    if placement == 'auto':
+        placement = make_placement(process_names, connect_streams)
+    if placement is not None:
+        for process_name in process_names:
+            procs[process_name].cpus = placement.get(process_name)
 
     # Make processes.
     for name in processes.keys():
@@ -1184,8 +1346,9 @@ def make_multicore_processes(process_specs, connect_streams, **kwargs):
     return process_list, procs
 
 
-def get_processes(multicore_specification):
+def get_processes(multicore_specification, **kwargs):
     connect_streams, process_specs = make_spec_from_multicore_specification(
         multicore_specification)
-    processes, procs = make_multicore_processes(process_specs, connect_streams)
+    processes, procs = make_multicore_processes(
+        process_specs, connect_streams, **kwargs)
     return processes
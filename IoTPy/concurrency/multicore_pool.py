@@ -0,0 +1,269 @@
+"""
+This module has MulticorePool, a set of long-lived worker processes
+that run multicore applications (see multicore.py) one after
+another. A multicore application is called a job.
+
+make_multicore_processes() forks new processes, and allocates new
+shared buffers, for each application. For short jobs this start-up
+cost can be larger than the cost of the computation. A
+MulticorePool forks its workers, and allocates its shared memory,
+once. A job is started by sending its multicore specification to
+the workers; each process of the job runs in a worker, and the
+buffers of the job reuse the shared memory of the pool.
+
+The multicore specification of a job is pickled and sent to the
+workers. So, agents, source functions and their arguments must be
+picklable. If the optional package cloudpickle is installed then
+lambdas and nested functions can be used; otherwise functions must
+be defined at the top level of a module. A multiprocessing.Queue
+cannot be pickled; jobs use the queues in pool.queues, which are
+created with the pool, instead.
+
+Example
+-------
+    pool = MulticorePool(num_workers=2)
+    q = pool.queues[0]
+    multicore_specification = [
+        [('x', 'i')],
+        [{'name': 'p0', 'agent': f, 'sources': ['x'],
+          'source_functions': [h]},
+         {'name': 'p1', 'agent': g, 'inputs': ['x'], 'args': [q],
+          'output_queues': [q]}]]
+    pool.start_job(multicore_specification)
+    ... get results from q until '_finished' ...
+    pool.join_job()
+    pool.close()
+
+"""
+import io
+import multiprocessing
+import pickle
+import sys
+# Check the version of Python
+is_py2 = sys.version[0] == '2'
+if is_py2:
+    import Queue as queue
+else:
+    import queue as queue
+# cloudpickle, if it is installed, pickles lambdas and nested
+# functions.
+try:
+    import cloudpickle
+except ImportError:
+    cloudpickle = None
+
+from ..core.system_parameters import BUFFER_SIZE
+from .shared_buffers import SharedSlab
+from .multicore import make_spec_from_multicore_specification
+from .multicore import make_multicore_procs
+
+if cloudpickle is not None:
+    _Pickler = cloudpickle.CloudPickler
+else:
+    _Pickler = pickle.Pickler
+
+class _PoolPickler(_Pickler):
+    # Pickles the queues of the pool by their index in pool.queues.
+    def __init__(self, file, queues):
+        _Pickler.__init__(self, file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.queues = queues
+
+    def persistent_id(self, obj):
+        for i, q in enumerate(self.queues):
+            if obj is q:
+                return ('queue', i)
+        return None
+
+class _PoolUnpickler(pickle.Unpickler):
+    def __init__(self, file, queues):
+        pickle.Unpickler.__init__(self, file)
+        self.queues = queues
+
+    def persistent_load(self, pid):
+        kind, i = pid
+        return self.queues[i]
+
+
+class MulticorePool(object):
+    """
+    A set of worker processes that run the processes of multicore
+    applications. See the module docstring.
+
+    Parameters
+    ----------
+    num_workers: int
+       The number of worker processes. A job can have at most
+       num_workers processes.
+    streams_per_worker: int, optional
+       The maximum number of output streams and sources of a process
+       of a job.
+    max_readers: int, optional
+       The maximum number of input streams connected to an output
+       stream or source.
+    slab_size: int, optional
+       The number of bytes of shared memory for the buffer of each
+       output stream or source.
+    num_queues: int, optional
+       The number of queues in pool.queues.
+
+    Attributes
+    ----------
+    queues: list of multiprocessing.Queue
+       Queues that jobs can use to return results.
+    in_queues: list of multiprocessing.Queue
+       in_queues[w] is the input queue of the process of a job that
+       runs in worker w.
+    slabs: list of lists of SharedSlab
+       slabs[w] are the slabs of the output streams and sources of
+       the process of a job that runs in worker w.
+    workers: list of multiprocessing.Process
+    job_process_names: list of str
+       The names of the processes of the current job.
+
+    """
+    def __init__(self, num_workers, streams_per_worker=4, max_readers=4,
+                 slab_size=4*BUFFER_SIZE, num_queues=1):
+        self.num_workers = num_workers
+        self.streams_per_worker = streams_per_worker
+        self.queues = [multiprocessing.Queue() for _ in range(num_queues)]
+        self.in_queues = [multiprocessing.Queue() for _ in range(num_workers)]
+        self.job_queues = [multiprocessing.Queue() for _ in range(num_workers)]
+        self.done_queue = multiprocessing.Queue()
+        self.slabs = [[SharedSlab(slab_size, max_readers)
+                       for _ in range(streams_per_worker)]
+                      for _ in range(num_workers)]
+        self.job_process_names = []
+        # The workers are forked after the queues and slabs are
+        # created, and so they share them.
+        self.workers = [
+            multiprocessing.Process(target=self.worker_target, args=(w,))
+            for w in range(num_workers)]
+        for worker in self.workers:
+            worker.daemon = True
+            worker.start()
+
+    def worker_target(self, w):
+        """
+        The target of worker w. Gets jobs from job_queues[w] and runs
+        a process of each job until it gets None.
+
+        """
+        while True:
+            job = self.job_queues[w].get()
+            if job is None:
+                return
+            payload, process_name, assignment = job
+            try:
+                process_specs, connect_streams, kwargs = \
+                  _PoolUnpickler(io.BytesIO(payload), self.queues).load()
+                procs = make_multicore_procs(
+                    process_specs, connect_streams,
+                    self.process_kwargs(process_specs, assignment), **kwargs)
+                procs[process_name].run()
+                self.done_queue.put((process_name, None))
+            except Exception as error:
+                self.done_queue.put((process_name, repr(error)))
+
+    def process_kwargs(self, process_specs, assignment):
+        """
+        Returns the dict of keyword arguments of MulticoreProcess for
+        each process of a job. The process called name, which runs in
+        worker assignment[name], uses the input queue and slabs of that
+        worker.
+
+        """
+        process_kwargs = {}
+        for name, w in assignment.items():
+            spec = process_specs[name]
+            stream_names = [stream_name for stream_name, stream_type in
+                            spec['outputs'] + spec['sources']]
+            process_kwargs[name] = {
+                'in_queue': self.in_queues[w],
+                'slabs': dict(zip(stream_names, self.slabs[w]))}
+        return process_kwargs
+
+    def start_job(self, multicore_specification, **kwargs):
+        """
+        Starts a job. Keyword arguments, such as buffer_size, are
+        passed to MulticoreProcess. A job is started only after the
+        previous job has been joined.
+
+        """
+        assert not self.job_process_names, \
+          'Call join_job() before starting a new job'
+        connect_streams, process_specs = make_spec_from_multicore_specification(
+            multicore_specification)
+        assert len(process_specs) <= self.num_workers, \
+          'A job has {0} processes; the pool has {1} workers'.format(
+              len(process_specs), self.num_workers)
+        # Process j of the job runs in worker j.
+        assignment = dict(
+            [(name, w) for w, name in enumerate(process_specs.keys())])
+        for name, w in assignment.items():
+            spec = process_specs[name]
+            num_streams = len(spec['outputs']) + len(spec['sources'])
+            assert num_streams <= self.streams_per_worker, \
+              'Process {0} has {1} outputs and sources; at most {2} are ' \
+              'allowed'.format(name, num_streams, self.streams_per_worker)
+            # Reset the slabs before any process of the job starts.
+            for slab in self.slabs[w][:num_streams]:
+                slab.reset()
+        f = io.BytesIO()
+        _PoolPickler(f, self.queues).dump(
+            (process_specs, connect_streams, kwargs))
+        payload = f.getvalue()
+        self.job_process_names = list(process_specs.keys())
+        for name, w in assignment.items():
+            self.job_queues[w].put((payload, name, assignment))
+
+    def join_job(self):
+        """
+        Waits until all the processes of the current job have
+        terminated. If a process of the job fails, or a worker dies,
+        then the other processes of the job may wait for ever; so,
+        the workers are terminated, and RuntimeError is raised. The
+        pool cannot be used after that.
+
+        """
+        remaining = set(self.job_process_names)
+        while remaining:
+            try:
+                name, error = self.done_queue.get(timeout=1.0)
+            except queue.Empty:
+                if all([worker.is_alive() for worker in self.workers]):
+                    continue
+                name, error = None, 'A worker of the MulticorePool died'
+            if error is not None:
+                self.job_process_names = []
+                for worker in self.workers:
+                    worker.terminate()
+                raise RuntimeError(
+                    'Process {0} of the job failed: {1}'.format(name, error))
+            remaining.discard(name)
+        self.job_process_names = []
+
+    def run(self, multicore_specification, **kwargs):
+        """
+        Runs a job, and returns when the job has terminated.
+
+        """
+        self.start_job(multicore_specification, **kwargs)
+        self.join_job()
+
+    def close(self):
+        """
+        Stops the workers.
+
+        """
+        for job_queue in self.job_queues:
+            job_queue.put(None)
+        for worker in self.workers:
+            worker.join(timeout=1.0)
+            if worker.is_alive():
+                worker.terminate()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
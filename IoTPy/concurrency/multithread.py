@@ -1,10 +1,88 @@
 """
 This module has targets for threads in a multithreaded application.
 
+A thread target gets messages from its input queue in batches: it
+waits for a message and then gets all the messages that are already
+in the queue, up to max_batch_size messages. The elements of all the
+messages in a batch for the same stream are put into the stream with
+a single extend, and then the thread executes a single step of the
+computation. So, under load, the cost of a step is shared by many
+messages. A thread stops adding messages to a batch after
+max_latency seconds so that a batch does not grow while producers
+keep the queue full.
+
 """
+import time
+import sys
+# Check the version of Python
+is_py2 = sys.version[0] == '2'
+if is_py2:
+    import Queue as queue
+else:
+    import queue as queue
+
+import numpy as np
+
 from ..core.stream import run
 # run is in ../core/stream.py
-def thread_target_appending(q_in, list_q_out, in_streams, finished='_finished'):
+from ..core.compute_engine import set_thread_scheduler
+from ..core.system_parameters import MAX_BATCH_SIZE, MAX_BATCH_LATENCY
+
+def get_batch(q_in, finished, max_batch_size, max_latency):
+    """
+    Waits for a message in q_in and then gets the messages that are
+    in q_in without waiting, until it has max_batch_size messages,
+    or max_latency seconds have elapsed, or it gets finished.
+
+    Returns
+    -------
+    batch: dict
+       key: stream name
+       value: list of the values in messages for this stream, in
+       the order in which the messages were put into q_in.
+    is_finished: boolean
+       True if the finished message was received.
+
+    """
+    batch = {}
+    v = q_in.get()
+    num_messages = 0
+    start_time = time.time()
+    while True:
+        if v == finished:
+            return batch, True
+        stream_name, value = v
+        if stream_name in batch:
+            batch[stream_name].append(value)
+        else:
+            batch[stream_name] = [value]
+        num_messages += 1
+        if (num_messages >= max_batch_size or
+            time.time() - start_time >= max_latency):
+            return batch, False
+        try:
+            v = q_in.get_nowait()
+        except queue.Empty:
+            return batch, False
+
+def concatenate_segments(segments):
+    """
+    Returns a single segment with the elements of the list of
+    segments, in order.
+
+    """
+    if len(segments) == 1:
+        return segments[0]
+    if all([isinstance(segment, np.ndarray) for segment in segments]):
+        return np.concatenate(segments)
+    value_list = []
+    for segment in segments:
+        value_list.extend(segment)
+    return value_list
+
+def thread_target_appending(q_in, list_q_out, in_streams, finished='_finished',
+                            scheduler=None, max_batch_size=MAX_BATCH_SIZE,
+                            max_latency=MAX_BATCH_LATENCY):
     """
     The target of a thread running IoTPy code. The thread waits for values to be
     put into it input queue, q_in. These elements are 2-tuples:
@@ -25,25 +103,40 @@ def thread_target_appending(q_in, list_q_out, in_streams, finished='_finished'):
     finished: object
        Any object to signal that the computation is over.
        A convention (though not required) is to use '_finished'.
+    scheduler: ComputeEngine, optional
+       The scheduler of this thread. Threads with different schedulers
+       run their computations in parallel; a computation in one thread
+       does not execute agents of a computation in another thread.
+       Default: the scheduler of the process, Stream.scheduler.
+    max_batch_size: int, optional
+       The maximum number of messages in a batch. If max_batch_size
+       is 1 then the thread executes a step for every message.
+    max_latency: float, optional
+       The time in seconds after which the thread stops adding
+       messages to a batch.
 
 
     """
+    if scheduler is not None:
+        set_thread_scheduler(scheduler)
     name_to_stream = {}
     for s in in_streams:
         name_to_stream[s.name] = s
 
     while True:
-        v = q_in.get()
-        if v == finished:
+        batch, is_finished = get_batch(
+            q_in, finished, max_batch_size, max_latency)
+        for stream_name, stream_elements in batch.items():
+            name_to_stream[stream_name].extend(stream_elements)
+        run()
+        if is_finished:
             for q_out in list_q_out:
                 q_out.put(finished)
             break
-        stream_name, stream_element = v
-        stream = name_to_stream[stream_name]
-        stream.append(stream_element)
-        run()
 
-def thread_target_extending(q_in, list_q_out, in_streams, finished='_finished'):
+def thread_target_extending(q_in, list_q_out, in_streams, finished='_finished',
+                            scheduler=None, max_batch_size=MAX_BATCH_SIZE,
+                            max_latency=MAX_BATCH_LATENCY):
     """
     Same as thread_target_appending except that elements put
     into q_in are pairs of the form (stream_name, stream_segment)
@@ -61,20 +154,29 @@ def thread_target_extending(q_in, list_q_out, in_streams, finished='_finished'):
        Any object to signal that the computation is over.
        A convention (though not required) is to use _close from
        IoTPy/IoTPy/core/helper_control.py
+    scheduler: ComputeEngine, optional
+       See thread_target_appending.
+    max_batch_size: int, optional
+       See thread_target_appending.
+    max_latency: float, optional
+       See thread_target_appending.
 
 
     """
+    if scheduler is not None:
+        set_thread_scheduler(scheduler)
     name_to_stream = {}
     for s in in_streams:
         name_to_stream[s.name] = s
 
     while True:
-        v = q_in.get()
-        if v == finished:
+        batch, is_finished = get_batch(
+            q_in, finished, max_batch_size, max_latency)
+        for stream_name, stream_segments in batch.items():
+            name_to_stream[stream_name].extend(
+                concatenate_segments(stream_segments))
+        run()
+        if is_finished:
             for q_out in list_q_out:
                 q_out.put(finished)
             break
-        stream_name, stream_segment = v
-        stream = name_to_stream[stream_name]
-        stream.extend(stream_segment)
-        run()
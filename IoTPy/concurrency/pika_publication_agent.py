@@ -1,25 +1,133 @@
 #!/usr/bin/env python
-import pika
+"""
+PikaPublisher publishes the segments of a stream to a RabbitMQ
+exchange.
+
+Publishers on the same host share a connection and a channel (see
+get_pika_broker() in message_broker.py). A publisher collects
+segments into a batch, and publishes the batch as a single message
+when the batch has max_batch_size elements, or max_batch_latency
+seconds after the first segment of the batch, or when flush() or
+close() is called. So, a message is a segment of the stream.
+
+A message is encoded as JSON, which subscribers decode with
+json.loads, or, if encoding is 'binary', by encode_segment() in
+segment_encoding.py; a segment of a StreamArray is then sent as
+the bytes of a NumPy array. The content type of the message tells
+PikaSubscriber how to decode it.
+
+"""
 import json
+import threading
+import time
+import numpy as np
 
-from ..agent_types.sink import sink_list 
+from ..agent_types.sink import sink_list
 # sink is in agent_types
+from ..core.system_parameters import MAX_BATCH_SIZE, MAX_BATCH_LATENCY
+from .message_broker import get_pika_broker
+from .message_broker import JSON_CONTENT_TYPE, SEGMENT_CONTENT_TYPE
+from .multithread import concatenate_segments
+from .segment_encoding import encode_segment
 
 class PikaPublisher(object):
-    def __init__(self, routing_key, exchange='publications', host='localhost'):
+    """
+    Parameters
+    ----------
+    routing_key: str
+    exchange: str, optional
+    host: str, optional
+       The host of the RabbitMQ server.
+    encoding: str, optional
+       'json' or 'binary'.
+    max_batch_size: int, optional
+       The number of elements of a batch at which the batch is
+       published. If max_batch_size is 1 then each segment is
+       published when it is produced.
+    max_batch_latency: float, optional
+       The maximum time in seconds that a segment waits in a batch.
+    broker: object, optional
+       The broker used to publish messages, e.g., a LocalBroker.
+       Default: the PikaBroker of host.
+
+    """
+    def __init__(self, routing_key, exchange='publications', host='localhost',
+                 encoding='json', max_batch_size=MAX_BATCH_SIZE,
+                 max_batch_latency=MAX_BATCH_LATENCY, broker=None):
+        assert encoding in ['json', 'binary'], \
+          'encoding must be json or binary, not {0}'.format(encoding)
         self.routing_key = routing_key
         self.exchange = exchange
         self.host = host
-        self.connection = pika.BlockingConnection(
-            pika.ConnectionParameters(host=self.host))
-        self.channel = self.connection.channel()
-        self.channel.exchange_declare(
-            exchange=self.exchange, exchange_type='direct')
+        self.encoding = encoding
+        self.max_batch_size = max_batch_size
+        self.max_batch_latency = max_batch_latency
+        self.broker = get_pika_broker(host) if broker is None else broker
+        self.broker.exchange_declare(self.exchange)
+        self.lock = threading.Lock()
+        # The segments of the batch, and the number of elements in them.
+        self.batch = []
+        self.batch_size = 0
+        self.batch_start_time = None
+        # The timer publishes a batch after max_batch_latency seconds.
+        self.timer = None
+        self.num_messages = 0
+
     def publish_list(self, stream_segment):
-        self.channel.basic_publish(
-            exchange=self.exchange, routing_key=self.routing_key,
-            body=json.dumps(stream_segment))
+        """
+        Adds stream_segment, a list or a NumPy array, to the batch.
+
+        """
+        if len(stream_segment) == 0:
+            return
+        if isinstance(stream_segment, np.ndarray):
+            # The segment may be a view of a stream that is modified later.
+            stream_segment = stream_segment.copy()
+        with self.lock:
+            if not self.batch:
+                self.batch_start_time = time.time()
+            self.batch.append(stream_segment)
+            self.batch_size += len(stream_segment)
+            if (self.batch_size >= self.max_batch_size or
+                time.time() - self.batch_start_time >= self.max_batch_latency):
+                self.publish_batch()
+            elif self.timer is None:
+                self.timer = threading.Timer(self.max_batch_latency, self.flush)
+                self.timer.daemon = True
+                self.timer.start()
+
+    def publish_batch(self):
+        # Publishes the batch as one message. Called with self.lock held.
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        if not self.batch:
+            return
+        segment = concatenate_segments(self.batch)
+        self.batch = []
+        self.batch_size = 0
+        if self.encoding == 'binary':
+            body = encode_segment(segment)
+            content_type = SEGMENT_CONTENT_TYPE
+        else:
+            if isinstance(segment, np.ndarray):
+                segment = segment.tolist()
+            body = json.dumps(segment)
+            content_type = JSON_CONTENT_TYPE
+        self.broker.publish(self.exchange, self.routing_key, body, content_type)
+        self.num_messages += 1
+
+    def flush(self):
+        """
+        Publishes the batch.
+
+        """
+        with self.lock:
+            self.publish_batch()
+
     def close(self):
-        self.connection.close()
+        self.flush()
+        self.broker.close()
+
     def publish(self, stream):
         sink_list(self.publish_list, stream)
@@ -1,6 +1,35 @@
 #!/usr/bin/env python
-import pika
-import threading
+"""
+PikaSubscriber calls a callback function for each message that it
+receives from a RabbitMQ exchange.
+
+PikaBatchSubscriber receives segments of a stream published by
+PikaPublisher (see pika_publication_agent.py). It gets the messages
+that are available, up to prefetch_count messages, decodes them,
+and delivers their segments as a single segment. It then
+acknowledges all the messages of the batch with one
+acknowledgement. So, downstream, a batch of messages is a single
+extend of a stream and a single step of the computation. A message
+is acknowledged only after its segment has been delivered.
+
+The segment can be delivered to:
+(1) a source of a MulticoreProcess: see copy_to_source().
+(2) the input_queue of a ComputeEngine: see put_in_input_queue().
+
+"""
+import json
+import time
+# pika is required only to connect to a RabbitMQ server.
+try:
+    import pika
+except ImportError:
+    pika = None
+
+from ..core.helper_control import _multivalue
+from ..core.system_parameters import MAX_BATCH_SIZE, MAX_BATCH_LATENCY
+from .message_broker import PikaBroker, SEGMENT_CONTENT_TYPE
+from .multithread import concatenate_segments
+from .segment_encoding import decode_segment
 
 class PikaSubscriber(object):
     def __init__(self, callback, routing_key,
@@ -25,3 +54,110 @@ class PikaSubscriber(object):
         self.channel.start_consuming()
 
 
+def decode_message(body, content_type):
+    """
+    Returns the segment in a message published by PikaPublisher.
+
+    """
+    if content_type == SEGMENT_CONTENT_TYPE:
+        return decode_segment(body)
+    return json.loads(body)
+
+def copy_to_source(proc, stream_name):
+    """
+    Returns a function that copies a segment into the source called
+    stream_name of the MulticoreProcess proc.
+
+    """
+    def deliver(segment):
+        proc.copy_stream(data=segment, stream_name=stream_name)
+    return deliver
+
+def put_in_input_queue(input_queue, stream_name):
+    """
+    Returns a function that puts a segment into input_queue, the
+    input_queue of a ComputeEngine. The ComputeEngine extends the
+    stream called stream_name with the segment.
+
+    """
+    def deliver(segment):
+        input_queue.put((stream_name, _multivalue(segment)))
+    return deliver
+
+class PikaBatchSubscriber(object):
+    """
+    Delivers segments of a stream published by PikaPublisher. See
+    the module docstring.
+
+    Parameters
+    ----------
+    deliver: function
+       deliver(segment) is called for each batch of messages. A
+       segment encoded as a NumPy array may be read-only.
+    routing_key: str
+    exchange: str, optional
+    host: str, optional
+       The host of the RabbitMQ server.
+    prefetch_count: int, optional
+       The maximum number of messages in a batch, and the maximum
+       number of messages that the server sends before they are
+       acknowledged.
+    max_batch_latency: float, optional
+       A batch is delivered when no message arrives for
+       max_batch_latency seconds, or when its first message has
+       waited for max_batch_latency seconds.
+    broker: object, optional
+       A broker such as LocalBroker (see message_broker.py).
+       Default: a PikaBroker, with its own connection, to host.
+
+    """
+    def __init__(self, deliver, routing_key, exchange='publications',
+                 host='localhost', prefetch_count=MAX_BATCH_SIZE,
+                 max_batch_latency=MAX_BATCH_LATENCY, broker=None):
+        self.deliver = deliver
+        self.routing_key = routing_key
+        self.exchange = exchange
+        self.host = host
+        self.prefetch_count = prefetch_count
+        self.max_batch_latency = max_batch_latency
+        self.own_broker = broker is None
+        self.broker = PikaBroker(host) if broker is None else broker
+        # The queue is bound when the subscriber is created so that no
+        # message published after this point is missed.
+        self.messages = self.broker.consume(
+            exchange, routing_key, prefetch_count, max_batch_latency)
+        self.stopped = False
+        self.num_batches = 0
+
+    def start(self):
+        """
+        Gets and delivers batches of messages until stop() is called.
+
+        """
+        batch = []
+        for message in self.messages:
+            if message is not None:
+                delivery_tag, body, content_type = message
+                if not batch:
+                    batch_start_time = time.time()
+                batch.append(decode_message(body, content_type))
+            if batch and (message is None or
+                          len(batch) >= self.prefetch_count or
+                          time.time() - batch_start_time >= self.max_batch_latency):
+                self.deliver(concatenate_segments(batch))
+                self.broker.acknowledge(delivery_tag)
+                self.num_batches += 1
+                batch = []
+            if self.stopped and not batch:
+                break
+        self.messages.close()
+        if self.own_broker:
+            self.broker.close()
+
+    def stop(self):
+        """
+        Stops the subscriber after it has delivered the messages
+        that it has received.
+
+        """
+        self.stopped = True
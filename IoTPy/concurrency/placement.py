@@ -0,0 +1,217 @@
+"""
+This module places the processes of a multicore application on
+CPUs. See multicore.py.
+
+A placement is a dict where placement[process_name] is the set
+of CPUs on which the process called process_name may run. Each
+process pins itself to its CPUs, with os.sched_setaffinity, when
+it starts.
+
+make_placement() computes a placement from the graph of
+connections between processes. CPUs are grouped into domains:
+CPUs that share a last-level (L3) cache, or CPUs in the same NUMA
+node when cache information is not available. Processes that
+exchange a lot of data are put in the same domain so that data in
+shared buffers is copied through a shared cache rather than
+across sockets.
+
+The amount of data exchanged on a connection is its traffic. By
+default each connection has the same traffic. The traffic observed
+in a previous run of the application can be obtained by calling
+observed_traffic() after the run, and then passed to
+make_placement() for the next run.
+
+"""
+import os
+
+def parse_cpu_list(cpu_list):
+    """
+    Returns the list of CPUs in a Linux cpu list such as
+    '0-3,8,10-11'.
+
+    """
+    cpus = []
+    for part in cpu_list.strip().split(','):
+        if not part:
+            continue
+        if '-' in part:
+            first, last = part.split('-')
+            cpus.extend(range(int(first), int(last)+1))
+        else:
+            cpus.append(int(part))
+    return cpus
+
+def cpu_domains():
+    """
+    Returns a list of domains where each domain is a sorted list of
+    CPUs that share a last-level cache. Only CPUs on which this
+    process may run are included.
+    If the cache topology is not available then CPUs are grouped by
+    NUMA node, and if that is not available then all CPUs are in a
+    single domain.
+
+    """
+    if hasattr(os, 'sched_getaffinity'):
+        allowed = set(os.sched_getaffinity(0))
+    else:
+        allowed = set(range(os.cpu_count() or 1))
+    domains = set()
+    for cpu in allowed:
+        # The cache with the highest index is the last-level cache.
+        cache_dir = '/sys/devices/system/cpu/cpu{0}/cache'.format(cpu)
+        try:
+            indexes = sorted([name for name in os.listdir(cache_dir)
+                              if name.startswith('index')])
+            with open(os.path.join(cache_dir, indexes[-1],
+                                   'shared_cpu_list')) as f:
+                domains.add(tuple(sorted(allowed & set(parse_cpu_list(f.read())))))
+        except (OSError, IndexError):
+            domains = set()
+            break
+    if not domains:
+        node_dir = '/sys/devices/system/node'
+        try:
+            for name in os.listdir(node_dir):
+                if name.startswith('node') and name[4:].isdigit():
+                    with open(os.path.join(node_dir, name, 'cpulist')) as f:
+                        domain = allowed & set(parse_cpu_list(f.read()))
+                    if domain:
+                        domains.add(tuple(sorted(domain)))
+        except OSError:
+            domains = set()
+    if not domains:
+        domains.add(tuple(sorted(allowed)))
+    return [list(domain) for domain in sorted(domains)]
+
+def connection_traffic(connect_streams, traffic=None):
+    """
+    Returns a dict where the key is a pair of names of processes and
+    the value is the traffic between the two processes. Connections
+    of a process to itself are ignored.
+
+    Parameters
+    ----------
+    connect_streams: list
+       See MulticoreProcess.
+    traffic: dict, optional
+       traffic[(sender_process_name, out_stream_name)] is the
+       traffic on the stream out_stream_name of the process
+       sender_process_name. The traffic of a stream that is not in
+       traffic is 1. See observed_traffic().
+
+    """
+    pair_traffic = {}
+    for sender, out_stream_name, receiver, in_stream_name in connect_streams:
+        if sender == receiver:
+            continue
+        pair = tuple(sorted([sender, receiver]))
+        if traffic is not None and (sender, out_stream_name) in traffic:
+            weight = traffic[(sender, out_stream_name)]
+        else:
+            weight = 1
+        pair_traffic[pair] = pair_traffic.get(pair, 0) + weight
+    return pair_traffic
+
+def make_placement(process_names, connect_streams, traffic=None,
+                   domains=None, one_cpu_per_process=False):
+    """
+    Returns a placement, i.e., a dict where placement[process_name]
+    is the list of CPUs on which the process may run.
+
+    Parameters
+    ----------
+    process_names: list of str
+    connect_streams: list
+       See MulticoreProcess.
+    traffic: dict, optional
+       See connection_traffic().
+    domains: list of lists of int, optional
+       The CPU domains. Default: cpu_domains()
+    one_cpu_per_process: boolean, optional
+       If True then each process is pinned to a single CPU of its
+       domain, and the processes of a domain are assigned to its
+       CPUs in round-robin order. If False then each process may
+       run on any CPU of its domain.
+
+    Notes
+    -----
+    Processes are placed greedily. Pairs of processes are considered
+    in decreasing order of traffic, and the groups containing the two
+    processes are merged if the merged group has no more processes
+    than the largest domain has CPUs. Groups are then assigned, the
+    largest first, to the domain with the most free CPUs.
+
+    """
+    if domains is None:
+        domains = cpu_domains()
+    capacity = max([len(domain) for domain in domains])
+    # group[process_name] is the list of processes in the group of
+    # process_name. Processes in the same group share a list.
+    group = dict([(process_name, [process_name])
+                  for process_name in process_names])
+    pair_traffic = connection_traffic(connect_streams, traffic)
+    for (p, q), weight in sorted(pair_traffic.items(),
+                                 key=lambda item: (-item[1], item[0])):
+        if p not in group or q not in group or group[p] is group[q]:
+            continue
+        if len(group[p]) + len(group[q]) > capacity:
+            continue
+        merged = group[p] + group[q]
+        for process_name in merged:
+            group[process_name] = merged
+
+    # Get the distinct groups, in the order of process_names.
+    groups = []
+    for process_name in process_names:
+        if not any([group[process_name] is g for g in groups]):
+            groups.append(group[process_name])
+
+    # free[j] is the number of CPUs of domains[j] not yet assigned.
+    free = [len(domain) for domain in domains]
+    # next_cpu[j] is the index of the next CPU of domains[j] assigned
+    # to a process when one_cpu_per_process is True.
+    next_cpu = [0 for domain in domains]
+    placement = {}
+    for g in sorted(groups, key=len, reverse=True):
+        j = max(range(len(domains)), key=lambda k: (free[k], -k))
+        free[j] -= len(g)
+        for process_name in g:
+            if one_cpu_per_process:
+                domain = domains[j]
+                placement[process_name] = [domain[next_cpu[j] % len(domain)]]
+                next_cpu[j] += 1
+            else:
+                placement[process_name] = list(domains[j])
+    return placement
+
+def observed_traffic(procs):
+    """
+    Returns the traffic observed in a run of a multicore
+    application: a dict where the key is (process_name,
+    out_stream_name) and the value is the number of elements (or
+    bytes for streams of type 'x') that receivers copied from the
+    buffer of the stream. Call after the processes have terminated.
+
+    Parameters
+    ----------
+    procs: dict
+       procs[process_name] is a MulticoreProcess. See
+       make_multicore_processes().
+
+    """
+    traffic = {}
+    for process_name, proc in procs.items():
+        for out_stream_name, buffer in proc.out_to_buffer.items():
+            traffic[(process_name, out_stream_name)] = sum(
+                buffer.read_ptrs[:buffer.num_readers])
+    return traffic
+
+def pin_process(cpus):
+    """
+    Pins the calling process to the CPUs in cpus. Takes no action
+    if cpus is None or if the operating system does not support
+    CPU affinity.
+
+    """
+    if cpus is not None and hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, cpus)
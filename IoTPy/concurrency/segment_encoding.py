@@ -0,0 +1,63 @@
+"""
+This module encodes segments of streams as bytes, and decodes
+them, so that segments can be sent to other hosts. See
+socket_transport.py.
+
+A segment that is a NumPy array of numbers, such as a segment of a
+StreamArray, is encoded as a short header followed by the bytes of
+the array; the header has the dtype and the shape of the array.
+Decoding such a segment does not unpickle anything; it creates an
+array that uses the bytes of the encoded segment.
+Any other segment, such as a list of Python objects from a Stream,
+is pickled.
+
+"""
+import pickle
+import struct
+import numpy as np
+
+# The first byte of an encoded segment is its kind.
+PICKLED = 0
+ARRAY = 1
+# Pickle protocol 5 (Python 3.8+) is more compact for large bytes
+# and arrays.
+PICKLE_PROTOCOL = min(5, pickle.HIGHEST_PROTOCOL)
+
+def encode_segment(segment):
+    """
+    Returns bytes that encode segment, which is a list or a NumPy
+    array.
+
+    """
+    if (isinstance(segment, np.ndarray) and segment.dtype.fields is None
+        and segment.dtype != object):
+        dtype_str = segment.dtype.str.encode('ascii')
+        return b''.join([
+            struct.pack('!BB', ARRAY, len(dtype_str)), dtype_str,
+            struct.pack('!B{0}Q'.format(segment.ndim),
+                        segment.ndim, *segment.shape),
+            np.ascontiguousarray(segment).tobytes()])
+    return struct.pack('!B', PICKLED) + pickle.dumps(
+        segment, protocol=PICKLE_PROTOCOL)
+
+def decode_segment(data):
+    """
+    Returns the segment encoded in data by encode_segment(). An
+    array segment is read-only because it uses the bytes of data.
+
+    """
+    data = memoryview(data)
+    kind = data[0]
+    if kind == PICKLED:
+        return pickle.loads(data[1:])
+    assert kind == ARRAY, 'Unknown kind of segment: {0}'.format(kind)
+    dtype_length = data[1]
+    dtype = np.dtype(bytes(data[2:2+dtype_length]).decode('ascii'))
+    offset = 2 + dtype_length
+    ndim = data[offset]
+    shape = struct.unpack_from('!{0}Q'.format(ndim), data, offset+1)
+    offset += 1 + 8*ndim
+    count = 1
+    for dimension in shape:
+        count *= dimension
+    return np.frombuffer(data, dtype, count, offset).reshape(shape)
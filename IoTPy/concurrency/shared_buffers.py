@@ -0,0 +1,566 @@
+"""
+This module has buffers in shared memory that are used to pass
+segments of streams between processes of a multicore application.
+See multicore.py.
+
+Each buffer is a circular buffer with a single writer, the
+process that outputs the stream, and any number of readers, the
+processes that input the stream. Positions in a buffer are
+absolute: a position counts the number of elements (or bytes)
+written since the buffer was created, and the slot of position p
+is p % size. Each reader has a read cursor in shared memory which
+is the position up to which the reader has copied the buffer into
+its stream. The writer does not overwrite data that a reader has
+not yet copied; the writer waits, with backoff, until all readers
+have copied enough of the buffer to make space for new data.
+
+The writer notifies a reader that the buffer has new data only if
+the reader has no outstanding notification, i.e., a notification
+that the reader has not yet acknowledged. When a reader
+acknowledges a notification it gets the position up to which the
+buffer has been written, and so it copies all the data written
+since its last copy, including data written while the
+notification was outstanding.
+
+SharedArrayBuffer is a circular buffer of elements of a C
+datatype, such as 'i' or 'd', in a multiprocessing.Array.
+
+SharedNDArrayBuffer is a circular buffer of rows of a NumPy dtype
+and shape, e.g., rows of 3 floats from an accelerometer, or records
+of a structured dtype with a time field.
+
+SharedObjectBuffer is a circular buffer of bytes that holds
+segments of streams of arbitrary Python objects, i.e., streams
+of type 'x'. The sending process pickles a segment and writes it
+into the buffer, and tells receiving processes the (start, end)
+offsets of the segment. A receiving process reads the segment
+from the buffer and unpickles it. The bytes are in a
+multiprocessing.shared_memory block from Python 3.8, and in a
+multiprocessing.Array of bytes in earlier versions.
+
+"""
+import multiprocessing
+import pickle
+import struct
+import time
+import numpy as np
+# multiprocessing.shared_memory is available from Python 3.8.
+try:
+    from multiprocessing import shared_memory
+except ImportError:
+    shared_memory = None
+
+from ..core.system_parameters import BUFFER_SIZE, OBJECT_BUFFER_SIZE
+from ..core.system_parameters import MIN_BACKOFF_TIME, MAX_BACKOFF_TIME
+from ..core.system_parameters import MAX_WAIT_TIME
+
+# Pickle protocol 5 (Python 3.8+) lets large contiguous payloads,
+# such as NumPy arrays, be pickled out-of-band. Out-of-band
+# payloads are copied directly into the shared buffer rather than
+# being copied into the pickle. Earlier versions pickle everything
+# in-band with their highest protocol.
+PICKLE_PROTOCOL = min(5, pickle.HIGHEST_PROTOCOL)
+OUT_OF_BAND = PICKLE_PROTOCOL >= 5
+
+# Formats of the length prefixes of records and frames.
+_NUM_FRAMES = struct.Struct('<I')
+_FRAME_LENGTH = struct.Struct('<Q')
+
+
+def allocate_shared_bytes(size):
+    """
+    Returns a pair (shm, buf) where buf is a memoryview of size bytes
+    of memory shared with processes forked after this call.
+    shm is the multiprocessing.shared_memory.SharedMemory that holds
+    the bytes from Python 3.8, and None in earlier versions, in which
+    the bytes are in a multiprocessing.Array.
+
+    The shared memory is unlinked as soon as it is created. The
+    memory remains mapped in this process and in the processes
+    forked from it, and is released when they all terminate. So,
+    no shared memory is leaked if a process fails.
+
+    """
+    if shared_memory is not None:
+        shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        shm.unlink()
+        return shm, shm.buf
+    array = multiprocessing.Array('B', max(size, 1), lock=False)
+    return None, memoryview(array).cast('B')
+
+def dtype_and_shape(stream_type):
+    """
+    Returns the pair (dtype, shape) of the rows of a stream of type
+    stream_type. stream_type is anything accepted by np.dtype, e.g.,
+    'i', np.float64, (np.float64, 3), ('f8', (2, 2)), or a structured
+    dtype such as [('time', 'f8'), ('value', 'f8', 3)]. A subarray
+    dtype, such as (np.float64, 3), is split into the dtype of its
+    elements and its shape.
+
+    """
+    dtype = np.dtype(stream_type)
+    if dtype.subdtype is not None:
+        return dtype.subdtype
+    return dtype, ()
+
+class SharedSlab(object):
+    """
+    Shared memory, and the shared state of a buffer, that can be
+    reused by the buffers of different multicore applications that
+    run one after another in the same processes. See multicore_pool.py.
+
+    Parameters
+    ----------
+    num_bytes: int
+       The number of bytes of memory.
+    max_readers: int
+       The maximum number of readers of a buffer in this slab.
+
+    Attributes
+    ----------
+    shm, buf: see allocate_shared_bytes()
+    read_ptrs, end, outstanding, notification_locks, num_stalls,
+    stall_time: see SharedBuffer.
+
+    """
+    def __init__(self, num_bytes, max_readers):
+        self.num_bytes = num_bytes
+        self.max_readers = max_readers
+        self.shm, self.buf = allocate_shared_bytes(num_bytes)
+        self.read_ptrs = multiprocessing.Array('q', max_readers, lock=False)
+        self.end = multiprocessing.Value('q', 0, lock=False)
+        self.outstanding = multiprocessing.Array('b', max_readers, lock=False)
+        self.notification_locks = [
+            multiprocessing.Lock() for _ in range(max_readers)]
+        self.num_stalls = multiprocessing.Value('q', 0, lock=False)
+        self.stall_time = multiprocessing.Value('d', 0.0, lock=False)
+
+    def reset(self):
+        """
+        Resets the shared state so that the slab can be used by a new
+        buffer. Called before any process uses the new buffer.
+
+        """
+        for j in range(self.max_readers):
+            self.read_ptrs[j] = 0
+            self.outstanding[j] = 0
+        self.end.value = 0
+        self.num_stalls.value = 0
+        self.stall_time.value = 0.0
+
+
+def row_size(stream_type):
+    """
+    Returns the number of bytes in a row of a stream of type
+    stream_type. See dtype_and_shape().
+
+    """
+    dtype, shape = dtype_and_shape(stream_type)
+    return dtype.itemsize * int(np.prod(shape))
+
+class SharedBuffer(object):
+    """
+    The flow control that is common to circular buffers with a
+    single writer and multiple readers.
+
+    Parameters
+    ----------
+    size: int
+       The number of slots in the buffer.
+    num_readers: int
+       The number of input streams that read the buffer.
+    name: str, optional
+       The name of the stream written into the buffer. Used in
+       error messages.
+    max_wait_time: float, optional
+       The maximum time, in seconds, that a write waits for
+       readers. A write that waits longer raises RuntimeError.
+       default: MAX_WAIT_TIME
+    slab: SharedSlab, optional
+       If slab is specified then the buffer uses the memory and
+       shared state of slab instead of allocating its own.
+
+    Attributes
+    ----------
+    ptr: int
+       The position at which the next segment is written.
+       Only the process that writes the stream uses ptr.
+    end: multiprocessing.Value
+       The position up to which the buffer has been written. end
+       is ptr shared with readers.
+    read_ptrs: multiprocessing.Array
+       read_ptrs[j] is the position up to which the j-th reader
+       has copied the buffer.
+    num_stalls: multiprocessing.Value
+       The number of writes that waited for readers.
+    stall_time: multiprocessing.Value
+       The total time, in seconds, that writes waited for readers.
+    outstanding: multiprocessing.Array
+       outstanding[j] is 1 if the j-th reader has been notified of
+       new data and has not acknowledged the notification.
+    notification_locks: list of multiprocessing.Lock
+       notification_locks[j] is the lock on outstanding[j]. Each
+       lock is shared by the writer and a single reader.
+
+    """
+    def __init__(self, size, num_readers, name=None,
+                 max_wait_time=MAX_WAIT_TIME, slab=None):
+        self.size = size
+        self.num_readers = num_readers
+        self.name = name
+        self.max_wait_time = max_wait_time
+        self.ptr = 0
+        if slab is not None:
+            assert num_readers <= slab.max_readers, \
+              'Stream {0} has {1} readers. A slab has at most {2} readers'.format(
+                  name, num_readers, slab.max_readers)
+            self.read_ptrs = slab.read_ptrs
+            self.num_stalls = slab.num_stalls
+            self.stall_time = slab.stall_time
+            self.end = slab.end
+            self.outstanding = slab.outstanding
+            self.notification_locks = slab.notification_locks
+            return
+        # A reader writes only its own cursor, and the writer only
+        # reads the cursors. So no locks are needed.
+        self.read_ptrs = multiprocessing.Array('q', max(num_readers, 1), lock=False)
+        self.num_stalls = multiprocessing.Value('q', 0, lock=False)
+        self.stall_time = multiprocessing.Value('d', 0.0, lock=False)
+        self.end = multiprocessing.Value('q', 0, lock=False)
+        self.outstanding = multiprocessing.Array(
+            'b', max(num_readers, 1), lock=False)
+        self.notification_locks = [
+            multiprocessing.Lock() for _ in range(max(num_readers, 1))]
+
+    def free_space(self):
+        """
+        Returns the number of slots that can be written without
+        overwriting data that some reader has not copied.
+
+        """
+        if self.num_readers == 0:
+            return self.size
+        return self.size - (self.ptr - min(self.read_ptrs[:self.num_readers]))
+
+    def wait_for_space(self, n):
+        """
+        Waits until n slots can be written. The waiting time doubles
+        from MIN_BACKOFF_TIME to MAX_BACKOFF_TIME while the buffer
+        remains full. Raises RuntimeError if the readers do not make
+        space within max_wait_time seconds, for example because a
+        reader process has terminated.
+
+        """
+        assert n <= self.size, \
+          'A segment of length {0} is larger than the buffer size, {1}'.format(
+              n, self.size)
+        if self.free_space() >= n:
+            return
+        start_time = time.time()
+        backoff_time = MIN_BACKOFF_TIME
+        self.num_stalls.value += 1
+        while self.free_space() < n:
+            if time.time() - start_time > self.max_wait_time:
+                self.stall_time.value += time.time() - start_time
+                raise RuntimeError(
+                    'Stream {0}: waited more than {1} seconds for readers'
+                    ' to make space for {2} slots. Read cursors are {3} and'
+                    ' the write position is {4}. Stall statistics: {5}'.format(
+                        self.name, self.max_wait_time, n,
+                        self.read_ptrs[:self.num_readers], self.ptr,
+                        self.stall_statistics()))
+            time.sleep(backoff_time)
+            backoff_time = min(2*backoff_time, MAX_BACKOFF_TIME)
+        self.stall_time.value += time.time() - start_time
+
+    def notify(self, reader_id):
+        """
+        Called by the writer after a write. Returns True if the reader
+        with id reader_id must be sent a notification, i.e., if it has
+        no outstanding notification. Otherwise the reader copies the
+        data of this write when it acknowledges its outstanding
+        notification.
+
+        """
+        with self.notification_locks[reader_id]:
+            if self.outstanding[reader_id]:
+                return False
+            self.outstanding[reader_id] = 1
+            return True
+
+    def acknowledge(self, reader_id):
+        """
+        Called by the reader with id reader_id when it gets a
+        notification. Returns the position up to which the buffer
+        has been written. The writer sets end before it calls
+        notify(), and the lock orders the two calls. So, a write for
+        which the writer did not send a notification is always
+        before the position returned.
+
+        """
+        with self.notification_locks[reader_id]:
+            self.outstanding[reader_id] = 0
+            return self.end.value
+
+    def set_read_ptr(self, reader_id, ptr):
+        """
+        The reader with id reader_id has copied the buffer up to
+        position ptr.
+
+        """
+        self.read_ptrs[reader_id] = ptr
+
+    def stall_statistics(self):
+        """
+        Returns a dict with the number of writes that waited for
+        readers and the total waiting time in seconds.
+
+        """
+        return {'num_stalls': self.num_stalls.value,
+                'stall_time': self.stall_time.value}
+
+
+class SharedArrayBuffer(SharedBuffer):
+    """
+    A circular buffer in a multiprocessing.Array for segments of
+    streams of a C datatype.
+
+    Parameters
+    ----------
+    typecode: str
+       A typecode of multiprocessing.Array such as 'i' or 'd'.
+    num_readers: int
+       The number of input streams that read the buffer.
+    size: int, optional
+       The number of elements in the buffer.
+       default: BUFFER_SIZE
+    name, max_wait_time, slab: see SharedBuffer.
+
+    Attributes
+    ----------
+    array: multiprocessing.Array
+       The shared memory of the buffer. None if the buffer uses the
+       memory of a slab.
+    view: np.ndarray
+       A NumPy view of array. Segments are written and read
+       through this view, without creating a Python object for
+       each element.
+
+    """
+    def __init__(self, typecode, num_readers, size=BUFFER_SIZE,
+                 name=None, max_wait_time=MAX_WAIT_TIME, slab=None):
+        super(SharedArrayBuffer, self).__init__(
+            size, num_readers, name, max_wait_time, slab)
+        self.typecode = typecode
+        if slab is not None:
+            self.array = None
+            self.view = np.frombuffer(
+                slab.buf, dtype=np.dtype(typecode), count=size)
+        else:
+            self.array = multiprocessing.Array(typecode, size, lock=False)
+            self.view = np.frombuffer(self.array, dtype=np.dtype(typecode))
+
+    def write(self, data):
+        """
+        Writes data, a list or array, into the buffer after waiting
+        for space.
+
+        Returns
+        -------
+           (start, end): the positions of the segment in the buffer.
+
+        """
+        n = len(data)
+        self.wait_for_space(n)
+        slot = self.ptr % self.size
+        first = min(n, self.size - slot)
+        self.view[slot:slot+first] = data[:first]
+        if first < n:
+            # Wrap around the end of the buffer.
+            self.view[:n-first] = data[first:]
+        start = self.ptr
+        self.ptr += n
+        self.end.value = self.ptr
+        return (start, self.ptr)
+
+    def read(self, start, end):
+        """
+        Returns the list of views of the buffer (one view, or two
+        if the segment wraps around the end of the buffer) that hold
+        the segment between positions start and end.
+
+        """
+        slot = start % self.size
+        n = end - start
+        first = min(n, self.size - slot)
+        if first == n:
+            return [self.view[slot:slot+n]]
+        return [self.view[slot:], self.view[:n-first]]
+
+
+class SharedNDArrayBuffer(SharedArrayBuffer):
+    """
+    A circular buffer in shared memory for segments of streams whose
+    elements are rows of a NumPy dtype and shape. Segments are
+    written and read in the same way as in SharedArrayBuffer; a
+    segment is an array whose first axis is the row.
+
+    Parameters
+    ----------
+    stream_type: dtype-like
+       The type of a row. See dtype_and_shape().
+    num_readers: int
+       The number of input streams that read the buffer.
+    size: int, optional
+       The number of rows in the buffer.
+       default: BUFFER_SIZE
+    name, max_wait_time, slab: see SharedBuffer.
+
+    Attributes
+    ----------
+    dtype: np.dtype
+       The dtype of the elements of a row.
+    shape: tuple
+       The shape of a row. () for a row that is a scalar or a
+       record of a structured dtype.
+    shm: multiprocessing.shared_memory.SharedMemory or None
+       See allocate_shared_bytes().
+    view: np.ndarray
+       The array of shape (size,) + shape in the shared memory.
+
+    """
+    def __init__(self, stream_type, num_readers, size=BUFFER_SIZE,
+                 name=None, max_wait_time=MAX_WAIT_TIME, slab=None):
+        SharedBuffer.__init__(
+            self, size, num_readers, name, max_wait_time, slab)
+        self.dtype, self.shape = dtype_and_shape(stream_type)
+        if slab is not None:
+            self.shm, buf = slab.shm, slab.buf
+        else:
+            self.shm, buf = allocate_shared_bytes(
+                size * row_size(stream_type))
+        self.view = np.ndarray((size,) + self.shape, dtype=self.dtype,
+                               buffer=buf)
+
+
+class SharedObjectBuffer(SharedBuffer):
+    """
+    A circular buffer of bytes in shared memory for segments of
+    streams of Python objects.
+
+    Each call to write(segment) appends one record to the buffer.
+    A record is:
+        number of frames (4 bytes)
+        for each frame: length of frame (8 bytes), frame
+    Frame 0 is the pickle of the segment (a list). The remaining
+    frames are the out-of-band buffers of the pickle, e.g., the
+    data of NumPy arrays in the segment.
+
+    Parameters
+    ----------
+    num_readers: int
+       The number of input streams that read the buffer.
+    size: int, optional
+       The number of bytes in the buffer.
+       default: OBJECT_BUFFER_SIZE
+    name, max_wait_time, slab: see SharedBuffer.
+
+    Attributes
+    ----------
+    shm: multiprocessing.shared_memory.SharedMemory or None
+       The shared memory that holds the buffer. None before
+       Python 3.8, when the buffer is a multiprocessing.Array
+       of bytes. See allocate_shared_bytes().
+    buf: memoryview
+       The bytes of the buffer.
+
+    Notes
+    -----
+    Before Python 3.8 each record has a single, in-band, frame.
+
+    """
+    def __init__(self, num_readers, size=OBJECT_BUFFER_SIZE,
+                 name=None, max_wait_time=MAX_WAIT_TIME, slab=None):
+        super(SharedObjectBuffer, self).__init__(
+            size, num_readers, name, max_wait_time, slab)
+        if slab is not None:
+            self.shm, self.buf = slab.shm, slab.buf
+        else:
+            self.shm, self.buf = allocate_shared_bytes(size)
+
+    def write(self, segment):
+        """
+        Writes segment, a list of objects, into the buffer after
+        waiting for space.
+
+        Returns
+        -------
+           (start, end): the positions of the record in the buffer.
+
+        """
+        if OUT_OF_BAND:
+            out_of_band = []
+            frames = [pickle.dumps(list(segment), protocol=PICKLE_PROTOCOL,
+                                   buffer_callback=out_of_band.append)]
+            frames.extend([b.raw() for b in out_of_band])
+        else:
+            frames = [pickle.dumps(list(segment), protocol=PICKLE_PROTOCOL)]
+        record_length = _NUM_FRAMES.size + sum(
+            [_FRAME_LENGTH.size + len(frame) for frame in frames])
+        self.wait_for_space(record_length)
+        start = self.ptr
+        ptr = self._put(start, _NUM_FRAMES.pack(len(frames)))
+        for frame in frames:
+            ptr = self._put(ptr, _FRAME_LENGTH.pack(len(frame)))
+            ptr = self._put(ptr, frame)
+        self.ptr = ptr
+        self.end.value = ptr
+        return (start, ptr)
+
+    def read(self, start, end):
+        """
+        Returns the list of objects in the records between positions
+        start and end of the buffer.
+
+        """
+        segment = []
+        ptr = start
+        while ptr != end:
+            num_frames_bytes, ptr = self._get(ptr, _NUM_FRAMES.size)
+            num_frames, = _NUM_FRAMES.unpack(num_frames_bytes)
+            frames = []
+            for _ in range(num_frames):
+                length_bytes, ptr = self._get(ptr, _FRAME_LENGTH.size)
+                length, = _FRAME_LENGTH.unpack(length_bytes)
+                frame, ptr = self._get(ptr, length)
+                frames.append(frame)
+            # The out-of-band frames are copies of the shared buffer.
+            # So, the unpickled objects do not change when the buffer
+            # is overwritten.
+            if len(frames) > 1:
+                segment.extend(pickle.loads(frames[0], buffers=frames[1:]))
+            else:
+                segment.extend(pickle.loads(frames[0]))
+        return segment
+
+    def _put(self, ptr, data):
+        # Copy data into the circular buffer starting at position
+        # ptr, and return the position just after the data.
+        data = memoryview(data).cast('B')
+        n = len(data)
+        slot = ptr % self.size
+        first = min(n, self.size - slot)
+        self.buf[slot:slot+first] = data[:first]
+        if first < n:
+            self.buf[:n-first] = data[first:]
+        return ptr + n
+
+    def _get(self, ptr, n):
+        # Return a copy of n bytes of the circular buffer starting
+        # at position ptr, and the position just after these bytes.
+        slot = ptr % self.size
+        first = min(n, self.size - slot)
+        data = bytearray(self.buf[slot:slot+first])
+        if first < n:
+            data.extend(self.buf[:n-first])
+        return data, ptr + n
@@ -0,0 +1,374 @@
+"""
+This module connects a stream on one host to a stream on another
+host over TCP. It uses asyncio, and so it requires Python 3.
+
+A SocketPublisher sends the segments of a stream to a
+SocketSubscriber. The subscriber calls a callback function for
+each segment that it receives, in the same way that PikaSubscriber
+calls a callback function for each message. For example, the
+callback function of a source of a multicore application copies
+the segment into a stream of the application:
+
+    # Host 1
+    publisher = SocketPublisher('x', host='host2', port=9000)
+    publisher.publish(stream)
+    ... run the computation ...
+    publisher.close()
+
+    # Host 2: source thread target of a MulticoreProcess.
+    def h(proc):
+        subscriber = SocketSubscriber(
+            callback=lambda stream_name, segment: proc.copy_stream(
+                data=segment, stream_name='x'),
+            finished=lambda stream_name: proc.finished_source('x'),
+            port=9000)
+        subscriber.start()
+        subscriber.join()
+
+Frames
+------
+Data is sent in frames. A frame is a header followed by a payload
+of length bytes. The header is (length, kind, sequence number).
+(1) HELLO: the first frame on a connection. Its payload is the
+    name of the published stream.
+(2) SEGMENT: a segment of the stream encoded by encode_segment().
+    A segment of a StreamArray is sent as the bytes of the array.
+    Each segment that the publisher gets from its stream is sent
+    in a single frame.
+(3) FINISHED: the publisher has been closed.
+(4) ACK: sent by the subscriber. It acknowledges all frames with
+    sequence numbers up to the sequence number of the ACK.
+
+Flow control and reconnection
+-----------------------------
+The publisher keeps the frames that have not been acknowledged.
+If the connection fails, the publisher reconnects, with backoff,
+and sends these frames again; the subscriber discards frames that
+it has already received. So, no segment is lost or duplicated.
+
+The total size of unacknowledged frames is at most window bytes.
+A call to publish_list() waits while the window is full. The
+subscriber calls the callback function in its event loop, and it
+does not read from the connection until the callback returns. So,
+a slow callback function slows down the publisher.
+
+"""
+import asyncio
+import collections
+import itertools
+import struct
+import threading
+import time
+
+from ..core.system_parameters import MIN_BACKOFF_TIME, MAX_BACKOFF_TIME
+from ..core.system_parameters import MAX_WAIT_TIME, SOCKET_WINDOW_SIZE
+from ..agent_types.sink import sink_list
+from .segment_encoding import encode_segment, decode_segment
+
+# The header of a frame: (length of payload, kind, sequence number).
+HEADER = struct.Struct('!IBQ')
+HELLO = 0
+SEGMENT = 1
+FINISHED = 2
+ACK = 3
+
+class SocketPublisher(object):
+    """
+    Sends the segments of a stream to a SocketSubscriber. See the
+    module docstring.
+
+    Parameters
+    ----------
+    stream_name: str
+       The name sent to the subscriber with each segment.
+    host: str, optional
+       The host of the subscriber.
+    port: int
+       The port of the subscriber.
+    window: int, optional
+       The maximum number of bytes of unacknowledged frames.
+    max_wait_time: float, optional
+       publish_list() and close() raise RuntimeError if they wait
+       for longer than max_wait_time seconds for the subscriber.
+
+    Attributes
+    ----------
+    frames: collections.deque
+       The unacknowledged frames, as (sequence number, header,
+       payload), in the order in which they are sent.
+    num_unacked_bytes: int
+       The number of bytes in frames.
+    num_connections: int
+       The number of connections made to the subscriber.
+
+    """
+    def __init__(self, stream_name, host='localhost', port=None,
+                 window=SOCKET_WINDOW_SIZE, max_wait_time=MAX_WAIT_TIME):
+        assert port is not None, 'The port of the subscriber is required'
+        self.stream_name = stream_name
+        self.host = host
+        self.port = port
+        self.window = window
+        self.max_wait_time = max_wait_time
+        self.frames = collections.deque()
+        self.num_unacked_bytes = 0
+        self.next_sequence_number = 1
+        self.num_connections = 0
+        self.condition = threading.Condition()
+        self.stopped = False
+        self.loop = asyncio.new_event_loop()
+        self.ready = threading.Event()
+        self.thread = threading.Thread(target=self.thread_target)
+        self.thread.daemon = True
+        self.thread.start()
+        self.ready.wait()
+
+    def thread_target(self):
+        asyncio.set_event_loop(self.loop)
+        # The sending coroutine waits for wakeup when it has no frames
+        # to send.
+        self.wakeup = asyncio.Event()
+        self.ready.set()
+        self.loop.run_until_complete(self.send_frames())
+        self.loop.close()
+
+    def put_frame(self, kind, payload):
+        """
+        Puts a frame into frames, waiting while the window is full,
+        and wakes up the sending coroutine.
+
+        """
+        with self.condition:
+            start_time = time.time()
+            while (self.num_unacked_bytes > 0 and
+                   self.num_unacked_bytes + len(payload) > self.window):
+                remaining_time = start_time + self.max_wait_time - time.time()
+                if remaining_time <= 0:
+                    raise RuntimeError(
+                        'The subscriber of stream {0} at {1}:{2} has not '
+                        'acknowledged data for {3} seconds'.format(
+                            self.stream_name, self.host, self.port,
+                            self.max_wait_time))
+                self.condition.wait(remaining_time)
+            header = HEADER.pack(len(payload), kind, self.next_sequence_number)
+            self.frames.append((self.next_sequence_number, header, payload))
+            self.next_sequence_number += 1
+            self.num_unacked_bytes += len(header) + len(payload)
+        self.loop.call_soon_threadsafe(self.wakeup.set)
+
+    def publish_list(self, stream_segment):
+        """
+        Sends stream_segment, a list or a NumPy array, in a single
+        frame.
+
+        """
+        if len(stream_segment) > 0:
+            self.put_frame(SEGMENT, encode_segment(stream_segment))
+
+    def publish(self, stream):
+        """
+        Creates an agent that publishes the segments of stream.
+
+        """
+        sink_list(self.publish_list, stream)
+
+    def close(self):
+        """
+        Sends FINISHED, waits until the subscriber has acknowledged
+        all frames, and closes the connection.
+
+        """
+        self.put_frame(FINISHED, b'')
+        with self.condition:
+            start_time = time.time()
+            while self.frames:
+                remaining_time = start_time + self.max_wait_time - time.time()
+                if remaining_time <= 0:
+                    break
+                self.condition.wait(remaining_time)
+            acknowledged = not self.frames
+        self.stopped = True
+        self.loop.call_soon_threadsafe(self.wakeup.set)
+        self.thread.join()
+        if not acknowledged:
+            raise RuntimeError(
+                'The subscriber of stream {0} at {1}:{2} did not acknowledge '
+                'all data'.format(self.stream_name, self.host, self.port))
+
+    def acknowledge(self, sequence_number):
+        # Discard the frames acknowledged by the subscriber.
+        with self.condition:
+            while self.frames and self.frames[0][0] <= sequence_number:
+                seq, header, payload = self.frames.popleft()
+                self.num_unacked_bytes -= len(header) + len(payload)
+            self.condition.notify_all()
+
+    async def read_acks(self, reader):
+        # Reads ACK frames until the connection is closed.
+        try:
+            while True:
+                length, kind, sequence_number = HEADER.unpack(
+                    await reader.readexactly(HEADER.size))
+                if kind == ACK:
+                    self.acknowledge(sequence_number)
+        except (asyncio.IncompleteReadError, OSError):
+            return
+
+    async def send_frames(self):
+        # Connects to the subscriber, and reconnects with backoff when
+        # the connection fails. Sends frames that have not been sent on
+        # the current connection until the publisher is stopped.
+        backoff_time = MIN_BACKOFF_TIME
+        hello = self.stream_name.encode('utf-8')
+        while not self.stopped:
+            try:
+                reader, writer = await asyncio.open_connection(
+                    self.host, self.port)
+            except OSError:
+                await asyncio.sleep(backoff_time)
+                backoff_time = min(2*backoff_time, MAX_BACKOFF_TIME)
+                continue
+            backoff_time = MIN_BACKOFF_TIME
+            self.num_connections += 1
+            ack_task = self.loop.create_task(self.read_acks(reader))
+            # All unacknowledged frames are sent on a new connection.
+            next_to_send = 0
+            try:
+                writer.write(HEADER.pack(len(hello), HELLO, 0) + hello)
+                while not self.stopped and not ack_task.done():
+                    self.wakeup.clear()
+                    with self.condition:
+                        if self.frames:
+                            first = max(next_to_send - self.frames[0][0], 0)
+                            frames = list(itertools.islice(
+                                self.frames, first, None))
+                        else:
+                            frames = []
+                    if frames:
+                        for seq, header, payload in frames:
+                            writer.write(header)
+                            writer.write(payload)
+                        next_to_send = frames[-1][0] + 1
+                        await writer.drain()
+                    else:
+                        wakeup_task = self.loop.create_task(self.wakeup.wait())
+                        await asyncio.wait(
+                            [wakeup_task, ack_task],
+                            return_when=asyncio.FIRST_COMPLETED)
+                        wakeup_task.cancel()
+            except OSError:
+                pass
+            ack_task.cancel()
+            writer.close()
+
+class SocketSubscriber(object):
+    """
+    Receives segments of streams from SocketPublishers. See the
+    module docstring.
+
+    Parameters
+    ----------
+    callback: function
+       callback(stream_name, segment) is called for each segment
+       received, in order. A segment of a StreamArray is a
+       read-only NumPy array.
+    host: str, optional
+       The interface on which the subscriber listens.
+    port: int, optional
+       The port on which the subscriber listens. If port is 0 then
+       a free port is chosen; it is self.port after start().
+    finished: function, optional
+       finished(stream_name) is called when the publisher of the
+       stream called stream_name is closed.
+
+    Attributes
+    ----------
+    sequence_numbers: dict
+       sequence_numbers[stream_name] is the sequence number of the
+       last frame received from the publisher of the stream.
+
+    """
+    def __init__(self, callback, host='localhost', port=0, finished=None):
+        self.callback = callback
+        self.host = host
+        self.port = port
+        self.finished = finished
+        self.sequence_numbers = {}
+        self.writers = set()
+        self.loop = asyncio.new_event_loop()
+        self.ready = threading.Event()
+        self.thread = None
+
+    def start(self):
+        """
+        Starts listening, in a thread, and returns when the
+        subscriber is ready for connections.
+
+        """
+        self.thread = threading.Thread(target=self.thread_target)
+        self.thread.daemon = True
+        self.thread.start()
+        self.ready.wait()
+
+    def thread_target(self):
+        asyncio.set_event_loop(self.loop)
+        self.stop_event = asyncio.Event()
+        self.loop.run_until_complete(self.serve())
+        self.loop.close()
+
+    async def serve(self):
+        server = await asyncio.start_server(
+            self.handle_connection, self.host, self.port)
+        self.port = server.sockets[0].getsockname()[1]
+        self.ready.set()
+        await self.stop_event.wait()
+        server.close()
+        self.close_connections()
+        await server.wait_closed()
+
+    async def handle_connection(self, reader, writer):
+        self.writers.add(writer)
+        try:
+            length, kind, seq = HEADER.unpack(
+                await reader.readexactly(HEADER.size))
+            assert kind == HELLO
+            stream_name = (await reader.readexactly(length)).decode('utf-8')
+            while True:
+                length, kind, sequence_number = HEADER.unpack(
+                    await reader.readexactly(HEADER.size))
+                payload = await reader.readexactly(length)
+                # Discard a frame that was received on an earlier
+                # connection.
+                if sequence_number > self.sequence_numbers.get(stream_name, 0):
+                    self.sequence_numbers[stream_name] = sequence_number
+                    if kind == SEGMENT:
+                        self.callback(stream_name, decode_segment(payload))
+                    elif kind == FINISHED and self.finished is not None:
+                        self.finished(stream_name)
+                writer.write(HEADER.pack(0, ACK, sequence_number))
+        except (asyncio.IncompleteReadError, OSError):
+            pass
+        finally:
+            self.writers.discard(writer)
+            writer.close()
+
+    def close_connections(self):
+        """
+        Closes the connections to publishers. Publishers reconnect.
+        Call in the event loop of the subscriber, e.g., with
+        self.loop.call_soon_threadsafe(self.close_connections).
+
+        """
+        for writer in list(self.writers):
+            writer.close()
+
+    def close(self):
+        """
+        Stops listening and closes all connections.
+
+        """
+        self.loop.call_soon_threadsafe(self.stop_event.set)
+        self.join()
+
+    def join(self):
+        self.thread.join()
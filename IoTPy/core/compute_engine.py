@@ -1,5 +1,4 @@
 import threading
-import multiprocessing
 import sys
 # Check the version of Python
 is_py2 = sys.version[0] == '2'
@@ -7,6 +6,59 @@ if is_py2:
     import Queue as queue
 else:
     import queue as queue
+# queue.SimpleQueue (Python 3.7+) is a lock-light FIFO for
+# threads in a single process. Fall back to queue.Queue for
+# older versions of Python.
+try:
+    SimpleQueue = queue.SimpleQueue
+except AttributeError:
+    SimpleQueue = queue.Queue
+from .helper_control import _multivalue
+# A ThreadPoolExecutor executes agents in parallel when a
+# ComputeEngine has more than one thread.
+try:
+    from concurrent.futures import ThreadPoolExecutor
+except ImportError:
+    ThreadPoolExecutor = None
+
+# _thread_local.scheduler is the ComputeEngine of the calling
+# thread, or None if the thread uses the default, Stream.scheduler.
+_thread_local = threading.local()
+
+def set_thread_scheduler(scheduler):
+    """
+    Makes scheduler the ComputeEngine of the calling thread, and
+    returns the previous ComputeEngine of the thread. Streams that
+    are not bound to a ComputeEngine put the agents that they wake
+    up into the ComputeEngine of the thread that modifies them.
+    If scheduler is None then the thread uses the default,
+    Stream.scheduler. See current_scheduler() in stream.py.
+
+    """
+    previous = getattr(_thread_local, 'scheduler', None)
+    _thread_local.scheduler = scheduler
+    return previous
+
+def get_thread_scheduler():
+    """
+    Returns the ComputeEngine of the calling thread, or None if
+    the thread uses the default, Stream.scheduler.
+
+    """
+    return getattr(_thread_local, 'scheduler', None)
+
+def append_or_extend(stream, data):
+    """
+    Appends data to stream, or, if data is _multivalue(segment),
+    extends stream with segment. A message (stream_name,
+    _multivalue(segment)) in the input_queue of a ComputeEngine
+    extends the stream in a single step.
+
+    """
+    if isinstance(data, _multivalue):
+        stream.extend(data.lst)
+    else:
+        stream.append(data)
 
 class ComputeEngine(object):
     """
@@ -22,13 +74,27 @@ class ComputeEngine(object):
       operates.
       A process name is required for executing multicore
       computations using multicore.py
+    num_threads: int (optional)
+      The number of threads that execute agents in step().
+      If num_threads is 1 (the default) then step() executes
+      agents one after another in the calling thread. See
+      step_in_parallel() for num_threads > 1.
 
     Attributes
     ----------
-    input_queue: multiprocessing.Queue
+    input_queue: SimpleQueue or multiprocessing.Queue
        Elements for input streams of this thread are put
        in this queue. Each element of the queue is a 2-tuple:
-       (stream_name, data). 
+       (stream_name, data). If data is _multivalue(segment)
+       then the stream is extended with segment.
+       If the ComputeEngine is not part of a MulticoreProcess
+       then all producers are threads in the same process, and
+       input_queue is an in-process queue.SimpleQueue; putting
+       a value into this queue does not pickle the value or
+       write it to an OS pipe.
+       If the ComputeEngine is part of a MulticoreProcess then
+       input_queue is the multiprocessing.Queue, in_queue, of
+       that process because other processes put values into it.
     name_to_stream: dict
        key: stream name
        value: stream
@@ -90,21 +156,24 @@ class ComputeEngine(object):
     terminates if no data is available in input_queue.
 
     """
-    def __init__(self, process=None):
+    def __init__(self, process=None, num_threads=1):
+        assert num_threads == 1 or ThreadPoolExecutor is not None, \
+          'num_threads > 1 requires concurrent.futures'
         self.process = process
+        self.num_threads = num_threads
+        self.executor = None
         if self.process == None:
             self.process_name = 'DefaultProcess'
             self.process_id = 0
-            self.main_lock = None
-            self.source_status = None
-            self.queue_status = None
         else:
             self.process_name = process.name
             self.process_id = self.process.process_ids[self.process_name]
-            self.main_lock = self.process.main_lock
-            self.source_status = self.process.source_status
-            self.queue_status = self.process.queue_status
-        self.input_queue = multiprocessing.Queue()
+        if self.process == None:
+            # All producers are threads in this process.
+            self.input_queue = SimpleQueue()
+        else:
+            # Producers may be other processes.
+            self.input_queue = self.process.in_queue
         self.name_to_stream = {}
         self.q_agents = queue.Queue()
         self.scheduled_agents = set()
@@ -153,30 +222,34 @@ class ComputeEngine(object):
             return a
 
     def create_compute_thread(self):
-        def target_of_compute_thread():
+        def target_of_single_process_compute_thread():
+            # This ComputeEngine is not part of a MulticoreProcess.
+            # So, there is no termination detection across processes;
+            # the thread stops when it gets a ('stop', 'stop') message.
+            # Agents woken up in this thread are put in this ComputeEngine.
+            set_thread_scheduler(self)
             while not self.stopped:
+                out_stream_name, new_data_for_stream = self.input_queue.get()
+                if out_stream_name == 'source_finished':
+                    pass
+                elif out_stream_name == 'stop':
+                    self.stopped = True
+                else:
+                    out_stream = self.name_to_stream[out_stream_name]
+                    append_or_extend(out_stream, new_data_for_stream)
+                    self.step()
+            return
 
-                # With main_lock -------------------------------
-                self.main_lock.acquire()
-                # If the input queue is empty then set the queue
-                # status of this process to empty, i.e., 0.
-                if self.input_queue.empty():
-                    self.queue_status[self.process_id] = 0
-                # If all the sources have finished and all the queues
-                # are empty then broadcast 'stop'. This broadcast
-                # message is received by this process as well.
-                # So, the input queue of this process will also contain
-                # the 'stop' message, and so this queue will not be empty.
-                # When a 'stop' message is received, this thread terminates.
-                if sum(self.source_status) + sum(self.queue_status) == 0:
-                    # Broadcast 'stop'
-                    # The stream name and stream element are both 'stop'.
-                    self.process.broadcast('stop', 'stop')
-                self.main_lock.release()
-                # Released main_lock -------------------------------
-
+        def target_of_compute_thread():
+            set_thread_scheduler(self)
+            while not self.stopped:
+                # Get a message without blocking. If the input queue is
+                # empty then this process is idle, and it takes part in
+                # termination detection before it waits for a message.
                 try:
-                    v = self.input_queue.get()
+                    v = self.input_queue.get_nowait()
+                except queue.Empty:
+                    v = None
                 except:
                     # Something unexpected happen. So, this thread terminates.
                     # Also, tell other processes to terminate.
@@ -184,45 +257,70 @@ class ComputeEngine(object):
                     # msg_to_all_other_processes() is like broadcast, except
                     # that a process does not send a message to itself.
                     self.process.msg_to_all_other_processes('stop', 'stop')
+                    break
 
-                if not self.stopped:
-                    # Succeeded in getting a message from input_queue.
-                    # The status of this queue is not empty.
-                    self.queue_status[self.process_id] = 1
-                    # This message, v, is:
-                    #     (stream name, element for this stream)
-                    # Get the specified stream name and its next element.
-                    out_stream_name, new_data_for_stream = v
-                    if out_stream_name == 'source_finished':
-                        # A source has finished generating values. The
-                        # status of this source is set to finished, i.e. 0.
-                        # Execution returns to the beginning of the while loop
-                        # where the check for termination is carried out.
-                        # Termination is when all sources have terminated
-                        # and input queues of all processes are empty.
-                        pass
-                    elif out_stream_name == 'stop':
-                        # This process may have broadcast 'stop' itself, and it
-                        # now receives its own 'stop' message. Or, some other
-                        # process broadcast ('stop', 'stop'). In either case, this
-                        # process receives a 'stop' message. So stop this process.
+                if v is None:
+                    # The process forwards the termination detection
+                    # token if it holds the token and all its sources
+                    # have finished. The process that detects termination
+                    # broadcasts 'stop'. This broadcast message is
+                    # received by this process as well. When a 'stop'
+                    # message is received, this thread terminates.
+                    # See MulticoreProcess.idle().
+                    self.process.idle()
+                    try:
+                        v = self.input_queue.get()
+                    except:
                         self.stopped = True
-                    else:
-                        # This message is to be appended to the specified
-                        # out_stream.
-                        # Get the stream from its name
-                        out_stream = self.name_to_stream[out_stream_name] 
-                        out_stream.append(new_data_for_stream)
-                        # Take a step of the computation, i.e.
-                        # process the new input data and continue
-                        # executing this thread.
-                        self.step()
+                        self.process.msg_to_all_other_processes('stop', 'stop')
+                        break
+
+                # This message, v, is:
+                #     (stream name, element for this stream)
+                # Get the specified stream name and its next element.
+                out_stream_name, new_data_for_stream = v
+                if out_stream_name == 'source_finished':
+                    # A source of this process has finished generating
+                    # values. Execution returns to the beginning of the
+                    # while loop where this process, if it is idle, takes
+                    # part in termination detection.
+                    pass
+                elif out_stream_name == '_token_':
+                    # The termination detection token. It is forwarded
+                    # when this process is idle.
+                    self.process.token = new_data_for_stream
+                elif out_stream_name == 'stop':
+                    # This process may have broadcast 'stop' itself, and it
+                    # now receives its own 'stop' message. Or, some other
+                    # process broadcast ('stop', 'stop'). In either case, this
+                    # process receives a 'stop' message. So stop this process.
+                    self.stopped = True
+                else:
+                    # This message is to be appended to the specified
+                    # out_stream.
+                    # Get the stream from its name
+                    out_stream = self.name_to_stream[out_stream_name]
+                    append_or_extend(out_stream, new_data_for_stream)
+                    # Take a step of the computation, i.e.
+                    # process the new input data and continue
+                    # executing this thread.
+                    self.step()
+                    # A signal is counted as received only after the
+                    # step that it caused is over; so, any signal sent
+                    # in the step is counted as sent before this signal
+                    # is counted as received.
+                    if out_stream_name.endswith('_signal_'):
+                        self.process.signal_received()
             # Exit loop, and terminate thread when self.stopped is
             # True. 
             return
 
+        if self.process == None:
+            target = target_of_single_process_compute_thread
+        else:
+            target = target_of_compute_thread
         self.compute_thread = threading.Thread(
-            target=target_of_compute_thread,
+            target=target,
             name=self.process_name, args=())
 
     def start(self):
@@ -245,12 +343,119 @@ class ComputeEngine(object):
         agents in the queue of agents.
 
         """
+        if self.num_threads > 1:
+            return self.step_in_parallel()
         while self.scheduled_agents:
             a = self.q_agents.get()
             self.scheduled_agents.discard(a)
             a.next()
         return
 
+    def step_in_parallel(self):
+        """
+        Same as step() except that agents are executed by a pool
+        of num_threads threads. This helps when agents spend their
+        time in NumPy or SciPy functions that release the global
+        interpreter lock, and the graph has independent branches.
+
+        Two agents execute at the same time only if neither agent
+        writes a stream that the other agent reads or writes. So,
+        an agent is never executed by two threads at the same
+        time, and the elements of each stream are appended in the
+        same order as in step(). An agent that has no input or
+        output streams, such as a BasicAgent, is executed only
+        when no other agent is executing.
+        An agent must modify streams only through its out_streams;
+        for example, an agent must not append values to a stream
+        that is not one of its out_streams.
+
+        """
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=self.num_threads)
+        # finished gets (agent, exception) when an agent finishes a step.
+        finished = SimpleQueue()
+        # pending: agents taken from q_agents that have not started.
+        pending = []
+        # running: agents that are executing.
+        running = set()
+        # num_readers[id(s)] and num_writers[id(s)] are the numbers of
+        # running agents that read and write stream s.
+        num_readers = {}
+        num_writers = {}
+        error = None
+
+        def execute(a):
+            # Agents woken up by a are put into this ComputeEngine.
+            set_thread_scheduler(self)
+            try:
+                a.next()
+                finished.put((a, None))
+            except Exception as e:
+                finished.put((a, e))
+
+        def can_start(a):
+            if a in running:
+                return False
+            if not (a.in_streams or a.out_streams):
+                return not running
+            for s in a.out_streams:
+                if num_readers.get(id(s)) or num_writers.get(id(s)):
+                    return False
+            for s in a.in_streams:
+                if num_writers.get(id(s)):
+                    return False
+            # An agent without streams is running.
+            return not any([not (b.in_streams or b.out_streams)
+                            for b in running])
+
+        def add(counts, streams, increment):
+            for s in streams:
+                counts[id(s)] = counts.get(id(s), 0) + increment
+
+        while True:
+            # Move newly scheduled agents to pending.
+            with self.lock:
+                while not self.q_agents.empty():
+                    a = self.q_agents.get()
+                    self.scheduled_agents.discard(a)
+                    if a not in pending:
+                        pending.append(a)
+            # Start the pending agents, in order, that can start.
+            if error is None:
+                waiting = []
+                for a in pending:
+                    if can_start(a):
+                        running.add(a)
+                        add(num_readers, a.in_streams, 1)
+                        add(num_writers, a.out_streams, 1)
+                        self.executor.submit(execute, a)
+                    else:
+                        waiting.append(a)
+                pending = waiting
+            if not running:
+                if error is not None:
+                    raise error
+                if not self.scheduled_agents:
+                    return
+                continue
+            # Wait for an agent to finish.
+            a, e = finished.get()
+            running.discard(a)
+            add(num_readers, a.in_streams, -1)
+            add(num_writers, a.out_streams, -1)
+            if e is not None and error is None:
+                error = e
+
+    def stop(self):
+        """
+        Stops the compute thread of a ComputeEngine that is not
+        part of a MulticoreProcess. The thread stops after it
+        has processed the messages put into input_queue before
+        this call.
+
+        """
+        self.input_queue.put(('stop', 'stop'))
+
     def join(self):
         self.compute_thread.join()
 
@@ -79,10 +79,13 @@ def remove_novalue_and_open_multivalue(l):
             isinstance(v, tuple)):
             return_list.append(v)
         else:
-            if (v == _no_value or
-                v == _unchanged):
+            # _no_value, _unchanged and _changed are classes, and so
+            # they are compared by identity. Comparing with == is slow
+            # for NumPy scalars.
+            if (v is _no_value or
+                v is _unchanged):
                 continue
-            elif (v == _changed):
+            elif (v is _changed):
                 return_list.append(1)
             elif isinstance(v, _multivalue):
                 return_list.extend(v.lst)
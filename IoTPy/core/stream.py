@@ -11,6 +11,7 @@ import numpy as np
 from .system_parameters import DEFAULT_NUM_IN_MEMORY
 # compute_engine is in IoTPy/IoTPy/core
 from .compute_engine import ComputeEngine
+from .compute_engine import set_thread_scheduler, get_thread_scheduler
 # helper_control is in IoTPy/IoTPy/core
 from .helper_control import TimeAndValue, _multivalue
 from .helper_control import _no_value
@@ -261,20 +262,27 @@ class Stream(object):
 
     """
     # SCHEDULER
-    # The scheduler is a Class attribute. It is not an
-    # object instance attribute. All instances of Stream
-    # use the same scheduler. Each process has its own
-    # scheduler. Each process executes its computation in
-    # a single thread. This computational thread takes an
-    # agent from the scheduler queue and executes a step
-    # of that agent.
+    # The default scheduler is a Class attribute. It is not an
+    # object instance attribute. Each process has its own
+    # default scheduler. A computation that runs in a single
+    # thread uses the default scheduler: the thread takes an
+    # agent from the scheduler queue and executes a step of
+    # that agent.
+    # Several computations can run in parallel in different
+    # threads of a process if each computation has its own
+    # scheduler. A thread selects its scheduler by calling
+    # set_thread_scheduler(), and a stream can be bound to a
+    # scheduler when it is created. See get_scheduler().
     scheduler = ComputeEngine()
+    # The scheduler to which this stream is bound, or None.
+    bound_scheduler = None
     
     def __init__(self, name="UnnamedStream", 
                  initial_value=[],
                  num_in_memory=DEFAULT_NUM_IN_MEMORY,
-                 discard_None=True):
+                 discard_None=True, scheduler=None):
         self.name = name
+        self.bound_scheduler = scheduler
         self.num_in_memory = num_in_memory
         self._begin = 0
         self.offset = 0
@@ -324,12 +332,29 @@ class Stream(object):
         """
         self.subscribers_set.discard(agent)
 
+    def get_scheduler(self):
+        """
+        Returns the scheduler into which this stream puts the agents
+        that it wakes up: the scheduler to which the stream is bound,
+        if any, and otherwise the scheduler of the calling thread.
+
+        """
+        if self.bound_scheduler is not None:
+            return self.bound_scheduler
+        scheduler = get_thread_scheduler()
+        if scheduler is None:
+            return Stream.scheduler
+        return scheduler
+
     def wakeup_subscribers(self):
         # Put subscribers (i.e. agents in self.subscribers_set) into
         # the compute_engine's queue. Each agents in this queue will be
         # removed from the queue and then execute a step.  
+        if not self.subscribers_set:
+            return
+        scheduler = self.get_scheduler()
         for subscriber in self.subscribers_set:
-            self.scheduler.put(subscriber)
+            scheduler.put(subscriber)
 
     def append(self, value):
         """
@@ -593,7 +618,11 @@ class Stream(object):
         # necessary; however, doing so helps in debugging. If an
         # agent reads a list of zeros then the agent is probably
         # reading an uninitialized part of the stream
-        self.recent[self.stop:] = [0]*(len(self.recent) - self.stop)
+        if isinstance(self.recent, np.ndarray):
+            # The rows of a StreamArray may be arrays or records.
+            self.recent[self.stop:] = 0
+        else:
+            self.recent[self.stop:] = [0]*(len(self.recent) - self.stop)
 
         # A reader reading the value in a slot j in the old recent
         # will now read the same value in slot (j - num_shift) in the
@@ -679,7 +708,7 @@ class Stream(object):
 class StreamArray(Stream):
     def __init__(self, name="NoName",
                  dimension=0, dtype=float, initial_value=None,
-                 num_in_memory=DEFAULT_NUM_IN_MEMORY):
+                 num_in_memory=DEFAULT_NUM_IN_MEMORY, scheduler=None):
         """
         A StreamArray is a version of Stream treated as a NumPy array.
         The buffer, recent, is a NumPy array.
@@ -692,6 +721,9 @@ class StreamArray(Stream):
         dimension: a nonnegative integer, or a non-empty tuple or a
             a non-empty list, or an array of positive integers.
         dtype: a NumPy data type
+        scheduler: ComputeEngine, optional
+            The scheduler to which this stream is bound. See
+            Stream.get_scheduler().
 
         Notes
         -----
@@ -735,6 +767,7 @@ class StreamArray(Stream):
                )
         self.num_in_memory = num_in_memory
         self.name = name
+        self.bound_scheduler = scheduler
         self.dimension = dimension
         self.dtype = dtype
         self.recent = self._create_recent(2*num_in_memory)
@@ -806,9 +839,16 @@ class StreamArray(Stream):
             return
         
         # output_array should be an array.
+        # A list or tuple has no dtype. Its elements are converted to
+        # the dtype of this StreamArray only if the conversion is
+        # within the same kind, e.g. from int64 to int32; otherwise
+        # the type check below fails as before.
         if isinstance(output_array, list) or isinstance(output_array, tuple):
             output_array = remove_novalue_and_open_multivalue(output_array)
             output_array = np.array(output_array)
+            if (output_array.dtype != self.dtype and
+                np.can_cast(output_array.dtype, self.dtype, casting='same_kind')):
+                output_array = output_array.astype(self.dtype)
 
         assert(isinstance(output_array, np.ndarray)), 'Exending stream array, {0}, ' \
         ' with an object, {1}, that is not an array.'.format(
@@ -931,5 +971,17 @@ class StreamArray(Stream):
 
 
 #------------------------------------------------------------------------------
-def run(): Stream.scheduler.step()
+def current_scheduler():
+    """
+    Returns the scheduler of the calling thread: the scheduler set
+    by set_thread_scheduler() in this thread, if any, and otherwise
+    the default, Stream.scheduler.
+
+    """
+    scheduler = get_thread_scheduler()
+    if scheduler is None:
+        return Stream.scheduler
+    return scheduler
+
+def run(): current_scheduler().step()
 #------------------------------------------------------------------------------
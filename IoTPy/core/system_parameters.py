@@ -7,12 +7,27 @@ DEFAULT_NUM_IN_MEMORY = 2**20
 max_wait_time = 4.0
 # BUFFER_SIZE is the default length of each buffer.
 BUFFER_SIZE = 2**20
-# MAX_NUM_SOURCES is the maximum number of sources
-# in a multicore application.
-MAX_NUM_SOURCES = 10
-# MAX_NUM_PROCESSES is the maximum number of sources
-# in a single multicore program.
-MAX_NUM_PROCESSES = 8
+# OBJECT_BUFFER_SIZE is the default number of bytes in the
+# shared-memory buffer of a stream of Python objects.
+OBJECT_BUFFER_SIZE = 2**24
+# A process that writes a full buffer waits for readers. The
+# waiting time starts at MIN_BACKOFF_TIME seconds and doubles
+# up to MAX_BACKOFF_TIME seconds while the buffer remains full.
+MIN_BACKOFF_TIME = 1E-5
+MAX_BACKOFF_TIME = 1E-2
+# A process that waits longer than MAX_WAIT_TIME seconds for
+# readers of a full buffer raises an exception because a reader
+# has probably terminated.
+MAX_WAIT_TIME = 60.0
 
 
 
+# A thread of a multithreaded application (see multithread.py)
+# gets at most MAX_BATCH_SIZE messages from its input queue, and
+# spends at most MAX_BATCH_LATENCY seconds getting them, before
+# it executes a step of its computation.
+MAX_BATCH_SIZE = 1024
+MAX_BATCH_LATENCY = 1E-3
+# SOCKET_WINDOW_SIZE is the default maximum number of bytes that a
+# SocketPublisher sends without acknowledgement from its subscriber.
+SOCKET_WINDOW_SIZE = 2**22
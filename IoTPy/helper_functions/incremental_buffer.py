@@ -1,37 +1,30 @@
+"""
+incremental_buffer is a buffer of the most recent max_size rows of
+a 2-D array. It is a RingBuffer (see ring_buffer.py): extending it
+is O(1) per row, and value is a view of the rows in the buffer, in
+order of arrival, that is not copied.
+
+"""
 import numpy as np
 
-class incremental_buffer(object):
+from .ring_buffer import RingBuffer
+
+class incremental_buffer(RingBuffer):
     def __init__(self, max_size):
-        self.max_size = max_size
-        self.value = None
-        self.num_features = 0
-        self.num_samples = 0
+        super(incremental_buffer, self).__init__(max_size)
     def extend(self, input):
         assert len(input.shape) == 2
-        num_new_entries, num_features = input.shape 
-        input_size = len(input)
-        assert input_size <= self.max_size
-        if self.num_samples == 0:
-            self.num_features = num_features
-            self.value = np.zeros((self.max_size, self.num_features))
-            self.num_samples = input_size
-            self.value[:input_size] = input
-        elif self.num_samples + input_size <= self.max_size:
-            assert self.num_features == num_features
-            new_num_samples = self.num_samples + input_size
-            self.value[self.num_samples : new_num_samples] = input
-            self.num_samples = new_num_samples
-        elif self.num_samples < self.max_size:
-            gap = self.max_size - self.num_samples
-            self.value[self.num_samples : self.max_size] = \
-              input[: gap]
-            self.value = np.roll(self.value,-(input_size-gap), axis=0)
-            self.value[-input_size: ] = input
-            self.num_samples = self.max_size
-        else:
-            self.value = np.roll(self.value,-input_size, axis=0)
-            self.value[-input_size: ] = input
-        return
+        assert len(input) <= self.max_size
+        super(incremental_buffer, self).extend(input)
+    @property
+    def value(self):
+        return self.view()
+    @property
+    def num_samples(self):
+        return len(self)
+    @property
+    def num_features(self):
+        return 0 if self.data is None else self.data.shape[1]
 
 #---------------------------------------------------------------------
 #          TEST
@@ -39,14 +32,11 @@ class incremental_buffer(object):
 def test_incremental_buffer():
     z = incremental_buffer(5)
     z.extend(np.array([[1, 2, 3], [4, 5, 6]]))
-    expected = np.array([[1., 2., 3.], [4., 5., 6.],
-                         [0., 0., 0.], [0., 0., 0.],
-                         [0., 0., 0.]])
+    expected = np.array([[1., 2., 3.], [4., 5., 6.]])
     assert np.array_equal(z.value, expected)
     z.extend(np.array([[7, 8, 9], [10, 11, 12]]))
     expected = np.array([[1., 2., 3.], [4., 5., 6.],
-                         [7., 8., 9.], [10., 11., 12.],
-                         [0., 0., 0.]])
+                         [7., 8., 9.], [10., 11., 12.]])
     assert np.array_equal(z.value, expected)
     z.extend(np.array([[13, 14, 15], [16, 17, 18], [19, 20, 21]]))
     expected = np.array([[7., 8., 9.], [10., 11., 12.],
@@ -63,10 +53,7 @@ def test_incremental_buffer():
                          [28., 29., 30.], [31., 32, 33],
                          [34., 35., 36.]])
     assert np.array_equal(z.value, expected)
+    assert z.num_samples == 5
 
 if __name__ == '__main__':
     test_incremental_buffer()
-    
-    
-             
-    
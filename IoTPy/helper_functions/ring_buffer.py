@@ -0,0 +1,180 @@
+"""
+RingBuffer is a buffer of the most recent max_size elements of a
+stream, stored in a NumPy array. An element is a scalar, a NumPy
+row of fixed shape, a record of a structured dtype, or, with dtype
+object, any Python object.
+
+The elements are stored contiguously, in order of arrival, in an
+array of 2*max_size rows. When the array is full, the elements in
+the buffer are moved to the front of the array. An element is moved
+at most once for every max_size elements that are appended, so
+appending is O(1) per element, and the elements in the buffer are a
+view of the array, view(), that is not copied.
+
+The elements of a timed buffer are in increasing order of time, and
+reads of the elements up to a time use np.searchsorted. The time of
+an element is:
+(1) its field 'time' if dtype is a structured dtype with a field
+    'time', e.g. timed_dtype() in agent_types/timed_array.py,
+(2) element[0] if an element is a row or a Python sequence,
+(3) the element itself if an element is a number.
+
+"""
+import numpy as np
+
+class RingBuffer(object):
+    """
+    Parameters
+    ----------
+    max_size: int
+       The maximum number of elements in the buffer. When the buffer
+       is full, extending it discards its earliest elements.
+    dtype: NumPy dtype, optional
+       The dtype of the elements. If dtype is None then the dtype,
+       and the shape of an element, are those of the first
+       extension of the buffer.
+    shape: tuple, optional
+       The shape of an element; () for scalars and records.
+    name: str, optional
+
+    """
+    def __init__(self, max_size, dtype=None, shape=(), name=None):
+        assert max_size > 0
+        self.max_size = max_size
+        self.name = name
+        self.data = None
+        self.start = 0
+        self.stop = 0
+        if dtype is not None:
+            self.allocate(np.dtype(dtype), tuple(shape))
+
+    def allocate(self, dtype, shape):
+        self.data = np.zeros((2*self.max_size,) + shape, dtype)
+
+    def __len__(self):
+        return self.stop - self.start
+
+    def to_array(self, values):
+        if self.data is not None and self.data.dtype == object:
+            # Each value is a single element even if it is a sequence.
+            array = np.empty(len(values), dtype=object)
+            for i, value in enumerate(values):
+                array[i] = value
+            return array
+        array = np.asarray(values)
+        if self.data is None:
+            self.allocate(array.dtype, array.shape[1:])
+        return array
+
+    def extend(self, values):
+        """
+        Appends the elements in values, a list or an array, to the
+        buffer.
+
+        """
+        values = self.to_array(values)
+        n = len(values)
+        if n == 0:
+            return
+        if n >= self.max_size:
+            self.data[:self.max_size] = values[n-self.max_size:]
+            self.start, self.stop = 0, self.max_size
+            return
+        # Discard the earliest elements if the buffer overflows.
+        self.start += max(0, len(self) + n - self.max_size)
+        if self.stop + n > len(self.data):
+            # Move the elements in the buffer to the front of the
+            # array. There are at most max_size - n of them.
+            count = len(self)
+            self.data[:count] = self.data[self.start:self.stop]
+            self.start, self.stop = 0, count
+        self.data[self.stop:self.stop+n] = values
+        self.stop += n
+
+    def append(self, value):
+        if self.data is None:
+            self.to_array([value])
+        if len(self) == self.max_size:
+            self.start += 1
+        if self.stop == len(self.data):
+            count = len(self)
+            self.data[:count] = self.data[self.start:self.stop]
+            self.start, self.stop = 0, count
+        self.data[self.stop] = value
+        self.stop += 1
+
+    def view(self):
+        """
+        Returns the elements of the buffer, in order of arrival, as a
+        view of the array of the buffer. The view is valid until the
+        buffer is next extended.
+
+        """
+        if self.data is None:
+            return np.zeros(0)
+        return self.data[self.start:self.stop]
+
+    def read_earliest_n(self, n):
+        return self.view()[:n]
+
+    def get_earliest_n(self, n):
+        """
+        Returns a copy of the earliest n elements and deletes them
+        from the buffer.
+
+        """
+        values = self.view()[:n].copy()
+        self.delete_earliest_n(n)
+        return values
+
+    def delete_earliest_n(self, n):
+        self.start += min(n, len(self))
+        if self.start == self.stop:
+            self.start = self.stop = 0
+
+    def delete_all(self):
+        self.start = self.stop = 0
+
+    def times(self):
+        """
+        Returns the times of the elements of the buffer. See the
+        module docstring.
+
+        """
+        values = self.view()
+        if values.dtype.names is not None and 'time' in values.dtype.names:
+            return values['time']
+        if values.dtype == object:
+            return np.array([value[0] for value in values])
+        if values.ndim > 1:
+            return values[:, 0]
+        return values
+
+    def number_up_to_time(self, time):
+        """
+        Returns the number of elements with time at most time.
+
+        """
+        values = self.view()
+        if values.dtype == object:
+            # Binary search without making an array of the times.
+            low, high = 0, len(values)
+            while low < high:
+                middle = (low + high) // 2
+                if values[middle][0] <= time:
+                    low = middle + 1
+                else:
+                    high = middle
+            return low
+        return int(np.searchsorted(self.times(), time, side='right'))
+
+    def read_up_to_time(self, time):
+        return self.view()[:self.number_up_to_time(time)]
+
+    def get_up_to_time(self, time):
+        """
+        Returns a copy of the elements with time at most time and
+        deletes them from the buffer.
+
+        """
+        return self.get_earliest_n(self.number_up_to_time(time))
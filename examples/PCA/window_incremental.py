@@ -18,8 +18,8 @@ from recent_values import recent_values
 from run import run
 from op import map_window
 from sink import sink_window
-# incremental_buffer is in ../../IoTPy/helper_functions
-from incremental_buffer import incremental_buffer
+# ring_buffer is in ../../IoTPy/helper_functions
+from ring_buffer import RingBuffer
 from basics import fmap_w, sink_w
 
 class incremental_PCA(object):
@@ -29,7 +29,7 @@ class incremental_PCA(object):
         self.n_components = n_components
         self.batch_size = batch_size
         self.n_recompute = n_recompute
-        self.history = incremental_buffer(self.n_recompute*self.batch_size)
+        self.history = RingBuffer(self.n_recompute*self.batch_size)
         self.ipca = IncrementalPCA(self.n_components, self.batch_size)
         self.plotter = plotter
         sink_window(self.f, self.in_stream,
@@ -37,7 +37,7 @@ class incremental_PCA(object):
     def f(self, window):
         self.ipca.partial_fit(window)
         self.history.extend(window)
-        self.transformed_data = self.ipca.transform(self.history.value[:self.history.num_samples])
+        self.transformed_data = self.ipca.transform(self.history.view())
         self.out_stream.extend((self.transformed_data))
         self.plotter.plot(self.transformed_data)
 
@@ -67,11 +67,11 @@ class plot_incremental(object):
 ##     def f(window, state, out_stream):
 ##         ipca.partial_fit(window)
 ##         state.extend(window)
-##         transformed_data = ipca.transform(state.value[:state.num_samples])
+##         transformed_data = ipca.transform(state.view())
 ##         out_stream.extend(transformed_data)
 ##         return state
 ##     f(in_stream, window_size=batch_size, step_size=batch_size,
-##       state=incremental_buffer(n_recompute*batch_size),
+##       state=RingBuffer(n_recompute*batch_size),
 ##       out_stream=out_stream)
 
 def test_incremental_PCA():
@@ -0,0 +1,79 @@
+"""
+This module measures the latency of a ComputeEngine: the time
+from when a source thread puts a value into the engine's
+input_queue to when the first agent that reads the value runs.
+
+Two modes are compared:
+(1) single process: the input_queue is a queue.SimpleQueue
+    because all producers are threads in the same process.
+(2) multiprocess: the input_queue is a multiprocessing.Queue.
+    Every value goes through a feeder thread, pickle and an OS
+    pipe. Note that this mode only swaps the queue type inside a
+    single process; it is not the full MulticoreProcess path, in
+    which the producer is another process and data is copied
+    through shared buffers. It measures the queueing cost alone.
+
+Run from the top-level directory of IoTPy:
+    python -m examples.benchmarks.compute_engine_latency
+
+"""
+import multiprocessing
+import statistics
+import threading
+import time
+
+from IoTPy.core.stream import Stream
+from IoTPy.core.compute_engine import ComputeEngine
+from IoTPy.agent_types.sink import sink_element
+
+
+def measure_latency(input_queue=None, num_messages=2000):
+    """
+    Returns the list of latencies, in microseconds, of
+    num_messages values put into the input_queue of a
+    ComputeEngine by a source thread. If input_queue is None
+    the engine uses its default, in-process, input_queue.
+
+    """
+    engine = ComputeEngine()
+    if input_queue is not None:
+        engine.input_queue = input_queue
+    saved_scheduler = Stream.scheduler
+    Stream.scheduler = engine
+    latencies = []
+    try:
+        x = Stream('x')
+        engine.name_to_stream['x'] = x
+        def record(sent_time):
+            latencies.append((time.perf_counter() - sent_time)*1E6)
+        sink_element(func=record, in_stream=x)
+
+        def source():
+            for i in range(num_messages):
+                engine.input_queue.put(('x', time.perf_counter()))
+                # Wait for the agent to run so that queueing delay
+                # is not included in the latency.
+                while len(latencies) < i + 1:
+                    time.sleep(0)
+            engine.stop()
+
+        source_thread = threading.Thread(target=source)
+        engine.start()
+        source_thread.start()
+        source_thread.join()
+        engine.join()
+    finally:
+        Stream.scheduler = saved_scheduler
+    return latencies
+
+
+def report(label, latencies):
+    latencies = sorted(latencies)
+    print('{0:>14}: median = {1:8.1f} us, p99 = {2:8.1f} us'.format(
+        label, statistics.median(latencies),
+        latencies[int(0.99*(len(latencies)-1))]))
+
+
+if __name__ == '__main__':
+    report('SimpleQueue', measure_latency())
+    report('mp.Queue', measure_latency(multiprocessing.Queue()))
@@ -0,0 +1,108 @@
+"""
+This module compares the models in
+IoTPy/agent_types/incremental_models.py, which are updated with
+each batch of rows of a StreamArray, with models that are refitted
+to all the rows seen so far after each batch, as the examples in
+examples/PCA and examples/K_Means do. The time per batch of the
+refitted models grows with the length of the stream; the time per
+batch of the incremental models does not.
+
+Run from the top-level directory of IoTPy:
+    python -m examples.benchmarks.incremental_models
+
+"""
+import time
+
+import numpy as np
+
+from IoTPy.core.stream import StreamArray, run
+from IoTPy.agent_types.incremental_models import IncrementalPCA
+from IoTPy.agent_types.incremental_models import MiniBatchKMeans
+from IoTPy.agent_types.incremental_models import model_map
+
+
+class RefitPCA(object):
+    # Refits PCA by an SVD of all the rows seen so far.
+    def __init__(self, n_components):
+        self.n_components = n_components
+        self.rows = []
+    def update(self, X):
+        self.rows.append(np.array(X))
+        rows = np.concatenate(self.rows)
+        self.mean = rows.mean(axis=0)
+        self.components = np.linalg.svd(
+            rows - self.mean, full_matrices=False)[2][:self.n_components]
+    def transform(self, X):
+        return (X - self.mean).dot(self.components.T)
+
+
+class RefitKMeans(object):
+    # Refits k-means by Lloyd iterations on all the rows seen so
+    # far, starting from the previous centers.
+    def __init__(self, n_clusters, num_iterations=10):
+        self.n_clusters = n_clusters
+        self.num_iterations = num_iterations
+        self.rows = []
+        self.centers = None
+        self.count = 0
+    def update(self, X):
+        self.rows.append(np.array(X))
+        self.count += len(X)
+        rows = np.concatenate(self.rows)
+        if self.centers is None:
+            self.centers = rows[:self.n_clusters].copy()
+        for _ in range(self.num_iterations):
+            labels = self.predict(rows)
+            for j in range(self.n_clusters):
+                if np.any(labels == j):
+                    self.centers[j] = rows[labels == j].mean(axis=0)
+    def predict(self, X):
+        return np.argmin(((X[:, np.newaxis, :] - self.centers)**2).sum(axis=2),
+                         axis=1)
+
+
+def measure(model, func, data, batch_size, dimension, dtype):
+    # Returns the rows per second, and the times of the first and
+    # last batches.
+    x = StreamArray('x', dimension=data.shape[1], dtype=float,
+                    num_in_memory=4*batch_size)
+    y = StreamArray('y', dimension=dimension, dtype=dtype,
+                    num_in_memory=4*batch_size)
+    model_map(model, func, x, y)
+    times = []
+    for i in range(0, len(data), batch_size):
+        start_time = time.perf_counter()
+        x.extend(data[i:i+batch_size])
+        run()
+        times.append(time.perf_counter() - start_time)
+    return len(data) / sum(times), times[1], times[-1]
+
+
+def report(label, result):
+    print('  {0:22s}: {1:10.0f} rows/s, first batch {2:8.2f} ms, '
+          'last batch {3:8.2f} ms'.format(
+              label, result[0], 1000*result[1], 1000*result[2]))
+
+
+if __name__ == '__main__':
+    np.random.seed(0)
+    batch_size = 500
+    num_rows = 50000
+    print('PCA, 20 features, 3 components, {0} rows in batches of {1}'.format(
+        num_rows, batch_size))
+    data = np.random.randn(num_rows, 20).dot(np.random.randn(20, 20))
+    project = lambda model, X: model.transform(X)
+    report('refit on all rows', measure(
+        RefitPCA(3), project, data, batch_size, 3, float))
+    report('IncrementalPCA', measure(
+        IncrementalPCA(3), project, data, batch_size, 3, float))
+    print('k-means, 8 clusters, 2 features, {0} rows in batches of {1}'.format(
+        num_rows, batch_size))
+    centers = 10*np.random.randn(8, 2)
+    data = centers[np.random.randint(8, size=num_rows)] + \
+      np.random.randn(num_rows, 2)
+    predict = lambda model, X: model.predict(X)
+    report('refit on all rows', measure(
+        RefitKMeans(8), predict, data, batch_size, 0, int))
+    report('MiniBatchKMeans', measure(
+        MiniBatchKMeans(8), predict, data, batch_size, 0, int))
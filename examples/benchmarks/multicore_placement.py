@@ -0,0 +1,42 @@
+"""
+This module compares the cross-process throughput of a multicore
+application when the operating system places the processes and
+when the processes are pinned to CPUs. The application is the one
+in multicore_scaling.py: independent pairs of source and sink
+processes. With placement 'auto' the two processes of each pair
+share a last-level cache.
+
+Run from the top-level directory of IoTPy:
+    python -m examples.benchmarks.multicore_placement
+
+"""
+import multiprocessing
+
+from IoTPy.concurrency.placement import cpu_domains, make_placement
+from examples.benchmarks.multicore_scaling import measure_throughput
+
+
+def pinned_one_cpu_per_process(num_pairs):
+    # The placement in which each process has its own CPU, and the
+    # processes of a pair are in the same domain.
+    process_names = []
+    connect_streams = []
+    for i in range(num_pairs):
+        process_names.extend(['source_' + str(i), 'sink_' + str(i)])
+        connect_streams.append(
+            ('source_' + str(i), 's' + str(i), 'sink_' + str(i), 's' + str(i)))
+    return make_placement(process_names, connect_streams,
+                          one_cpu_per_process=True)
+
+
+if __name__ == '__main__':
+    print('{0} cores, domains: {1}'.format(
+        multiprocessing.cpu_count(), cpu_domains()))
+    for num_pairs in [1, 2, 4]:
+        unpinned = measure_throughput(num_pairs)
+        pinned = measure_throughput(num_pairs, placement='auto')
+        pinned_cpu = measure_throughput(
+            num_pairs, placement=pinned_one_cpu_per_process(num_pairs))
+        print('{0:>3} processes: unpinned {1:12.0f}, pinned to domain {2:12.0f},'
+              ' pinned to cpu {3:12.0f} elements/s'.format(
+                  2*num_pairs, unpinned, pinned, pinned_cpu))
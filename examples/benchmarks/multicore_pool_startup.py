@@ -0,0 +1,57 @@
+"""
+This module compares the time to run a short multicore application
+(a job) in new processes, with make_multicore_processes(), and in
+the workers of a MulticorePool. The job is a source process that
+sends 100 integers to a sink process.
+
+Run from the top-level directory of IoTPy:
+    python -m examples.benchmarks.multicore_pool_startup
+
+"""
+import statistics
+import time
+
+from IoTPy.agent_types.sink import sink_list
+from IoTPy.concurrency.multicore import make_spec_from_multicore_specification
+from IoTPy.concurrency.multicore import make_multicore_processes
+from IoTPy.concurrency.multicore_pool import MulticorePool
+
+
+def source(proc):
+    proc.copy_stream(data=list(range(100)), stream_name='x')
+    proc.finished_source(stream_name='x')
+
+def no_agent(in_streams, out_streams):
+    pass
+
+def sink(in_streams, out_streams):
+    sink_list(lambda segment: None, in_streams[0])
+
+def job():
+    return [
+        [('x', 'i')],
+        [{'name': 'source', 'agent': no_agent, 'sources': ['x'],
+          'source_functions': [source]},
+         {'name': 'sink', 'agent': sink, 'inputs': ['x']}]]
+
+def cold_start():
+    start_time = time.perf_counter()
+    connect_streams, process_specs = make_spec_from_multicore_specification(job())
+    processes, procs = make_multicore_processes(process_specs, connect_streams)
+    for process in processes: process.start()
+    for process in processes: process.join()
+    return time.perf_counter() - start_time
+
+def pool_start(pool):
+    start_time = time.perf_counter()
+    pool.run(job())
+    return time.perf_counter() - start_time
+
+
+if __name__ == '__main__':
+    num_jobs = 20
+    cold = [cold_start() for _ in range(num_jobs)]
+    with MulticorePool(num_workers=2) as pool:
+        warm = [pool_start(pool) for _ in range(num_jobs)]
+    print('new processes: median = {0:8.2f} ms'.format(1E3*statistics.median(cold)))
+    print('MulticorePool: median = {0:8.2f} ms'.format(1E3*statistics.median(warm)))
@@ -0,0 +1,73 @@
+"""
+This module measures the throughput of a multicore application
+as the number of processes grows. The application consists of
+num_pairs independent pairs of processes. In each pair, a source
+in one process sends num_elements integers, in segments of length
+segment_length, to a sink in the other process.
+
+Throughput is the total number of elements received by all sinks
+per second. When processes share a lock on the data path the
+throughput does not grow with the number of pairs even when there
+are enough cores.
+
+Run from the top-level directory of IoTPy:
+    python -m examples.benchmarks.multicore_scaling
+
+"""
+import multiprocessing
+import time
+
+from IoTPy.agent_types.sink import sink_list
+from IoTPy.concurrency.multicore import make_spec_from_multicore_specification
+from IoTPy.concurrency.multicore import make_multicore_processes
+
+
+def measure_throughput(num_pairs, num_elements=200000, segment_length=100,
+                       **kwargs):
+    """
+    Returns the number of elements per second received by the sinks
+    of num_pairs source-sink pairs of processes. Keyword arguments,
+    such as placement, are passed to make_multicore_processes().
+
+    """
+    def source(stream_name):
+        def f(proc):
+            segment = list(range(segment_length))
+            for _ in range(num_elements // segment_length):
+                proc.copy_stream(data=segment, stream_name=stream_name)
+            proc.finished_source(stream_name=stream_name)
+        return f
+
+    def sink(in_streams, out_streams):
+        # The sink only consumes the stream.
+        sink_list(lambda segment: None, in_streams[0])
+
+    streams = []
+    process_specs = []
+    for i in range(num_pairs):
+        stream_name = 's' + str(i)
+        streams.append((stream_name, 'i'))
+        process_specs.append(
+            {'name': 'source_' + str(i),
+             'agent': lambda in_streams, out_streams: None,
+             'sources': [stream_name],
+             'source_functions': [source(stream_name)]})
+        process_specs.append(
+            {'name': 'sink_' + str(i), 'agent': sink,
+             'inputs': [stream_name]})
+    connect_streams, process_specs = make_spec_from_multicore_specification(
+        [streams, process_specs])
+    processes, procs = make_multicore_processes(
+        process_specs, connect_streams, **kwargs)
+    start_time = time.perf_counter()
+    for process in processes: process.start()
+    for process in processes: process.join()
+    elapsed_time = time.perf_counter() - start_time
+    return num_pairs * (num_elements // segment_length) * segment_length / elapsed_time
+
+
+if __name__ == '__main__':
+    print('{0} cores'.format(multiprocessing.cpu_count()))
+    for num_pairs in [1, 2, 4]:
+        print('{0:>3} processes: {1:12.0f} elements/s'.format(
+            2*num_pairs, measure_throughput(num_pairs)))
@@ -0,0 +1,59 @@
+"""
+This module measures the cost of signals sent by a bursty
+producer. A source in one process sends num_elements integers, one
+element per call to copy_stream, to a sink in another process. It
+reports the throughput and the number of signals that were sent per
+call to copy_stream. A producer does not send a signal to a receiver
+that has an outstanding signal; so, the number of signals per call
+is less than 1 when the producer is faster than the receiver.
+
+Run from the top-level directory of IoTPy:
+    python -m examples.benchmarks.multicore_signals
+
+"""
+import time
+
+from IoTPy.agent_types.sink import sink_list
+from IoTPy.concurrency.multicore import make_spec_from_multicore_specification
+from IoTPy.concurrency.multicore import make_multicore_processes
+
+
+def measure_signals(num_elements=100000, segment_length=1):
+    """
+    Returns the throughput, in elements per second, and the number of
+    signals sent per call to copy_stream.
+
+    """
+    def source(proc):
+        segment = list(range(segment_length))
+        for _ in range(num_elements // segment_length):
+            proc.copy_stream(data=segment, stream_name='x')
+        proc.finished_source(stream_name='x')
+
+    def sink(in_streams, out_streams):
+        sink_list(lambda segment: None, in_streams[0])
+
+    multicore_specification = [
+        [('x', 'i')],
+        [{'name': 'source', 'agent': lambda in_streams, out_streams: None,
+          'sources': ['x'], 'source_functions': [source]},
+         {'name': 'sink', 'agent': sink, 'inputs': ['x']}]]
+    connect_streams, process_specs = make_spec_from_multicore_specification(
+        multicore_specification)
+    processes, procs = make_multicore_processes(process_specs, connect_streams)
+    start_time = time.perf_counter()
+    for process in processes: process.start()
+    for process in processes: process.join()
+    elapsed_time = time.perf_counter() - start_time
+    num_calls = num_elements // segment_length
+    num_signals = sum(procs['source'].num_signals_sent)
+    return num_calls * segment_length / elapsed_time, float(num_signals) / num_calls
+
+
+if __name__ == '__main__':
+    for segment_length in [1, 10, 100]:
+        throughput, signals_per_call = measure_signals(
+            segment_length=segment_length)
+        print('segment length {0:>4}: {1:12.0f} elements/s, '
+              '{2:6.3f} signals per call'.format(
+                  segment_length, throughput, signals_per_call))
@@ -0,0 +1,55 @@
+"""
+This module measures the throughput of thread_target_appending
+(see IoTPy/concurrency/multithread.py) when a producer thread puts
+single elements into its input queue as fast as it can. With
+max_batch_size=1 the thread executes a step of the computation for
+every element; with the default batch size it executes a step for
+every batch of elements that are in the queue.
+
+Run from the top-level directory of IoTPy:
+    python -m examples.benchmarks.multithread_batching
+
+"""
+import threading
+import time
+import sys
+is_py2 = sys.version[0] == '2'
+if is_py2:
+    import Queue as queue
+else:
+    import queue as queue
+
+from IoTPy.core.stream import Stream
+from IoTPy.agent_types.op import map_element
+from IoTPy.agent_types.sink import sink_element
+from IoTPy.concurrency.multithread import thread_target_appending
+
+
+def measure_throughput(num_elements=200000, **kwargs):
+    """
+    Returns the number of elements per second processed by a
+    thread running thread_target_appending. Keyword arguments, such
+    as max_batch_size, are passed to thread_target_appending.
+
+    """
+    x = Stream('x')
+    y = Stream('y')
+    map_element(lambda v: 2*v, x, y)
+    sink_element(lambda v: None, y)
+    q_in = queue.Queue()
+    thread = threading.Thread(
+        target=thread_target_appending, args=(q_in, [], [x]), kwargs=kwargs)
+    start_time = time.perf_counter()
+    thread.start()
+    for i in range(num_elements):
+        q_in.put(('x', i))
+    q_in.put('_finished')
+    thread.join()
+    return num_elements / (time.perf_counter() - start_time)
+
+
+if __name__ == '__main__':
+    print('max_batch_size=1: {0:10.0f} elements/s'.format(
+        measure_throughput(max_batch_size=1)))
+    print('default batches:  {0:10.0f} elements/s'.format(
+        measure_throughput()))
@@ -0,0 +1,71 @@
+"""
+This module compares ComputeEngine.step() with a ComputeEngine
+that executes agents in a pool of threads (see
+ComputeEngine.step_in_parallel()).
+
+The graph filters each axis of a 3-axis accelerometer with an FIR
+filter and then computes the magnitude of the filtered vector. The
+three FIR agents are independent branches of the graph. They spend
+their time in numpy.convolve, which releases the global interpreter
+lock, and so they can run at the same time on different cores.
+
+Run from the top-level directory of IoTPy:
+    python -m examples.benchmarks.parallel_step
+
+"""
+import multiprocessing
+import time
+
+import numpy as np
+
+from IoTPy.core.stream import StreamArray, run
+from IoTPy.core.compute_engine import ComputeEngine
+from IoTPy.core.compute_engine import set_thread_scheduler
+from IoTPy.agent_types.op import map_window_list
+from IoTPy.agent_types.merge import merge_list
+from IoTPy.agent_types.sink import sink_list
+
+
+def measure_throughput(num_threads, num_segments=40, segment_length=50000,
+                       num_taps=255):
+    """
+    Returns the number of samples per axis per second processed by
+    the graph when it is executed by a ComputeEngine with
+    num_threads threads.
+
+    """
+    taps = np.hanning(num_taps)
+    taps /= taps.sum()
+    def fir(window):
+        return np.convolve(window, taps, mode='same')
+    def magnitude(lists):
+        return np.sqrt(lists[0]**2 + lists[1]**2 + lists[2]**2)
+
+    previous = set_thread_scheduler(ComputeEngine(num_threads=num_threads))
+    try:
+        axes = [StreamArray('axis_' + str(i)) for i in range(3)]
+        filtered = [StreamArray('filtered_' + str(i)) for i in range(3)]
+        for i in range(3):
+            map_window_list(fir, axes[i], filtered[i],
+                            window_size=segment_length,
+                            step_size=segment_length)
+        magnitudes = StreamArray('magnitudes')
+        merge_list(magnitude, filtered, magnitudes)
+        sink_list(lambda v: None, magnitudes)
+        segment = np.random.rand(segment_length)
+        start_time = time.perf_counter()
+        for _ in range(num_segments):
+            for axis in axes:
+                axis.extend(segment)
+            run()
+        elapsed_time = time.perf_counter() - start_time
+    finally:
+        set_thread_scheduler(previous)
+    return num_segments * segment_length / elapsed_time
+
+
+if __name__ == '__main__':
+    print('{0} cores'.format(multiprocessing.cpu_count()))
+    for num_threads in [1, 3]:
+        print('{0} threads: {1:12.0f} samples/s'.format(
+            num_threads, measure_throughput(num_threads)))
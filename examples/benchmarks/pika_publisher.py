@@ -0,0 +1,55 @@
+"""
+This module measures the throughput of PikaPublisher (see
+IoTPy/concurrency/pika_publication_agent.py) with a LocalBroker, an
+in-process stand-in for RabbitMQ, so that the cost of batching and
+encoding is measured without the cost of the network and server.
+
+A StreamArray of floats is published in segments of
+segment_length elements. The publisher either publishes each
+segment as a JSON message, as earlier versions did, or batches
+segments and encodes them as JSON or as the bytes of a NumPy array.
+
+Run from the top-level directory of IoTPy:
+    python -m examples.benchmarks.pika_publisher
+
+"""
+import time
+
+import numpy as np
+
+from IoTPy.core.stream import StreamArray, run
+from IoTPy.concurrency.message_broker import LocalBroker
+from IoTPy.concurrency.pika_publication_agent import PikaPublisher
+
+
+def measure_throughput(num_elements=1000000, segment_length=10, **kwargs):
+    """
+    Returns the number of elements per second published, and the
+    number of messages. Keyword arguments, such as encoding and
+    max_batch_size, are passed to PikaPublisher.
+
+    """
+    broker = LocalBroker()
+    # Messages are put into a queue, as in a broker.
+    q = broker.bind('publications', 'x')
+    publisher = PikaPublisher('x', broker=broker, **kwargs)
+    x = StreamArray('x')
+    publisher.publish(x)
+    segment = np.random.rand(segment_length)
+    start_time = time.perf_counter()
+    for _ in range(num_elements // segment_length):
+        x.extend(segment)
+        run()
+    publisher.close()
+    elapsed_time = time.perf_counter() - start_time
+    return num_elements / elapsed_time, broker.num_messages
+
+
+if __name__ == '__main__':
+    for name, kwargs in [
+            ('json, message per segment', {'max_batch_size': 1}),
+            ('json, batched', {}),
+            ('binary, batched', {'encoding': 'binary'})]:
+        throughput, num_messages = measure_throughput(**kwargs)
+        print('{0:<26}: {1:10.0f} elements/s {2:8} messages'.format(
+            name, throughput, num_messages))
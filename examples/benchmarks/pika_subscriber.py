@@ -0,0 +1,64 @@
+"""
+This module measures the throughput of PikaBatchSubscriber (see
+IoTPy/concurrency/pika_subscribe_agent.py) with a LocalBroker, an
+in-process stand-in for RabbitMQ. Messages of one element each are
+delivered to the input_queue of a ComputeEngine that runs an agent
+on the stream. With prefetch_count=1 every message is a separate
+extend and a separate step of the ComputeEngine, as with a
+PikaSubscriber that appends each message; with a larger
+prefetch_count a batch of messages is a single extend and step.
+
+Run from the top-level directory of IoTPy:
+    python -m examples.benchmarks.pika_subscriber
+
+"""
+import threading
+import time
+
+from IoTPy.core.stream import Stream
+from IoTPy.core.compute_engine import ComputeEngine
+from IoTPy.agent_types.sink import sink_element
+from IoTPy.concurrency.message_broker import LocalBroker
+from IoTPy.concurrency.pika_publication_agent import PikaPublisher
+from IoTPy.concurrency.pika_subscribe_agent import PikaBatchSubscriber
+from IoTPy.concurrency.pika_subscribe_agent import put_in_input_queue
+
+
+def measure_throughput(prefetch_count, num_messages=100000):
+    """
+    Returns the number of messages per second processed by a
+    ComputeEngine fed by a PikaBatchSubscriber.
+
+    """
+    broker = LocalBroker()
+    engine = ComputeEngine()
+    x = Stream('x', scheduler=engine)
+    engine.name_to_stream['x'] = x
+    done = threading.Event()
+    def check(v):
+        if v == num_messages - 1:
+            done.set()
+    sink_element(check, x)
+    subscriber = PikaBatchSubscriber(
+        put_in_input_queue(engine.input_queue, 'x'), 'x', broker=broker,
+        prefetch_count=prefetch_count)
+    publisher = PikaPublisher('x', broker=broker, max_batch_size=1)
+    for i in range(num_messages):
+        publisher.publish_list([i])
+    engine.start()
+    thread = threading.Thread(target=subscriber.start)
+    start_time = time.perf_counter()
+    thread.start()
+    done.wait()
+    elapsed_time = time.perf_counter() - start_time
+    subscriber.stop()
+    thread.join()
+    engine.stop()
+    engine.join()
+    return num_messages / elapsed_time
+
+
+if __name__ == '__main__':
+    for prefetch_count in [1, 64, 1024]:
+        print('prefetch_count {0:>5}: {1:10.0f} messages/s'.format(
+            prefetch_count, measure_throughput(prefetch_count)))
@@ -0,0 +1,79 @@
+"""
+This module compares estimates of the p50 and p99 of a stream of
+latencies, over sliding windows and over the whole stream:
+(1) map_window with np.percentile, which sorts every window,
+(2) sketch_window (see IoTPy/agent_types/sketches.py) with a
+    logarithmic Histogram or a KLLSketch (see
+    IoTPy/agent_types/quantiles.py): each pane of step_size values
+    is summarized once; the histogram of a window is updated by
+    adding the new pane and subtracting the expired pane, and the
+    KLL sketches of the panes of a window are merged,
+(3) sketch_agent with a KLLSketch of the whole stream, compared
+    with keeping the whole stream and calling np.percentile.
+
+Run from the top-level directory of IoTPy:
+    python -m examples.benchmarks.quantiles
+
+"""
+import time
+
+import numpy as np
+
+from IoTPy.core.stream import Stream, StreamArray, run
+from IoTPy.agent_types.op import map_window
+from IoTPy.agent_types.sketches import sketch_agent, sketch_window
+from IoTPy.agent_types.quantiles import KLLSketch, Histogram
+
+
+def measure(make_agent, data, segment_length=10000):
+    x = StreamArray('x', dtype=float, num_in_memory=4*segment_length)
+    y = Stream('y')
+    make_agent(x, y)
+    start_time = time.perf_counter()
+    for i in range(0, len(data), segment_length):
+        x.extend(data[i:i+segment_length])
+        run()
+    return len(data) / (time.perf_counter() - start_time)
+
+
+def p50_p99(sketch):
+    return sketch.quantiles([0.5, 0.99])
+
+
+if __name__ == '__main__':
+    np.random.seed(0)
+    data = np.random.lognormal(0.0, 1.0, 1000000)
+    window_size, step_size = 10000, 1000
+    print('p50 and p99 of windows of {0} values, step {1}'.format(
+        window_size, step_size))
+    print('  map_window, np.percentile : {0:12.0f} values/s'.format(measure(
+        lambda x, y: map_window(
+            lambda window: np.percentile(window, [50, 99]),
+            x, y, window_size, step_size), data)))
+    histogram = Histogram.logarithmic(1e-3, 1e3, 1000)
+    print('  sketch_window, Histogram  : {0:12.0f} values/s'.format(measure(
+        lambda x, y: sketch_window(
+            histogram.empty, p50_p99,
+            x, y, window_size, step_size), data)))
+    print('  sketch_window, KLLSketch  : {0:12.0f} values/s'.format(measure(
+        lambda x, y: sketch_window(
+            lambda: KLLSketch(200), p50_p99, x, y, window_size, step_size),
+        data)))
+
+    sketch = KLLSketch(200)
+    start_time = time.perf_counter()
+    x = StreamArray('x', dtype=float)
+    sketch_agent(sketch, x)
+    for i in range(0, len(data), 10000):
+        x.extend(data[i:i+10000])
+        run()
+    estimate = sketch.quantiles([0.5, 0.99])
+    elapsed_time = time.perf_counter() - start_time
+    exact = np.percentile(data, [50, 99])
+    print('whole stream of {0} values'.format(len(data)))
+    print('  KLLSketch: {0:12.0f} values/s, {1} bytes, p50 {2:.3f} '
+          '(exact {3:.3f}), p99 {4:.3f} (exact {5:.3f})'.format(
+              len(data) / elapsed_time, sketch.memory, estimate[0], exact[0],
+              estimate[1], exact[1]))
+    print('  np.percentile of the whole stream keeps {0} bytes'.format(
+        data.nbytes))
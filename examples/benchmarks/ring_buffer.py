@@ -0,0 +1,98 @@
+"""
+This module compares RingBuffer (see
+IoTPy/helper_functions/ring_buffer.py) with the buffers that it
+replaces:
+(1) a buffer of the most recent max_size rows that is extended
+    with np.roll over the whole buffer, as incremental_buffer was,
+(2) a list-based circular buffer of (time, value) elements whose
+    get_up_to_time pops elements one at a time, as Buffer was.
+
+Run from the top-level directory of IoTPy:
+    python -m examples.benchmarks.ring_buffer
+
+"""
+import time
+
+import numpy as np
+
+from IoTPy.helper_functions.ring_buffer import RingBuffer
+from IoTPy.agent_types.timed_array import timed_dtype
+
+
+class RollBuffer(object):
+    # The earlier incremental_buffer once it is full.
+    def __init__(self, max_size, num_features):
+        self.value = np.zeros((max_size, num_features))
+    def extend(self, rows):
+        self.value = np.roll(self.value, -len(rows), axis=0)
+        self.value[-len(rows):] = rows
+
+
+class ListBuffer(object):
+    # The earlier Buffer: a list-based circular buffer.
+    def __init__(self, max_size):
+        self.buffer_size = max_size + 1
+        self.data = [None]*self.buffer_size
+        self.start = self.end = self.count = 0
+    def extend(self, alist):
+        for value in alist:
+            self.data[self.end] = value
+            self.end = (self.end + 1) % self.buffer_size
+            self.count += 1
+    def get_up_to_time(self, t):
+        return_value = []
+        while self.count > 0 and self.data[self.start][0] <= t:
+            return_value.append(self.data[self.start])
+            self.start = (self.start + 1) % self.buffer_size
+            self.count -= 1
+        return return_value
+
+
+def measure_rows(buffer, num_batches, batch):
+    start_time = time.perf_counter()
+    for _ in range(num_batches):
+        buffer.extend(batch)
+    return num_batches * len(batch) / (time.perf_counter() - start_time)
+
+
+def measure_time_reads(make_buffer, to_segment, num_elements, segment_length):
+    times = np.arange(num_elements, dtype=float)
+    buffer = make_buffer()
+    segments = [to_segment(times[i:i+segment_length])
+                for i in range(0, num_elements, segment_length)]
+    start_time = time.perf_counter()
+    for i, segment in enumerate(segments):
+        buffer.extend(segment)
+        # Read the elements up to the middle of the segment.
+        buffer.get_up_to_time(i*segment_length + segment_length//2)
+    return num_elements / (time.perf_counter() - start_time)
+
+
+def timed_segment(times):
+    segment = np.zeros(len(times), dtype=timed_dtype())
+    segment['time'] = times
+    return segment
+
+
+if __name__ == '__main__':
+    max_size, num_features = 100000, 8
+    batch = np.random.rand(100, num_features)
+    print('extend a full buffer of {0} rows with batches of 100 rows'.format(
+        max_size))
+    print('  np.roll buffer : {0:12.0f} rows/s'.format(
+        measure_rows(RollBuffer(max_size, num_features), 1000, batch)))
+    ring = RingBuffer(max_size)
+    ring.extend(np.zeros((max_size, num_features)))
+    print('  RingBuffer     : {0:12.0f} rows/s'.format(
+        measure_rows(ring, 1000, batch)))
+
+    num_elements, segment_length = 1000000, 1000
+    print('extend with segments of {0} timed elements, '
+          'get_up_to_time'.format(segment_length))
+    print('  list buffer    : {0:12.0f} elements/s'.format(measure_time_reads(
+        lambda: ListBuffer(10000),
+        lambda times: [(t, 0.0) for t in times.tolist()],
+        num_elements, segment_length)))
+    print('  RingBuffer     : {0:12.0f} elements/s'.format(measure_time_reads(
+        lambda: RingBuffer(10000, dtype=timed_dtype()), timed_segment,
+        num_elements, segment_length)))
@@ -0,0 +1,81 @@
+"""
+This module compares the filter agents in
+IoTPy/agent_types/signal_filters.py, which filter each new slice of
+a StreamArray with one call of scipy.signal.lfilter or sosfilt,
+with filters that are applied one element at a time by map_element,
+as BP_IIR and BP_FIR in
+examples/signal_processing_examples/dsp_filters.py are.
+
+Run from the top-level directory of IoTPy:
+    python -m examples.benchmarks.signal_filters
+
+"""
+import time
+
+import numpy as np
+import scipy.signal
+
+from IoTPy.core.stream import Stream, StreamArray, run
+from IoTPy.agent_types.op import map_element
+from IoTPy.agent_types.signal_filters import fir_filter, iir_filter
+from IoTPy.agent_types.signal_filters import sos_filter
+
+
+class ElementIIR(object):
+    # The filter_element of BP_IIR in dsp_filters.py.
+    def __init__(self, b, a):
+        self.b, self.a = np.array(b), np.array(a)
+        self.x = np.zeros(len(b))
+        self.y = np.zeros(len(b))
+    def filter_element(self, element):
+        self.x[1:] = self.x[:-1]
+        self.x[0] = element
+        self.y[1:] = self.y[:-1]
+        self.y[0] = self.b[0] * self.x[0]
+        self.y[0] += sum(self.b[1:]*self.x[1:] - self.a[1:]*self.y[1:])
+        return self.y[0]
+
+
+def measure_per_element(func, data, segment_length):
+    x = Stream('x')
+    y = Stream('y')
+    map_element(func, x, y)
+    start_time = time.perf_counter()
+    for i in range(0, len(data), segment_length):
+        x.extend(data[i:i+segment_length])
+        run()
+    return len(data) / (time.perf_counter() - start_time)
+
+
+def measure_agent(make_agent, data, segment_length):
+    x = StreamArray('x', dtype=float, num_in_memory=4*segment_length)
+    y = StreamArray('y', dtype=float, num_in_memory=4*segment_length)
+    make_agent(x, y)
+    start_time = time.perf_counter()
+    for i in range(0, len(data), segment_length):
+        x.extend(data[i:i+segment_length])
+        run()
+    return len(data) / (time.perf_counter() - start_time)
+
+
+if __name__ == '__main__':
+    np.random.seed(0)
+    segment_length = 4410
+    data = np.random.randn(441000)
+    b, a = scipy.signal.butter(4, [0.01, 0.1], btype='band')
+    sos = scipy.signal.butter(4, [0.01, 0.1], btype='band', output='sos')
+    fir = scipy.signal.firwin(101, [0.01, 0.1], pass_zero=False)
+    print('IIR, order 8 (bandpass, order 4)')
+    print('  per element  : {0:12.0f} samples/s'.format(measure_per_element(
+        ElementIIR(b, a).filter_element, data[:44100].tolist(),
+        segment_length)))
+    print('  iir_filter   : {0:12.0f} samples/s'.format(measure_agent(
+        lambda x, y: iir_filter(x, y, b, a), data, segment_length)))
+    print('  sos_filter   : {0:12.0f} samples/s'.format(measure_agent(
+        lambda x, y: sos_filter(x, y, sos), data, segment_length)))
+    print('FIR, 101 taps')
+    print('  per element  : {0:12.0f} samples/s'.format(measure_per_element(
+        ElementIIR(fir, np.zeros(len(fir))).filter_element,
+        data[:44100].tolist(), segment_length)))
+    print('  fir_filter   : {0:12.0f} samples/s'.format(measure_agent(
+        lambda x, y: fir_filter(x, y, fir), data, segment_length)))
@@ -0,0 +1,114 @@
+"""
+This module compares the sketches in IoTPy/agent_types/sketches.py,
+which are updated with a whole segment of a stream at a time, with
+sketches that are updated one element at a time by map_element, as
+in the scripts in examples/Counting. Those scripts use PyProbables;
+here the per-element sketches are written in Python so that
+PyProbables is not required; like PyProbables, they compute the
+hashes of each element separately.
+
+Run from the top-level directory of IoTPy:
+    python -m examples.benchmarks.sketches
+
+"""
+import hashlib
+import math
+import time
+
+import numpy as np
+
+from IoTPy.core.stream import Stream, StreamArray, run
+from IoTPy.agent_types.op import map_element
+from IoTPy.agent_types.sketches import CountMinSketch, HyperLogLog
+from IoTPy.agent_types.sketches import BloomFilter, MisraGries, sketch_agent
+
+
+class ElementCountMin(object):
+    def __init__(self, width, depth):
+        self.width, self.depth = width, depth
+        self.table = [[0]*width for _ in range(depth)]
+    def add(self, item):
+        digest = hashlib.blake2b(repr(item).encode(), digest_size=8).digest()
+        h = int.from_bytes(digest, 'little')
+        h1, h2 = h & 0xFFFFFFFF, (h >> 32) | 1
+        for i in range(self.depth):
+            self.table[i][(h1 + i*h2) % self.width] += 1
+
+
+class ElementBloom(object):
+    def __init__(self, num_bits, num_hashes):
+        self.num_bits, self.num_hashes = num_bits, num_hashes
+        self.bits = bytearray(num_bits)
+    def add(self, item):
+        digest = hashlib.blake2b(repr(item).encode(), digest_size=8).digest()
+        h = int.from_bytes(digest, 'little')
+        h1, h2 = h & 0xFFFFFFFF, (h >> 32) | 1
+        for i in range(self.num_hashes):
+            self.bits[(h1 + i*h2) % self.num_bits] = 1
+
+
+class ElementMisraGries(object):
+    def __init__(self, k):
+        self.k = k
+        self.counters = {}
+    def add(self, item):
+        if item in self.counters:
+            self.counters[item] += 1
+        elif len(self.counters) < self.k:
+            self.counters[item] = 1
+        else:
+            for key in list(self.counters):
+                self.counters[key] -= 1
+                if self.counters[key] == 0:
+                    del self.counters[key]
+
+
+def measure_per_element(sketch, data, segment_length):
+    x = Stream('x')
+    y = Stream('y')
+    def f(v):
+        sketch.add(v)
+    map_element(f, x, y)
+    start_time = time.perf_counter()
+    for i in range(0, len(data), segment_length):
+        x.extend(data[i:i+segment_length])
+        run()
+    return len(data) / (time.perf_counter() - start_time)
+
+
+def measure_batched(sketch, data, segment_length):
+    x = StreamArray('x', dtype=data.dtype, num_in_memory=4*segment_length)
+    sketch_agent(sketch, x)
+    start_time = time.perf_counter()
+    for i in range(0, len(data), segment_length):
+        x.extend(data[i:i+segment_length])
+        run()
+    return len(data) / (time.perf_counter() - start_time)
+
+
+if __name__ == '__main__':
+    np.random.seed(0)
+    segment_length = 10000
+    data = (np.random.zipf(1.3, 1000000) % 100000).astype(np.int64)
+    element_data = data[:100000].tolist()
+    width, depth = 2719, 5
+    bloom = BloomFilter.from_capacity(100000, 0.01)
+    for name, element_sketch, sketch in [
+            ('Count-Min', ElementCountMin(width, depth),
+             CountMinSketch(width, depth)),
+            ('Bloom filter', ElementBloom(bloom.num_bits, bloom.num_hashes),
+             bloom),
+            ('Misra-Gries', ElementMisraGries(100), MisraGries(100)),
+            ('HyperLogLog', None, HyperLogLog(12))]:
+        print(name)
+        if element_sketch is not None:
+            print('  per element : {0:12.0f} elements/s'.format(
+                measure_per_element(element_sketch, element_data,
+                                    segment_length)))
+        throughput = measure_batched(sketch, data, segment_length)
+        if isinstance(sketch, MisraGries):
+            memory = '{0} counters'.format(sketch.k)
+        else:
+            memory = '{0} bytes'.format(sketch.memory)
+        print('  batched     : {0:12.0f} elements/s, {1}'.format(
+            throughput, memory))
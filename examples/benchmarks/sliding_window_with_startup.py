@@ -0,0 +1,87 @@
+"""
+This module measures sliding_window_with_startup (see
+IoTPy/agent_types/sliding_window_with_startup.py) on a StreamArray
+that is extended in segments. It compares:
+(1) the earlier implementation, which appends the output of each
+    window to the output stream, so that each window wakes up the
+    subscribers of the output stream,
+(2) the current implementation, which puts the outputs of all the
+    windows of a segment into the output stream with one extend,
+(3) the vectorized mode, in which func reduces all the windows of
+    a segment with a single NumPy call.
+
+Run from the top-level directory of IoTPy:
+    python -m examples.benchmarks.sliding_window_with_startup
+
+"""
+import time
+
+import numpy as np
+
+from IoTPy.core.stream import StreamArray, run
+from IoTPy.agent_types.iot import iot
+from IoTPy.agent_types.sink import sink_list
+from IoTPy.agent_types.sliding_window_with_startup import \
+     sliding_window_with_startup
+
+
+class appending_sliding_window(object):
+    # The earlier sliding_window_with_startup.
+    def __init__(self, func, in_stream, out_stream, window_size, step_size):
+        self.func = func
+        self.out_stream = out_stream
+        self.window_size = window_size
+        self.step_size = step_size
+        self.starting = True
+        self.start_ptr = 0
+        self.end_ptr = 0
+        iot(func=self.extend, in_stream=in_stream)
+    def extend(self, A):
+        if self.starting:
+            while self.end_ptr < len(A):
+                self.end_ptr = self.end_ptr + self.step_size
+                if self.end_ptr > self.window_size:
+                    self.start_ptr = self.end_ptr - self.window_size
+                window = A[self.start_ptr : self.end_ptr]
+                self.out_stream.append(self.func(window))
+            if self.end_ptr > self.window_size:
+                self.starting = False
+                return self.start_ptr + self.step_size
+            else:
+                return 0
+        else:
+            self.start_ptr = 0
+            while self.start_ptr + self.window_size <= len(A):
+                window = A[self.start_ptr : self.start_ptr + self.window_size]
+                self.out_stream.append(self.func(window))
+                self.start_ptr += self.step_size
+            return self.start_ptr
+
+
+def measure(make_agent, num_elements=1000000, segment_length=10000):
+    x = StreamArray('x', dtype=float, num_in_memory=4*segment_length)
+    y = StreamArray('y', dtype=float, num_in_memory=4*segment_length)
+    make_agent(x, y)
+    # A subscriber of the output stream.
+    sink_list(lambda lst: None, y)
+    data = np.random.rand(num_elements)
+    start_time = time.perf_counter()
+    for i in range(0, num_elements, segment_length):
+        x.extend(data[i:i+segment_length])
+        run()
+    return num_elements / (time.perf_counter() - start_time)
+
+
+if __name__ == '__main__':
+    window_size, step_size = 64, 4
+    print('window_size {0}, step_size {1}'.format(window_size, step_size))
+    print('  append per window : {0:12.0f} elements/s'.format(measure(
+        lambda x, y: appending_sliding_window(
+            np.sum, x, y, window_size, step_size), num_elements=100000)))
+    print('  extend per segment: {0:12.0f} elements/s'.format(measure(
+        lambda x, y: sliding_window_with_startup(
+            np.sum, x, y, window_size, step_size))))
+    print('  vectorized        : {0:12.0f} elements/s'.format(measure(
+        lambda x, y: sliding_window_with_startup(
+            lambda windows: np.sum(windows, axis=1), x, y,
+            window_size, step_size, vectorized=True))))
@@ -0,0 +1,52 @@
+"""
+This module measures the throughput of SocketPublisher and
+SocketSubscriber (see IoTPy/concurrency/socket_transport.py) over
+the loopback interface, for segments of a Stream, which are
+pickled, and for segments of a StreamArray, which are sent as the
+bytes of NumPy arrays.
+
+Run from the top-level directory of IoTPy:
+    python -m examples.benchmarks.socket_transport
+
+"""
+import threading
+import time
+
+import numpy as np
+
+from IoTPy.concurrency.socket_transport import SocketPublisher, SocketSubscriber
+
+
+def measure_throughput(segment, num_segments):
+    """
+    Returns the number of elements per second received by a
+    subscriber when a publisher sends num_segments copies of
+    segment.
+
+    """
+    finished = threading.Event()
+    subscriber = SocketSubscriber(
+        lambda stream_name, segment: None,
+        finished=lambda stream_name: finished.set())
+    subscriber.start()
+    publisher = SocketPublisher('x', port=subscriber.port)
+    start_time = time.perf_counter()
+    for _ in range(num_segments):
+        publisher.publish_list(segment)
+    publisher.close()
+    finished.wait()
+    elapsed_time = time.perf_counter() - start_time
+    subscriber.close()
+    return num_segments * len(segment) / elapsed_time
+
+
+if __name__ == '__main__':
+    for segment_length in [10, 1000, 100000]:
+        num_segments = max(20, 2000000 // segment_length // 10)
+        print('segment length {0:>6}: list {1:12.0f}  array {2:12.0f} '
+              'elements/s'.format(
+                  segment_length,
+                  measure_throughput(list(range(segment_length)),
+                                     num_segments),
+                  measure_throughput(np.arange(segment_length, dtype=float),
+                                     num_segments)))
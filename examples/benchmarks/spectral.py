@@ -0,0 +1,66 @@
+"""
+This module compares fft_convolve in IoTPy/agent_types/spectral.py,
+which convolves blocks of a StreamArray with a long impulse response
+by the FFT, with a dot product of each sliding window and the
+reversed impulse response by map_window, as window_dot_product in
+examples/signal_processing_examples/window_dot_product.py does, and
+with fir_filter, which convolves directly. It also measures the
+throughput of stft_process.
+
+Run from the top-level directory of IoTPy:
+    python -m examples.benchmarks.spectral
+
+"""
+import time
+
+import numpy as np
+
+from IoTPy.core.stream import StreamArray, run
+from IoTPy.agent_types.op import map_window
+from IoTPy.agent_types.signal_filters import fir_filter
+from IoTPy.agent_types.spectral import fft_convolve, stft_process
+
+
+def measure_agent(make_agent, data, segment_length):
+    x = StreamArray('x', dtype=float, num_in_memory=8*segment_length)
+    y = StreamArray('y', dtype=float, num_in_memory=8*segment_length)
+    make_agent(x, y)
+    start_time = time.perf_counter()
+    for i in range(0, len(data), segment_length):
+        x.extend(data[i:i+segment_length])
+        run()
+    return len(data) / (time.perf_counter() - start_time)
+
+
+def window_dot_product(x, y, impulse_response):
+    reversed_response = impulse_response[::-1].copy()
+    map_window(lambda window: np.dot(window, reversed_response), x, y,
+               len(impulse_response), 1)
+
+
+if __name__ == '__main__':
+    np.random.seed(0)
+    segment_length = 4410
+    data = np.random.randn(441000)
+    for ir_length in [1000, 22050]:
+        # A decaying noise impulse response, as of a room.
+        impulse_response = np.random.randn(ir_length) * np.exp(
+            -np.arange(ir_length) * 5.0 / ir_length)
+        print('Convolution with an impulse response of {0} samples'.format(
+            ir_length))
+        print('  window dot product : {0:12.0f} samples/s'.format(measure_agent(
+            lambda x, y: window_dot_product(x, y, impulse_response),
+            data[:44100], segment_length)))
+        print('  fir_filter         : {0:12.0f} samples/s'.format(measure_agent(
+            lambda x, y: fir_filter(x, y, impulse_response),
+            data, segment_length)))
+        print('  fft_convolve       : {0:12.0f} samples/s'.format(measure_agent(
+            lambda x, y: fft_convolve(x, y, impulse_response),
+            data, segment_length)))
+    print('STFT, identity on the spectra')
+    for frame_size, hop_size in [(1024, 512), (1024, 256)]:
+        print('  frame {0}, hop {1}  : {2:12.0f} samples/s'.format(
+            frame_size, hop_size, measure_agent(
+                lambda x, y: stft_process(lambda spectra: spectra, x, y,
+                                          frame_size, hop_size),
+                data, segment_length)))
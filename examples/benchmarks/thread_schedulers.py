@@ -0,0 +1,91 @@
+"""
+This module measures the throughput of independent computations
+that run in threads of a single process, where each thread has its
+own scheduler (see set_thread_scheduler() in core/compute_engine.py).
+
+Each computation is a chain of two agents on StreamArrays. The
+agents operate on NumPy arrays, and NumPy releases the global
+interpreter lock for large arrays, so the computations overlap
+when there are enough cores. Throughput is the total number of
+elements processed by all computations per second.
+
+It also measures the time taken by Stream.extend() for a stream
+with one subscriber; this is the cost of finding the scheduler of
+a stream.
+
+Run from the top-level directory of IoTPy:
+    python -m examples.benchmarks.thread_schedulers
+
+"""
+import multiprocessing
+import threading
+import time
+import sys
+is_py2 = sys.version[0] == '2'
+if is_py2:
+    import Queue as queue
+else:
+    import queue as queue
+
+import numpy as np
+
+from IoTPy.core.stream import Stream, StreamArray
+from IoTPy.core.compute_engine import ComputeEngine
+from IoTPy.agent_types.op import map_window_list
+from IoTPy.agent_types.sink import sink_element
+from IoTPy.concurrency.multithread import thread_target_extending
+
+
+def measure_throughput(num_threads, num_segments=50, segment_length=200000):
+    """
+    Returns the number of elements per second processed by
+    num_threads computations, each running in its own thread with
+    its own scheduler.
+
+    """
+    threads = []
+    queues = []
+    for i in range(num_threads):
+        x = StreamArray('x')
+        y = StreamArray('y')
+        map_window_list(np.sort, x, y, window_size=segment_length,
+                        step_size=segment_length)
+        sink_element(lambda v: None, y)
+        q_in = queue.Queue()
+        threads.append(threading.Thread(
+            target=thread_target_extending, args=(q_in, [], [x]),
+            kwargs={'scheduler': ComputeEngine()}))
+        queues.append(q_in)
+    segment = np.random.rand(segment_length)
+    for q_in in queues:
+        for _ in range(num_segments):
+            q_in.put(('x', segment))
+        q_in.put('_finished')
+    start_time = time.perf_counter()
+    for thread in threads: thread.start()
+    for thread in threads: thread.join()
+    elapsed_time = time.perf_counter() - start_time
+    return num_threads * num_segments * segment_length / elapsed_time
+
+def measure_extend(num_extends=200000):
+    """
+    Returns the time, in microseconds, taken by Stream.extend()
+    followed by a step of the scheduler.
+
+    """
+    x = Stream('x')
+    sink_element(lambda v: None, x)
+    scheduler = Stream.scheduler
+    start_time = time.perf_counter()
+    for i in range(num_extends):
+        x.extend([i])
+        scheduler.step()
+    return (time.perf_counter() - start_time) * 1E6 / num_extends
+
+
+if __name__ == '__main__':
+    print('{0} cores'.format(multiprocessing.cpu_count()))
+    for num_threads in [1, 2, 4]:
+        print('{0:>3} threads: {1:12.0f} elements/s'.format(
+            num_threads, measure_throughput(num_threads)))
+    print('extend and step: {0:.2f} us'.format(measure_extend()))
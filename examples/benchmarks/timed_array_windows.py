@@ -0,0 +1,72 @@
+"""
+This module compares timed_window in IoTPy/agent_types/op.py, which
+operates on a Stream of (time, value) tuples, with the vectorized
+time-window agents in IoTPy/agent_types/timed_array.py, which
+operate on a StreamArray with dtype timed_dtype(). Each agent sums
+the values in windows of a stream of num_elements events that is
+extended in segments of segment_length events.
+
+Run from the top-level directory of IoTPy:
+    python -m examples.benchmarks.timed_array_windows
+
+"""
+import time
+
+import numpy as np
+
+from IoTPy.core.stream import Stream, StreamArray, run
+from IoTPy.agent_types.op import timed_window
+from IoTPy.agent_types.timed_array import timed_dtype, timed_window_array
+from IoTPy.agent_types.timed_array import session_window_array
+
+
+def make_events(num_elements):
+    events = np.zeros(num_elements, dtype=timed_dtype())
+    events['time'] = np.cumsum(np.random.exponential(1.0, num_elements))
+    events['value'] = np.random.rand(num_elements)
+    return events
+
+
+def measure_lists(events, window_duration, step_time, segment_length):
+    x = Stream('x')
+    y = Stream('y')
+    timed_window(lambda window: sum([v for t, v in window]),
+                 x, y, window_duration, step_time)
+    event_list = events.tolist()
+    start_time = time.perf_counter()
+    for i in range(0, len(event_list), segment_length):
+        x.extend(event_list[i:i+segment_length])
+        run()
+    return len(events) / (time.perf_counter() - start_time)
+
+
+def measure_arrays(events, segment_length, window_duration=None,
+                   step_time=None, gap=None):
+    x = StreamArray('x', dtype=timed_dtype(), num_in_memory=4*segment_length)
+    y = StreamArray('y', dtype=timed_dtype(), num_in_memory=4*segment_length)
+    if gap is None:
+        timed_window_array(np.add, x, y, window_duration, step_time)
+    else:
+        session_window_array(np.add, x, y, gap)
+    start_time = time.perf_counter()
+    for i in range(0, len(events), segment_length):
+        x.extend(events[i:i+segment_length])
+        run()
+    return len(events) / (time.perf_counter() - start_time)
+
+
+if __name__ == '__main__':
+    np.random.seed(0)
+    num_elements = 1000000
+    segment_length = 100000
+    events = make_events(num_elements)
+    for window_duration, step_time in [(100, 100), (100, 25)]:
+        print('window {0}, step {1}'.format(window_duration, step_time))
+        print('  timed_window, lists   : {0:12.0f} events/s'.format(
+            measure_lists(events[:200000], window_duration, step_time,
+                          segment_length)))
+        print('  timed_window_array    : {0:12.0f} events/s'.format(
+            measure_arrays(events, segment_length, window_duration, step_time)))
+    print('session, gap 5')
+    print('  session_window_array  : {0:12.0f} events/s'.format(
+        measure_arrays(events, segment_length, gap=5)))
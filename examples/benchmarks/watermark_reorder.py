@@ -0,0 +1,70 @@
+"""
+This module measures reorder (see IoTPy/agent_types/watermark.py)
+on a timed stream whose elements arrive out of order by at most
+max_lateness. reorder keeps a reorder buffer of the elements that
+are not yet earlier than the watermark; the benchmark compares the
+size of the buffer with the length of the stream, which is the
+size of the buffer needed to sort the stream before it is given to
+timed agents such as timed_window.
+
+Run from the top-level directory of IoTPy:
+    python -m examples.benchmarks.watermark_reorder
+
+"""
+import random
+import time
+
+from IoTPy.core.stream import Stream, run
+from IoTPy.agent_types.watermark import Watermark, reorder
+from IoTPy.agent_types.sink import sink_list
+
+
+def out_of_order_times(num_elements, max_lateness):
+    """
+    Returns the times 0, 1, ..., num_elements-1 shuffled within
+    blocks of max_lateness times.
+
+    """
+    times = list(range(num_elements))
+    for i in range(0, num_elements, max_lateness):
+        block = times[i:i+max_lateness]
+        random.shuffle(block)
+        times[i:i+max_lateness] = block
+    return times
+
+
+def measure(num_elements=200000, max_lateness=100, segment_length=1000):
+    """
+    Returns the number of elements per second reordered and the
+    maximum size of the reorder buffer.
+
+    """
+    times = out_of_order_times(num_elements, max_lateness)
+    x = Stream('x')
+    y = Stream('y')
+    agent = reorder(x, y, max_lateness=max_lateness)
+    num_output = [0]
+    def count(lst):
+        num_output[0] += len(lst)
+    sink_list(count, y)
+    max_buffer_size = 0
+    start_time = time.perf_counter()
+    for i in range(0, num_elements, segment_length):
+        x.extend([(t, t) for t in times[i:i+segment_length]])
+        run()
+        max_buffer_size = max(max_buffer_size, len(agent.state[0]))
+    x.extend([Watermark(float('inf'))])
+    run()
+    elapsed_time = time.perf_counter() - start_time
+    assert num_output[0] == num_elements
+    return num_elements / elapsed_time, max_buffer_size
+
+
+if __name__ == '__main__':
+    random.seed(0)
+    num_elements = 200000
+    for max_lateness in [10, 100, 1000]:
+        throughput, max_buffer_size = measure(num_elements, max_lateness)
+        print('max_lateness {0:>5}: {1:10.0f} elements/s, '
+              'reorder buffer <= {2} of {3} elements'.format(
+                  max_lateness, throughput, max_buffer_size, num_elements))
@@ -0,0 +1,125 @@
+import unittest
+import numpy as np
+
+from IoTPy.core.stream import Stream, StreamArray, run
+from IoTPy.helper_functions.recent_values import recent_values
+from IoTPy.agent_types.incremental_models import IncrementalPCA
+from IoTPy.agent_types.incremental_models import MiniBatchKMeans
+from IoTPy.agent_types.incremental_models import model_map, model_map_f
+from IoTPy.agent_types.sketches import sketch_agent
+
+def extend_in_slices(x, data, slice_lengths):
+    i = 0
+    for n in slice_lengths:
+        x.extend(data[i:i+n])
+        run()
+        i += n
+    x.extend(data[i:])
+    run()
+
+def offline_pca(X, n_components):
+    centered = X - X.mean(axis=0)
+    _, singular_values, vt = np.linalg.svd(centered, full_matrices=False)
+    components = vt[:n_components]
+    largest = np.argmax(np.abs(components), axis=1)
+    components *= np.sign(components[np.arange(n_components), largest])[:, np.newaxis]
+    return components, singular_values[:n_components]**2 / (len(X) - 1)
+
+class test_incremental_models(unittest.TestCase):
+
+    def setUp(self):
+        np.random.seed(0)
+        # Rows with 5 features whose variances decrease.
+        self.data = np.random.randn(3000, 5).dot(
+            np.diag([5.0, 3.0, 2.0, 1.0, 0.5])).dot(
+                np.linalg.qr(np.random.randn(5, 5))[0]) + 10.0
+        self.slice_lengths = [1, 2, 3, 500, 7, 1000, 0, 13]
+        # Three well separated clusters in 2 dimensions.
+        self.cluster_centers = np.array([[0.0, 0.0], [10.0, 0.0], [0.0, 10.0]])
+        self.cluster_labels = np.random.randint(3, size=3000)
+        self.cluster_data = self.cluster_centers[self.cluster_labels] + \
+          0.5*np.random.randn(3000, 2)
+
+    def test_pca_matches_offline(self):
+        pca = IncrementalPCA(3)
+        for i in range(0, len(self.data), 100):
+            pca.update(self.data[i:i+100])
+        components, variances = offline_pca(self.data, 3)
+        assert pca.count == len(self.data)
+        assert np.allclose(pca.mean, self.data.mean(axis=0))
+        assert np.allclose(pca.covariance, np.cov(self.data.T))
+        assert np.allclose(pca.components, components)
+        assert np.allclose(pca.explained_variance, variances)
+
+    def test_pca_merge_and_copy(self):
+        pca_1, pca_2 = IncrementalPCA(2), IncrementalPCA(2)
+        pca_1.update(self.data[:1000])
+        pca_2.update(self.data[1000:])
+        pca_3 = pca_1.copy()
+        pca_1.merge(pca_2)
+        assert np.allclose(pca_1.components, offline_pca(self.data, 2)[0])
+        assert pca_3.count == 1000
+        assert np.allclose(pca_3.components, offline_pca(self.data[:1000], 2)[0])
+        with self.assertRaises(AssertionError):
+            pca_1.merge(IncrementalPCA(3))
+
+    def test_pca_refresh_size(self):
+        pca = IncrementalPCA(2, refresh_size=1000)
+        pca.update(self.data[:500])
+        components = pca.components
+        pca.update(self.data[500:1000])
+        assert pca.components is components
+        pca.update(self.data[1000:1500])
+        assert pca.components is not components
+
+    def test_model_map_projections(self):
+        x = StreamArray('x', dimension=5, dtype=float)
+        pca = IncrementalPCA(2)
+        y = model_map_f(pca, lambda model, X: model.transform(X), x, dimension=2)
+        extend_in_slices(x, self.data, self.slice_lengths)
+        projections = recent_values(y)
+        assert projections.shape == (len(self.data), 2)
+        # The projections of the last slice use the final model.
+        last = self.data[-(len(self.data) - sum(self.slice_lengths)):]
+        assert np.allclose(projections[-len(last):], pca.transform(last))
+
+    def test_kmeans(self):
+        kmeans = MiniBatchKMeans(3, seed=1)
+        for i in range(0, len(self.cluster_data), 50):
+            kmeans.update(self.cluster_data[i:i+50])
+        # Each true center is close to a center of the model.
+        distances = kmeans.distances(self.cluster_centers)
+        assert np.all(distances.min(axis=1) < 0.1)
+        assert sorted(np.argmin(distances, axis=1)) == [0, 1, 2]
+        assert kmeans.counts.sum() == len(self.cluster_data)
+        copy = kmeans.copy()
+        kmeans.update(self.cluster_data[:10])
+        assert copy.counts.sum() == len(self.cluster_data)
+
+    def test_kmeans_waits_for_init_size(self):
+        x = StreamArray('x', dimension=2, dtype=float)
+        kmeans = MiniBatchKMeans(3, seed=1)
+        y = model_map_f(kmeans, lambda model, X: model.predict(X), x, dtype=int)
+        x.extend(self.cluster_data[:5])
+        run()
+        assert len(recent_values(y)) == 0 and kmeans.centers is None
+        extend_in_slices(x, self.cluster_data[5:], self.slice_lengths)
+        labels = recent_values(y)
+        assert len(labels) == len(self.cluster_data)
+        # The labels of the model are a permutation of the true labels.
+        true_to_model = np.argmin(kmeans.distances(self.cluster_centers), axis=1)
+        assert np.mean(labels[100:] == true_to_model[self.cluster_labels[100:]]) > 0.99
+
+    def test_snapshots_with_sketch_agent(self):
+        x = StreamArray('x', dimension=5, dtype=float)
+        y = Stream('y')
+        sketch_agent(IncrementalPCA(2), x, y,
+                     func=lambda model: model.copy(), window_size=1000)
+        extend_in_slices(x, self.data, self.slice_lengths)
+        snapshots = recent_values(y)
+        assert [snapshot.count for snapshot in snapshots] == [1000, 2000, 3000]
+        assert np.allclose(snapshots[0].components,
+                           offline_pca(self.data[:1000], 2)[0])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+import unittest
+import pickle
+import numpy as np
+
+from IoTPy.core.stream import Stream, StreamArray, run
+from IoTPy.helper_functions.recent_values import recent_values
+from IoTPy.agent_types.quantiles import KLLSketch, Histogram
+from IoTPy.agent_types.sketches import sketch_agent, sketch_window
+from IoTPy.agent_types.sketches import sketch_window_f, CountMinSketch
+from IoTPy.agent_types.op import map_window
+
+def rank_error(data, value, q):
+    return abs(np.mean(data <= value) - q)
+
+class test_quantiles(unittest.TestCase):
+
+    def test_kll_whole_stream(self):
+        np.random.seed(0)
+        data = np.random.lognormal(0, 1, 200000)
+        sketch = KLLSketch(k=200)
+        x = StreamArray('x', dtype=float)
+        sketch_agent(sketch, x)
+        for i in range(0, len(data), 3001):
+            x.extend(data[i:i+3001])
+            run()
+        assert sketch.count == len(data)
+        for q in [0.01, 0.5, 0.9, 0.99]:
+            assert rank_error(data, sketch.quantile(q), q) < 3.3/200
+        assert sketch.quantile(0) == data.min()
+        assert sketch.quantile(1) == data.max()
+        assert abs(sketch.rank(np.median(data)) - 0.5) < 3.3/200
+        # The memory is bounded.
+        assert sketch.memory < 3 * 200 * 8 + 1000
+
+    def test_kll_merge(self):
+        np.random.seed(1)
+        data = np.random.rand(100000)
+        parts = [KLLSketch(k=100, seed=i) for i in range(4)]
+        for i, part in enumerate(parts):
+            part.update(data[i*25000:(i+1)*25000])
+        merged = pickle.loads(pickle.dumps(parts[0]))
+        for part in parts[1:]:
+            merged.merge(part)
+        assert merged.count == 100000
+        for q in [0.1, 0.5, 0.99]:
+            assert rank_error(data, merged.quantile(q), q) < 3.3/100
+        with self.assertRaises(AssertionError):
+            merged.merge(KLLSketch(k=50))
+
+    def test_histogram(self):
+        histogram = Histogram.linear(0, 10, 10)
+        histogram.update([0.5, 1.5, 1.5, 9.5, -1, 10, 11])
+        assert list(histogram.counts) == [1, 1, 2, 0, 0, 0, 0, 0, 0, 0, 1, 2]
+        assert histogram.total == 7
+
+        np.random.seed(2)
+        data = np.random.exponential(10.0, 100000)
+        latency = Histogram.logarithmic(0.01, 1000, 500)
+        x = StreamArray('x', dtype=float)
+        sketch_agent(latency, x)
+        x.extend(data)
+        run()
+        # The relative error of logarithmic bins is bounded.
+        bound = (1000/0.01)**(1.0/500) - 1
+        for q in [0.5, 0.99]:
+            exact = np.percentile(data, 100*q)
+            assert abs(latency.quantile(q) - exact) <= bound * exact * 1.01
+
+        other = Histogram.logarithmic(0.01, 1000, 500)
+        other.update(data)
+        assert latency.copy().merge(other).total == 200000
+        with self.assertRaises(AssertionError):
+            latency.merge(Histogram.linear(0, 1, 3))
+
+    def test_sliding_window(self):
+        np.random.seed(3)
+        data = np.random.randint(0, 100, 1000).astype(float)
+        x = StreamArray('x', dtype=float)
+        y = sketch_window_f(
+            lambda: Histogram.linear(0, 100, 100),
+            lambda h: h.quantile(0.5), x, window_size=200, step_size=50)
+        z = Stream('z')
+        map_window(lambda window: np.percentile(window, 50, method='lower'),
+                   x, z, window_size=200, step_size=50)
+        for i in range(0, 1000, 77):
+            x.extend(data[i:i+77])
+            run()
+        estimates, exact = recent_values(y), recent_values(z)
+        assert len(estimates) == len(exact) == 17
+        # Unit bins: the estimate is within one of the median.
+        assert np.all(np.abs(np.array(estimates) - np.array(exact)) <= 1)
+
+        # Windows of any mergeable sketch, e.g. CountMinSketch.
+        u = Stream('u')
+        v = Stream('v')
+        sketch_window(lambda: CountMinSketch(50, 3),
+                      lambda s: int(s.query(['a'])[0]), u, v,
+                      window_size=4, step_size=2)
+        u.extend(['a', 'b', 'a', 'a', 'b', 'b', 'b', 'b'])
+        run()
+        assert recent_values(v) == [3, 2, 0]
+
+if __name__ == '__main__':
+    unittest.main()
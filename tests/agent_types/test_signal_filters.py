@@ -0,0 +1,82 @@
+import unittest
+import numpy as np
+import scipy.signal
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+from IoTPy.core.stream import StreamArray, run
+from IoTPy.helper_functions.recent_values import recent_values
+from IoTPy.agent_types import signal_filters
+from IoTPy.agent_types.signal_filters import fir_filter, iir_filter
+from IoTPy.agent_types.signal_filters import sos_filter, fir_filter_f
+from IoTPy.agent_types.signal_filters import iir_filter_f, sos_filter_f
+
+def extend_in_slices(x, data, slice_lengths):
+    i = 0
+    for n in slice_lengths:
+        x.extend(data[i:i+n])
+        run()
+        i += n
+    x.extend(data[i:])
+    run()
+
+def assert_same(output, expected):
+    # The output is the same as offline filtering up to rounding:
+    # lfilter may round differently when its state is carried.
+    assert output.shape == expected.shape
+    assert np.allclose(output, expected, rtol=0, atol=1e-13)
+
+class test_signal_filters(unittest.TestCase):
+
+    def setUp(self):
+        np.random.seed(0)
+        self.data = np.random.randn(5000)
+        self.slice_lengths = [1, 2, 3, 500, 7, 1000, 0, 13]
+
+    def test_fir(self):
+        b = scipy.signal.firwin(31, [0.1, 0.3], pass_zero=False)
+        x = StreamArray('x', dtype=float)
+        y = fir_filter_f(x, b)
+        extend_in_slices(x, self.data, self.slice_lengths)
+        assert_same(recent_values(y), scipy.signal.lfilter(b, [1.0], self.data))
+
+    def test_fir_without_scipy(self):
+        b = np.array([0.25, 0.5, 0.25])
+        with mock.patch.object(signal_filters, 'scipy', None):
+            x = StreamArray('x', dtype=float)
+            y = StreamArray('y', dtype=float)
+            fir_filter(x, y, b)
+            with self.assertRaises(AssertionError):
+                iir_filter(x, StreamArray('z'), b, [1.0, 0.5])
+        extend_in_slices(x, self.data, self.slice_lengths)
+        assert_same(recent_values(y), np.convolve(self.data, b)[:len(self.data)])
+
+    def test_iir_and_sos(self):
+        b, a = scipy.signal.butter(4, [0.1, 0.3], btype='band')
+        sos = scipy.signal.butter(8, [0.1, 0.3], btype='band', output='sos')
+        x = StreamArray('x', dtype=float)
+        y = iir_filter_f(x, b, a)
+        z = sos_filter_f(x, sos)
+        extend_in_slices(x, self.data, self.slice_lengths)
+        assert_same(recent_values(y), scipy.signal.lfilter(b, a, self.data))
+        assert_same(recent_values(z), scipy.signal.sosfilt(sos, self.data))
+
+    def test_multichannel(self):
+        data = np.random.randn(3000, 3)
+        b, a = scipy.signal.butter(3, 0.2)
+        x = StreamArray('x', dimension=3, dtype=float)
+        y = StreamArray('y', dimension=3, dtype=float)
+        iir_filter(x, y, b, a)
+        extend_in_slices(x, data, self.slice_lengths)
+        assert_same(recent_values(y), scipy.signal.lfilter(b, a, data, axis=0))
+        with mock.patch.object(signal_filters, 'scipy', None):
+            u = StreamArray('u', dimension=3, dtype=float)
+            v = fir_filter_f(u, [0.5, 0.5])
+        extend_in_slices(u, data, self.slice_lengths)
+        expected = 0.5 * (data + np.vstack((np.zeros((1, 3)), data[:-1])))
+        assert_same(recent_values(v), expected)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+import unittest
+import pickle
+import numpy as np
+
+from IoTPy.core.stream import Stream, StreamArray, run
+from IoTPy.helper_functions.recent_values import recent_values
+from IoTPy.agent_types.sketches import hash_items, CountMinSketch
+from IoTPy.agent_types.sketches import HyperLogLog, BloomFilter, MisraGries
+from IoTPy.agent_types.sketches import sketch_agent, sketch_agent_f
+
+class test_sketches(unittest.TestCase):
+
+    def test_hash_items(self):
+        # Hashes do not depend on the type of container.
+        assert np.array_equal(hash_items([1, 2, 3]),
+                              hash_items(np.array([1, 2, 3], dtype=np.int32)))
+        assert np.array_equal(hash_items(['ab', 'c']),
+                              hash_items(np.array(['ab', 'c'])))
+        assert hash_items(['ab'])[0] != hash_items(['ba'])[0]
+        assert hash_items(['ab'], seed=1)[0] != hash_items(['ab'])[0]
+        # Items that are not numbers or strings are hashed one at a
+        # time.
+        hashes = hash_items([(1, 'a'), (1, 'a'), (2, 'b')])
+        assert hashes[0] == hashes[1] != hashes[2]
+
+    def test_count_min(self):
+        np.random.seed(0)
+        data = np.random.zipf(1.5, 100000) % 1000
+        sketch = CountMinSketch.from_error(epsilon=0.001, delta=0.01)
+        x = StreamArray('x', dtype=int)
+        sketch_agent(sketch, x)
+        for i in range(0, len(data), 7919):
+            x.extend(data[i:i+7919])
+            run()
+        items = np.arange(1000)
+        exact = np.bincount(data, minlength=1000)
+        estimates = sketch.query(items)
+        assert sketch.total == len(data)
+        assert np.all(estimates >= exact)
+        assert np.all(estimates - exact <= sketch.epsilon * len(data))
+
+        # Merge the sketches of two halves of the data.
+        half_1, half_2 = CountMinSketch(2000, 5), CountMinSketch(2000, 5)
+        half_1.update(data[:50000])
+        half_2.update(data[50000:])
+        whole = CountMinSketch(2000, 5)
+        whole.update(data)
+        merged = pickle.loads(pickle.dumps(half_1)).merge(half_2)
+        assert np.array_equal(merged.table, whole.table)
+
+        # Counts.
+        sketch = CountMinSketch(100, 3)
+        sketch.update(['a', 'b'], counts=[5, 2])
+        sketch.update(['a'])
+        assert list(sketch.query(['a', 'b'])) == [6, 2]
+
+    def test_hyperloglog(self):
+        sketch = HyperLogLog(precision=12)
+        x = Stream('x')
+        y = sketch_agent_f(sketch, x, func=lambda s: s.count(), window_size=50000)
+        for i in range(0, 200000, 10000):
+            # Each item occurs twice.
+            x.extend(['item-{0}'.format(j % 100000) for j in range(i, i + 10000)])
+            run()
+        counts = recent_values(y)
+        assert len(counts) == 4
+        assert abs(counts[0] - 50000) < 4 * sketch.relative_error * 50000
+        assert abs(counts[-1] - 100000) < 4 * sketch.relative_error * 100000
+        assert sketch.memory == 4096
+
+        small = HyperLogLog(precision=12)
+        small.update(np.arange(100))
+        assert abs(small.count() - 100) < 3
+        other = HyperLogLog(precision=12)
+        other.update(np.arange(50, 150))
+        assert abs(small.merge(other).count() - 150) < 5
+
+    def test_bloom_filter(self):
+        bloom = BloomFilter.from_capacity(10000, 0.01)
+        x = StreamArray('x', dtype=int)
+        sketch_agent(bloom, x)
+        x.extend(np.arange(0, 20000, 2))
+        run()
+        assert np.all(bloom.contains(np.arange(0, 20000, 2)))
+        false_positives = np.mean(bloom.contains(np.arange(1, 20000, 2)))
+        assert false_positives < 0.02
+        assert bloom.false_positive_rate() < 0.02
+
+        other = BloomFilter(bloom.num_bits, bloom.num_hashes)
+        other.update([-1, -3])
+        bloom.merge(other)
+        assert np.all(bloom.contains([-1, -3, 0]))
+        with self.assertRaises(AssertionError):
+            bloom.merge(BloomFilter(10, 2))
+
+    def test_misra_gries(self):
+        x = Stream('x')
+        sketch = MisraGries(k=3)
+        y = sketch_agent_f(sketch, x, func=lambda s: s.counts(), window_size=10)
+        x.extend(['a', 'b', 'a', 'c', 'a', 'd', 'a', 'b', 'e', 'a'])
+        run()
+        counts = recent_values(y)[0]
+        assert len(counts) <= 3
+        # The error is at most 10/(3+1).
+        assert 5 - 10/4.0 <= counts['a'] <= 5
+        assert sketch.heavy_hitters(0.3) == {'a': counts['a']}
+
+        np.random.seed(1)
+        data = np.concatenate((np.full(3000, 7), np.full(2000, 8),
+                               np.random.randint(100, 10000, 5000)))
+        np.random.shuffle(data)
+        halves = [MisraGries(10), MisraGries(10)]
+        halves[0].update(data[:5000])
+        halves[1].update(data[5000:])
+        merged = halves[0].merge(halves[1])
+        counts = merged.counts()
+        assert 3000 - 10000/11.0 <= counts[7] <= 3000
+        assert 2000 - 10000/11.0 <= counts[8] <= 2000
+
+if __name__ == '__main__':
+    unittest.main()
@@ -36,6 +36,45 @@ class test_sliding_window_with_startup(unittest.TestCase):
             recent_values(y),
             np.array([3,  15,  36,  65,  95, 125, 155, 185, 215, 245]))
 
+    def test_segments_and_vectorized(self):
+        def expected_outputs(data, window_size, step_size):
+            return [np.sum(data[max(0, end - window_size):end])
+                    for end in range(step_size, len(data) + 1, step_size)]
+        data = np.arange(200, dtype=int)
+        for window_size, step_size in [(10, 3), (9, 3), (2, 3), (7, 7)]:
+            for vectorized in [False, True]:
+                x = StreamArray(dtype=int)
+                y = StreamArray(dtype=int)
+                if vectorized:
+                    func = lambda windows: np.sum(windows, axis=1)
+                else:
+                    func = np.sum
+                sliding_window_with_startup(
+                    func=func, in_stream=x, out_stream=y,
+                    window_size=window_size, step_size=step_size,
+                    vectorized=vectorized)
+                for i in range(0, 200, 13):
+                    x.extend(data[i:i+13])
+                    run()
+                assert np.array_equal(
+                    recent_values(y),
+                    expected_outputs(data, window_size, step_size))
+
+    def test_single_extend_per_call(self):
+        x = Stream()
+        y = Stream()
+        sliding_window_with_startup(
+            func=sum, in_stream=x, out_stream=y, window_size=4, step_size=2)
+        num_extends = []
+        def count(A):
+            num_extends.append(len(A))
+            return len(A)
+        iot(count, y)
+        x.extend(list(range(20)))
+        run()
+        assert recent_values(y) == [1, 6, 14, 22, 30, 38, 46, 54, 62, 70]
+        assert num_extends == [10]
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
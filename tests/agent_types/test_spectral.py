@@ -0,0 +1,99 @@
+import unittest
+import numpy as np
+
+from IoTPy.core.stream import StreamArray, run
+from IoTPy.helper_functions.recent_values import recent_values
+from IoTPy.agent_types.spectral import stft_process, stft_process_f
+from IoTPy.agent_types.spectral import fft_convolve, fft_convolve_f
+from IoTPy.agent_types.spectral import overlap_add
+
+def extend_in_slices(x, data, slice_lengths):
+    i = 0
+    for n in slice_lengths:
+        x.extend(data[i:i+n])
+        run()
+        i += n
+    x.extend(data[i:])
+    run()
+
+class test_spectral(unittest.TestCase):
+
+    def setUp(self):
+        np.random.seed(0)
+        self.data = np.random.randn(5000)
+        self.slice_lengths = [1, 2, 3, 500, 7, 1000, 0, 13]
+
+    def test_overlap_add(self):
+        blocks = np.arange(12.0).reshape(3, 4)
+        output, tail = overlap_add(blocks, 3, np.array([100.0]))
+        expected = np.zeros(10)
+        expected[0] = 100.0
+        for j in range(3):
+            expected[3*j : 3*j + 4] += blocks[j]
+        assert np.array_equal(output, expected[:9])
+        assert np.array_equal(tail, expected[9:])
+
+    def test_identity_reconstructs_input(self):
+        for frame_size, hop_size in [(256, 128), (256, 64), (100, 25)]:
+            x = StreamArray('x', dtype=float)
+            y = stft_process_f(lambda spectra: spectra, x, frame_size, hop_size)
+            extend_in_slices(x, self.data, self.slice_lengths)
+            output = recent_values(y)
+            # The last frame_size - hop_size samples are waiting for
+            # frames that have not arrived.
+            assert len(self.data) - frame_size < len(output) <= len(self.data)
+            assert np.allclose(output, self.data[:len(output)],
+                               rtol=0, atol=1e-12)
+
+    def test_rectangular_window(self):
+        x = StreamArray('x', dtype=float)
+        y = StreamArray('y', dtype=float)
+        stft_process(lambda spectra: 2*spectra, x, y, 64, 64,
+                     window=np.ones(64))
+        extend_in_slices(x, self.data, self.slice_lengths)
+        output = recent_values(y)
+        assert len(output) == 64 * (len(self.data) // 64)
+        assert np.allclose(output, 2*self.data[:len(output)], rtol=0, atol=1e-12)
+
+    def test_window_must_overlap_add_to_constant(self):
+        with self.assertRaises(AssertionError):
+            stft_process(lambda spectra: spectra, StreamArray('x', dtype=float),
+                         StreamArray('y', dtype=float), 256, 200)
+
+    def test_lowpass(self):
+        # Zeroing the high frequency bins removes a high frequency
+        # sinusoid and keeps a low frequency one.
+        n = np.arange(8192)
+        low = np.sin(2*np.pi*n*8/256.0)
+        high = np.sin(2*np.pi*n*100/256.0)
+        def lowpass(spectra):
+            spectra = spectra.copy()
+            spectra[:, 32:] = 0
+            return spectra
+        x = StreamArray('x', dtype=float)
+        y = stft_process_f(lowpass, x, 256, 64)
+        extend_in_slices(x, low + high, self.slice_lengths)
+        output = recent_values(y)
+        # The first frames have the zeros before the start of the
+        # stream, and so they are not sinusoids.
+        assert np.allclose(output[256:], low[256:len(output)], rtol=0, atol=1e-9)
+
+    def test_fft_convolve(self):
+        impulse_response = np.random.randn(700)
+        for block_size in [None, 1, 100, 1024]:
+            x = StreamArray('x', dtype=float)
+            y = fft_convolve_f(x, impulse_response, block_size)
+            extend_in_slices(x, self.data, self.slice_lengths)
+            output = recent_values(y)
+            block = block_size or 1024
+            assert len(output) == block * (len(self.data) // block)
+            expected = np.convolve(self.data, impulse_response)[:len(output)]
+            assert np.allclose(output, expected, rtol=0, atol=1e-10)
+
+    def test_fft_convolve_requires_samples(self):
+        with self.assertRaises(AssertionError):
+            fft_convolve(StreamArray('x', dimension=2, dtype=float),
+                         StreamArray('y', dtype=float), [1.0, 0.5])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import unittest
+import numpy as np
+
+from IoTPy.core.stream import Stream, StreamArray, run
+from IoTPy.helper_functions.recent_values import recent_values
+from IoTPy.agent_types.op import timed_window
+from IoTPy.agent_types.timed_array import timed_dtype, timed_window_array
+from IoTPy.agent_types.timed_array import tumbling_window_array
+from IoTPy.agent_types.timed_array import session_window_array
+from IoTPy.agent_types.timed_array import tumbling_window_array_f
+
+def timed_array(times, values, value_dtype=float):
+    a = np.zeros(len(times), dtype=timed_dtype(value_dtype))
+    a['time'] = times
+    a['value'] = values
+    return a
+
+def as_list(stream):
+    return [(t, v) for t, v in recent_values(stream).tolist()]
+
+class test_timed_array(unittest.TestCase):
+
+    def test_tumbling_window(self):
+        x = StreamArray('x', dtype=timed_dtype())
+        y = tumbling_window_array_f(np.add, x, 10)
+        x.extend(timed_array([1, 5, 12, 14, 35], [1., 2., 3., 4., 5.]))
+        run()
+        # The window [30, 40) is output when an element with time 40
+        # or later arrives. The empty window [20, 30) is not output.
+        assert as_list(y) == [(10., 3.), (20., 7.)]
+        x.extend(timed_array([38, 41], [6., 7.]))
+        run()
+        assert as_list(y) == [(10., 3.), (20., 7.), (40., 11.)]
+
+    def test_hopping_window_same_as_timed_window(self):
+        np.random.seed(1)
+        times = np.cumsum(np.random.randint(0, 4, size=500)).astype(float)
+        values = np.random.rand(500)
+        for window_duration, step_time in [(10, 10), (10, 3), (7, 2.5), (4, 8)]:
+            x = StreamArray('x', dtype=timed_dtype())
+            y = StreamArray('y', dtype=timed_dtype())
+            timed_window_array(np.add, x, y, window_duration, step_time)
+            u = Stream('u')
+            v = Stream('v')
+            timed_window(lambda window: sum([w for t, w in window]),
+                         u, v, window_duration, step_time)
+            for i in range(0, 500, 37):
+                x.extend(timed_array(times[i:i+37], values[i:i+37]))
+                u.extend(list(zip(times[i:i+37], values[i:i+37])))
+                run()
+            expected = recent_values(v)
+            output = as_list(y)
+            assert len(output) == len(expected) > 0
+            for (t, value), (expected_t, expected_value) in zip(output, expected):
+                assert t == expected_t
+                assert np.isclose(value, expected_value)
+
+    def test_max_in_hopping_window(self):
+        x = StreamArray('x', dtype=timed_dtype())
+        y = StreamArray('y', dtype=timed_dtype())
+        timed_window_array(np.maximum, x, y, window_duration=4, step_time=2)
+        x.extend(timed_array([0, 1, 2, 3, 5, 9], [3., 1., 4., 1., 5., 9.]))
+        run()
+        assert as_list(y) == [(4., 4.), (6., 5.), (8., 5.)]
+
+    def test_session_window(self):
+        x = StreamArray('x', dtype=timed_dtype(value_dtype=int))
+        y = StreamArray('y', dtype=timed_dtype(value_dtype=int))
+        session_window_array(np.add, x, y, gap=5)
+        x.extend(timed_array([1, 3, 6, 20, 22], [1, 2, 3, 4, 5], int))
+        run()
+        assert as_list(y) == [(11., 6)]
+        x.extend(timed_array([26, 40], [6, 7], int))
+        run()
+        assert as_list(y) == [(11., 6), (31., 15)]
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import unittest
+import random
+
+from IoTPy.core.stream import Stream, run
+from IoTPy.helper_functions.recent_values import recent_values
+from IoTPy.agent_types.watermark import Watermark, reorder, reorder_f
+from IoTPy.agent_types.watermark import watermark_timed_window
+from IoTPy.agent_types.watermark import watermark_timed_zip
+from IoTPy.agent_types.watermark import watermark_timed_mix
+
+class test_watermark(unittest.TestCase):
+
+    def test_reorder_with_punctuation(self):
+        x = Stream('x')
+        late = Stream('late')
+        y = Stream('y')
+        reorder(x, y, late_stream=late)
+        x.extend([(3, 'c'), (1, 'a'), (2, 'b'), (2, 'B')])
+        run()
+        assert recent_values(y) == []
+        x.extend([Watermark(3)])
+        run()
+        assert recent_values(y) == [(1, 'a'), (2, 'b'), (2, 'B')]
+        # (2, 'z') is late because the watermark is 3.
+        x.extend([(2, 'z'), (4, 'd'), Watermark(float('inf'))])
+        run()
+        assert recent_values(y) == [(1, 'a'), (2, 'b'), (2, 'B'), (3, 'c'),
+                                    (4, 'd')]
+        assert recent_values(late) == [(2, 'z')]
+
+    def test_reorder_with_max_lateness(self):
+        # Elements arrive out of order by at most 5.
+        random.seed(0)
+        times = list(range(1000))
+        for i in range(0, 1000, 5):
+            block = times[i:i+5]
+            random.shuffle(block)
+            times[i:i+5] = block
+        x = Stream('x')
+        late = Stream('late')
+        y = Stream('y')
+        agent = reorder(x, y, max_lateness=5, late_stream=late)
+        for i in range(0, 1000, 10):
+            x.extend([(t, t) for t in times[i:i+10]])
+            run()
+            # The reorder buffer only has elements within the lateness
+            # bound.
+            assert len(agent.state[0]) <= 6
+        x.extend([Watermark(float('inf'))])
+        run()
+        assert recent_values(y) == [(t, t) for t in range(1000)]
+        assert recent_values(late) == []
+
+        # An element that is later than max_lateness is late.
+        u = Stream('u')
+        late_u = Stream('late_u')
+        v = reorder_f(u, max_lateness=5, late_stream=late_u)
+        u.extend([(2000, 'a'), (1990, 'b'), (1996, 'c'), (2010, 'd')])
+        run()
+        assert recent_values(v) == [(1996, 'c'), (2000, 'a')]
+        assert recent_values(late_u) == [(1990, 'b')]
+
+    def test_watermark_timed_window(self):
+        x = Stream('x')
+        y = Stream('y')
+        late = Stream('late')
+        watermark_timed_window(lambda window: sum([v for t, v in window]),
+                               x, y, window_duration=10, step_time=10,
+                               max_lateness=3, late_stream=late)
+        x.extend([(1, 1), (5, 5), (3, 3), (12, 12), (9, 9), (11, 11),
+                  (25, 25), (4, 4)])
+        run()
+        # The window [10, 20) is output when an element with time 20
+        # or later leaves the reorder buffer.
+        assert recent_values(y) == [(10, 18)]
+        assert recent_values(late) == [(4, 4)]
+        x.extend([(30, 30)])
+        run()
+        assert recent_values(y) == [(10, 18), (20, 23)]
+
+    def test_watermark_timed_zip_and_mix(self):
+        x = Stream('x')
+        y = Stream('y')
+        z = Stream('z')
+        watermark_timed_zip([x, y], z, max_lateness=2)
+        x.extend([(2, 'b'), (1, 'a'), (5, 'e')])
+        y.extend([(3, 'C'), (1, 'A'), (6, 'F')])
+        run()
+        assert recent_values(z) == [[1, ['a', 'A']], [2, ['b', None]]]
+
+        u = Stream('u')
+        v = Stream('v')
+        w = Stream('w')
+        watermark_timed_mix([u, v], w)
+        u.extend([(2, 'b'), (1, 'a')])
+        v.extend([(2, 'B'), Watermark(3)])
+        run()
+        assert recent_values(w) == [(1, (0, 'a')), (2, (0, 'b')), (2, (1, 'B'))]
+
+if __name__ == '__main__':
+    unittest.main()
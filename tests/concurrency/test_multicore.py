@@ -24,7 +24,7 @@ import unittest
 # stream is in core
 from IoTPy.core.stream import Stream
 # sink, op, basics are in the agent_types
-from IoTPy.agent_types.sink import stream_to_queue, sink_list
+from IoTPy.agent_types.sink import stream_to_queue, sink_list, sink_element
 from IoTPy.agent_types.merge import zip_map
 from IoTPy.agent_types.op import map_element
 from IoTPy.agent_types.iot import iot
@@ -455,6 +455,256 @@ class test_multicore(unittest.TestCase):
         print('')
         print ('--------------------------------------')
 
+    def test_object_stream(self):
+        """
+        Tests streams of Python objects (type 'x') between processes.
+        The objects include tuples and NumPy arrays.
+
+        """
+        import numpy as np
+        q = multiprocessing.Queue()
+
+        def f(in_streams, out_streams):
+            map_element(lambda v: (v[0], v[1]*2), in_streams[0], out_streams[0])
+
+        def g(in_streams, out_streams, q):
+            stream_to_queue(in_streams[0], q)
+
+        def h(proc):
+            for i in range(3):
+                proc.copy_stream(data=[(i, np.arange(3)+i), (i, 'a')],
+                                 stream_name='x')
+            proc.finished_source(stream_name='x')
+
+        multicore_specification = [
+            [('x', 'x'), ('y', 'x')],
+            [{'name': 'p0', 'agent': f, 'inputs': ['x'], 'outputs': ['y'],
+              'sources': ['x'], 'source_functions':[h]},
+             {'name': 'p1', 'agent': g, 'inputs': ['y'], 'args': [q],
+              'output_queues': [q]}]]
+
+        processes = get_processes(multicore_specification)
+        for process in processes: process.start()
+        output = []
+        while True:
+            # A timeout so that the test fails instead of hanging if
+            # a process fails.
+            v = q.get(timeout=60)
+            if v == '_finished': break
+            output.append(v)
+        for process in processes: process.join()
+        for process in processes: process.terminate()
+        assert len(output) == 6
+        for i in range(3):
+            assert output[2*i][0] == i
+            assert np.array_equal(output[2*i][1], 2*(np.arange(3)+i))
+            assert output[2*i+1] == (i, 'aa')
+
+    def test_copy_buffer_segment(self):
+        """
+        Tests that segments of a shared buffer, including a segment
+        that wraps around the end of the buffer, are copied into a
+        StreamArray, and that the read cursor is moved.
+
+        """
+        import numpy as np
+        from IoTPy.core.stream import StreamArray
+        from IoTPy.concurrency.multicore import copy_buffer_segment
+        from IoTPy.concurrency.shared_buffers import SharedArrayBuffer
+        buffer = SharedArrayBuffer('i', num_readers=1, size=8)
+        s = StreamArray('s', dtype=buffer.view.dtype)
+        copy_buffer_segment(buffer.write(list(range(5))), s, buffer, 0)
+        assert buffer.read_ptrs[0] == 5
+        # Segment that wraps around the end of the buffer.
+        copy_buffer_segment(buffer.write(list(range(5, 10))), s, buffer, 0)
+        assert buffer.read_ptrs[0] == 10
+        assert np.array_equal(recent_values(s), np.arange(10))
+        # The stream has its own copy of the data.
+        buffer.write([100])
+        assert recent_values(s)[0] == 0
+
+    def test_ndarray_streams(self):
+        """
+        Streams of rows of 3 floats, and of records with a time
+        field, are delivered into StreamArrays of the same shape.
+
+        """
+        import numpy as np
+        from IoTPy.core.stream import StreamArray
+        from IoTPy.concurrency.multicore import make_spec_from_multicore_specification
+        q = multiprocessing.Queue()
+        N = 100
+        record = np.dtype([('time', 'f8'), ('value', 'f8', 3)])
+        data = np.arange(3*N, dtype=float).reshape(N, 3)
+
+        def h(proc):
+            for i in range(0, N, 10):
+                proc.copy_stream(data=data[i:i+10], stream_name='acc')
+            proc.finished_source(stream_name='acc')
+
+        def f(in_streams, out_streams):
+            assert isinstance(in_streams[0], StreamArray)
+            assert in_streams[0].recent.shape[1:] == (3,)
+            # Make a record from the index and each row.
+            map_element(lambda row, state: ((state, 2*row), state+1),
+                        in_streams[0], out_streams[0], state=0)
+
+        def g(in_streams, out_streams, q):
+            assert in_streams[0].recent.dtype == record
+            sink_list(lambda segment: q.put(segment.copy()), in_streams[0])
+
+        multicore_specification = [
+            [('acc', (np.float64, 3)), ('rec', record)],
+            [{'name': 'p0', 'agent': lambda in_streams, out_streams: None,
+              'sources': ['acc'], 'source_functions':[h]},
+             {'name': 'p1', 'agent': f, 'inputs': ['acc'], 'outputs': ['rec']},
+             {'name': 'p2', 'agent': g, 'inputs': ['rec'], 'args': [q],
+              'output_queues': [q]}]]
+        connect_streams, process_specs = make_spec_from_multicore_specification(
+            multicore_specification)
+        processes, procs = make_multicore_processes(process_specs, connect_streams)
+        for process in processes: process.start()
+        output = []
+        while True:
+            v = q.get(timeout=60)
+            if isinstance(v, str) and v == '_finished': break
+            output.append(v)
+        for process in processes: process.join()
+        output = np.concatenate(output)
+        assert np.array_equal(output['time'], np.arange(N))
+        assert np.array_equal(output['value'], 2*data)
+
+    def test_flow_control(self):
+        """
+        A fast producer and a slow consumer share a small buffer.
+        The producer waits for the consumer instead of overwriting
+        data that the consumer has not read.
+
+        """
+        from IoTPy.concurrency.multicore import make_spec_from_multicore_specification
+        q = multiprocessing.Queue()
+        N = 2000
+
+        def g(in_streams, out_streams, q):
+            def slow_put(v):
+                if v % 100 == 0: time.sleep(0.01)
+                q.put(int(v))
+            sink_element(slow_put, in_streams[0])
+
+        def h(proc):
+            for i in range(0, N, 50):
+                proc.copy_stream(data=list(range(i, i+50)), stream_name='x')
+            proc.finished_source(stream_name='x')
+
+        multicore_specification = [
+            [('x', 'i')],
+            [{'name': 'p0', 'agent': lambda in_streams, out_streams: None,
+              'sources': ['x'], 'source_functions':[h]},
+             {'name': 'p1', 'agent': g, 'inputs': ['x'], 'args': [q],
+              'output_queues': [q]}]]
+        connect_streams, process_specs = make_spec_from_multicore_specification(
+            multicore_specification)
+        processes, procs = make_multicore_processes(
+            process_specs, connect_streams, buffer_size=256)
+        for process in processes: process.start()
+        output = []
+        while True:
+            v = q.get()
+            if v == '_finished': break
+            output.append(v)
+        for process in processes: process.join()
+        for process in processes: process.terminate()
+        assert output == list(range(N))
+        assert procs['p0'].stall_statistics()['x']['num_stalls'] > 0
+
+    def test_signal_counts(self):
+        """
+        A pipeline of three processes terminates only after every
+        signal that was sent has been received.
+
+        """
+        from IoTPy.concurrency.multicore import make_spec_from_multicore_specification
+        q = multiprocessing.Queue()
+        N = 1000
+
+        def f(in_streams, out_streams):
+            map_element(lambda v: v+1, in_streams[0], out_streams[0])
+
+        def g(in_streams, out_streams, q):
+            sink_element(lambda v: q.put(int(v)), in_streams[0])
+
+        def h(proc):
+            for i in range(0, N, 10):
+                proc.copy_stream(data=list(range(i, i+10)), stream_name='x')
+            proc.finished_source(stream_name='x')
+
+        multicore_specification = [
+            [('x', 'i'), ('y', 'i')],
+            [{'name': 'p0', 'agent': lambda in_streams, out_streams: None,
+              'sources': ['x'], 'source_functions':[h]},
+             {'name': 'p1', 'agent': f, 'inputs': ['x'], 'outputs': ['y']},
+             {'name': 'p2', 'agent': g, 'inputs': ['y'], 'args': [q],
+              'output_queues': [q]}]]
+        connect_streams, process_specs = make_spec_from_multicore_specification(
+            multicore_specification)
+        processes, procs = make_multicore_processes(process_specs, connect_streams)
+        for process in processes: process.start()
+        output = []
+        while True:
+            v = q.get(timeout=60)
+            if v == '_finished': break
+            output.append(v)
+        for process in processes: process.join()
+        assert output == list(range(1, N+1))
+        num_sent = sum([sum(proc.num_signals_sent) for proc in procs.values()])
+        num_received = sum(
+            [proc.num_signals_received.value for proc in procs.values()])
+        # Signals are not sent while a receiver has an outstanding
+        # signal. So there are at most as many signals as segments.
+        assert 0 < num_sent == num_received <= 2*(N//10)
+
+    def test_many_processes_and_sources(self):
+        """
+        Termination is detected for more processes and sources than
+        fit in fixed-size status arrays.
+
+        """
+        from IoTPy.concurrency.multicore import make_spec_from_multicore_specification
+        q = multiprocessing.Queue()
+        num_sources = 16
+
+        def source(stream_name, i):
+            def h(proc):
+                proc.copy_stream(data=[i, i], stream_name=stream_name)
+                proc.finished_source(stream_name=stream_name)
+            return h
+
+        def g(in_streams, out_streams, q):
+            for in_stream in in_streams:
+                sink_element(lambda v: q.put(int(v)), in_stream)
+
+        streams = [('s' + str(i), 'i') for i in range(num_sources)]
+        process_specs = [
+            {'name': 'p' + str(i),
+             'agent': lambda in_streams, out_streams: None,
+             'sources': ['s' + str(i)],
+             'source_functions': [source('s' + str(i), i)]}
+            for i in range(num_sources)]
+        process_specs.append(
+            {'name': 'sink', 'agent': g, 'args': [q], 'output_queues': [q],
+             'inputs': [stream_name for stream_name, _ in streams]})
+        connect_streams, process_specs = make_spec_from_multicore_specification(
+            [streams, process_specs])
+        processes, procs = make_multicore_processes(process_specs, connect_streams)
+        for process in processes: process.start()
+        output = []
+        while True:
+            v = q.get(timeout=60)
+            if v == '_finished': break
+            output.append(v)
+        for process in processes: process.join()
+        assert sorted(output) == sorted(list(range(num_sources))*2)
+
 
 
 def multicore_example_v1(DATA, ADDEND, MULTIPLICAND, EXPONENT):
@@ -0,0 +1,75 @@
+import functools
+import unittest
+
+from IoTPy.agent_types.op import map_element
+from IoTPy.agent_types.sink import sink_element
+from IoTPy.concurrency.multicore_pool import MulticorePool
+
+# Agents and sources are defined at the top level so that they can
+# be pickled without cloudpickle.
+def source(proc, stream_name, data):
+    proc.copy_stream(data=data, stream_name=stream_name)
+    proc.finished_source(stream_name=stream_name)
+
+def no_agent(in_streams, out_streams):
+    pass
+
+def add(in_streams, out_streams, addend):
+    map_element(lambda v: v + addend, in_streams[0], out_streams[0])
+
+def put_in_queue(in_streams, out_streams, q):
+    sink_element(lambda v: q.put(v), in_streams[0])
+
+def get_output(q):
+    output = []
+    while True:
+        v = q.get(timeout=60)
+        if v == '_finished': break
+        output.append(v)
+    return output
+
+class test_multicore_pool(unittest.TestCase):
+
+    def test_jobs(self):
+        with MulticorePool(num_workers=3) as pool:
+            q = pool.queues[0]
+            # Run jobs with different specifications in the same
+            # workers.
+            for addend in [10, 20]:
+                multicore_specification = [
+                    [('x', 'i'), ('y', 'i')],
+                    [{'name': 'p0', 'agent': no_agent, 'sources': ['x'],
+                      'source_functions': [functools.partial(
+                          source, stream_name='x', data=list(range(10)))]},
+                     {'name': 'p1', 'agent': add, 'inputs': ['x'],
+                      'outputs': ['y'], 'keyword_args': {'addend': addend}},
+                     {'name': 'p2', 'agent': put_in_queue, 'inputs': ['y'],
+                      'args': [q], 'output_queues': [q]}]]
+                pool.start_job(multicore_specification)
+                assert [int(v) for v in get_output(q)] == \
+                  list(range(addend, addend+10))
+                pool.join_job()
+
+            # A job with a stream of objects and fewer processes.
+            multicore_specification = [
+                [('s', 'x')],
+                [{'name': 'p0', 'agent': no_agent, 'sources': ['s'],
+                  'source_functions': [functools.partial(
+                      source, stream_name='s', data=['a', ('b', 1)])]},
+                 {'name': 'p1', 'agent': put_in_queue, 'inputs': ['s'],
+                  'args': [q], 'output_queues': [q]}]]
+            pool.start_job(multicore_specification)
+            assert get_output(q) == ['a', ('b', 1)]
+            pool.join_job()
+
+    def test_too_many_processes(self):
+        with MulticorePool(num_workers=1) as pool:
+            multicore_specification = [
+                [('x', 'i')],
+                [{'name': 'p0', 'agent': no_agent, 'sources': ['x']},
+                 {'name': 'p1', 'agent': no_agent, 'inputs': ['x']}]]
+            with self.assertRaises(AssertionError):
+                pool.start_job(multicore_specification)
+
+if __name__ == '__main__':
+    unittest.main()
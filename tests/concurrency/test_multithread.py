@@ -12,6 +12,7 @@ which tests code from multicore.py in multiprocessing.
 
 import sys
 import threading
+import queue
 import random
 import multiprocessing
 import numpy as np
@@ -27,7 +28,7 @@ from IoTPy.core.stream import StreamArray, run
 from IoTPy.concurrency.multithread import thread_target_extending
 from IoTPy.concurrency.multithread import thread_target_appending
 from IoTPy.helper_functions.recent_values import recent_values
-from IoTPy.agent_types.sink import stream_to_queue
+from IoTPy.agent_types.sink import stream_to_queue, sink_list
 from IoTPy.agent_types.op import map_element
 #from run import run
 
@@ -169,6 +170,194 @@ class test_multithread(unittest.TestCase):
 
         assert output == [0, 101, 202, 303, 404]
 
+    def test_compute_engine_input_queue(self):
+        # A ComputeEngine that is not part of a multicore
+        # application gets an in-process input queue.
+        from IoTPy.core.compute_engine import ComputeEngine, SimpleQueue
+        engine = ComputeEngine()
+        assert isinstance(engine.input_queue, SimpleQueue)
+
+        saved_scheduler = Stream.scheduler
+        Stream.scheduler = engine
+        try:
+            x = Stream('x')
+            y = Stream('y')
+            map_element(lambda v: 2*v, x, y)
+            engine.name_to_stream['x'] = x
+
+            # Source thread puts data into the engine's input queue.
+            def source():
+                for i in range(5):
+                    engine.input_queue.put(('x', i))
+                engine.stop()
+            source_thread = threading.Thread(target=source)
+            engine.start()
+            source_thread.start()
+            source_thread.join()
+            engine.join()
+        finally:
+            Stream.scheduler = saved_scheduler
+        assert recent_values(y) == [0, 2, 4, 6, 8]
+
+    def test_thread_schedulers(self):
+        # Two computations run in parallel in two threads. Each
+        # thread has its own scheduler, and so a thread executes
+        # only the agents of its own computation.
+        from IoTPy.core.compute_engine import ComputeEngine
+        def double(v, thread_names):
+            thread_names.append(threading.current_thread().name)
+            return 2*v
+
+        threads = []
+        computations = []
+        for name in ['a', 'b']:
+            x = Stream('x')
+            y = Stream('y')
+            thread_names = []
+            map_element(double, x, y, thread_names=thread_names)
+            q_in = queue.Queue()
+            thread = threading.Thread(
+                target=thread_target_extending, name=name,
+                args=(q_in, [], [x]), kwargs={'scheduler': ComputeEngine()})
+            threads.append(thread)
+            computations.append((name, q_in, y, thread_names))
+        for thread in threads: thread.start()
+        for i in range(100):
+            for name, q_in, y, thread_names in computations:
+                q_in.put(('x', [i]))
+        for name, q_in, y, thread_names in computations:
+            q_in.put('_finished')
+        for thread in threads: thread.join()
+        for name, q_in, y, thread_names in computations:
+            assert recent_values(y) == [2*i for i in range(100)]
+            assert set(thread_names) == set([name])
+        assert not Stream.scheduler.scheduled_agents
+
+    def test_bound_stream(self):
+        # A stream bound to a scheduler puts the agents that it
+        # wakes up into that scheduler.
+        from IoTPy.core.compute_engine import ComputeEngine
+        engine = ComputeEngine()
+        x = Stream('x', scheduler=engine)
+        y = StreamArray('y', dtype=int, scheduler=engine)
+        z = StreamArray('z', dtype=int)
+        map_element(lambda v: v+1, x, y)
+        map_element(lambda v: 2*v, y, z)
+        x.extend([1, 2])
+        assert x.get_scheduler() is engine
+        assert len(engine.scheduled_agents) == 1
+        assert not Stream.scheduler.scheduled_agents
+        engine.step()
+        # The agent reading y is put into engine, and the stream z,
+        # which is not bound, uses the scheduler of this thread.
+        assert list(recent_values(z)) == [4, 6]
+        assert not Stream.scheduler.scheduled_agents
+
+    def test_parallel_step(self):
+        # Three independent branches and an agent that merges
+        # them, executed by a ComputeEngine with three threads.
+        from IoTPy.core.compute_engine import ComputeEngine
+        from IoTPy.core.compute_engine import set_thread_scheduler
+        from IoTPy.agent_types.merge import zip_map
+        lock = threading.Lock()
+        # executing[i] is the number of threads executing the
+        # agent of branch i, and overlap is the maximum number of
+        # agents executing at the same time.
+        executing = {}
+        overlap = [0]
+        def branch(v, branch_id):
+            with lock:
+                executing[branch_id] = executing.get(branch_id, 0) + 1
+                assert executing[branch_id] == 1
+                overlap[0] = max(overlap[0], sum(executing.values()))
+            time.sleep(0.001)
+            with lock:
+                executing[branch_id] -= 1
+            return v + 1
+
+        previous = set_thread_scheduler(ComputeEngine(num_threads=3))
+        try:
+            xs = [Stream('x' + str(i)) for i in range(3)]
+            ys = [Stream('y' + str(i)) for i in range(3)]
+            for i in range(3):
+                map_element(branch, xs[i], ys[i], branch_id=i)
+            z = Stream('z')
+            zip_map(sum, ys, z)
+            for j in range(20):
+                for i in range(3):
+                    xs[i].extend([j, j])
+                run()
+        finally:
+            set_thread_scheduler(previous)
+        assert recent_values(z) == [3*(j+1) for j in range(20) for _ in range(2)]
+        assert 1 < overlap[0] <= 3
+
+    def test_parallel_step_error(self):
+        # An exception raised by an agent is raised by step().
+        from IoTPy.core.compute_engine import ComputeEngine
+        engine = ComputeEngine(num_threads=2)
+        x = Stream('x', scheduler=engine)
+        y = Stream('y', scheduler=engine)
+        map_element(lambda v: 1/v, x, y)
+        x.extend([1, 0])
+        with self.assertRaises(ZeroDivisionError):
+            engine.step()
+
+    def test_get_batch(self):
+        from IoTPy.concurrency.multithread import get_batch
+        q_in = queue.Queue()
+        for i in range(5):
+            q_in.put(('x', i))
+            q_in.put(('y', -i))
+        q_in.put('_finished')
+        batch, is_finished = get_batch(q_in, '_finished', 4, 1.0)
+        assert batch == {'x': [0, 1], 'y': [0, -1]} and not is_finished
+        batch, is_finished = get_batch(q_in, '_finished', 100, 1.0)
+        assert batch == {'x': [2, 3, 4], 'y': [-2, -3, -4]} and is_finished
+
+    def test_batched_steps(self):
+        # Messages that are in the input queue when the thread
+        # starts are processed in a few steps.
+        x = Stream('x')
+        segment_lengths = []
+        sink_list(lambda segment: segment_lengths.append(len(segment)), x)
+        q_in = queue.Queue()
+        for i in range(1000):
+            q_in.put(('x', i))
+        q_in.put('_finished')
+        thread_target_appending(q_in, [], [x], max_latency=1.0)
+        assert recent_values(x) == list(range(1000))
+        assert segment_lengths == [1000]
+
+        # With a batch size of 1 the thread executes a step for
+        # every message.
+        x = Stream('x')
+        segment_lengths = []
+        sink_list(lambda segment: segment_lengths.append(len(segment)), x)
+        for i in range(10):
+            q_in.put(('x', [i, i]))
+        q_in.put('_finished')
+        thread_target_extending(q_in, [], [x], max_batch_size=1)
+        assert recent_values(x) == [i for i in range(10) for _ in range(2)]
+        assert segment_lengths == [2]*10
+
+    def test_low_rate_stream(self):
+        # A message that arrives when the queue is empty is
+        # processed without waiting for more messages.
+        x = Stream('x')
+        q_in = queue.Queue()
+        q_out = queue.Queue()
+        stream_to_queue(x, q_out)
+        thread = threading.Thread(
+            target=thread_target_appending, args=(q_in, [q_out], [x]))
+        thread.start()
+        for i in range(3):
+            q_in.put(('x', i))
+            assert q_out.get(timeout=10) == i
+        q_in.put('_finished')
+        thread.join()
+        assert q_out.get(timeout=10) == '_finished'
+
 #----------------------------------------------------
 #  TESTS
 #----------------------------------------------------
@@ -0,0 +1,89 @@
+import json
+import time
+import unittest
+from unittest import mock
+import numpy as np
+
+from IoTPy.core.stream import Stream, StreamArray, run
+from IoTPy.concurrency import message_broker
+from IoTPy.concurrency.message_broker import LocalBroker, get_pika_broker
+from IoTPy.concurrency.message_broker import JSON_CONTENT_TYPE, SEGMENT_CONTENT_TYPE
+from IoTPy.concurrency.pika_publication_agent import PikaPublisher
+from IoTPy.concurrency.segment_encoding import decode_segment
+
+def get_messages(q):
+    messages = []
+    while not q.empty():
+        messages.append(q.get())
+    return messages
+
+class test_pika_publisher(unittest.TestCase):
+
+    def test_batches(self):
+        broker = LocalBroker()
+        q = broker.bind('publications', 'x')
+        publisher = PikaPublisher('x', broker=broker, max_batch_size=10,
+                                  max_batch_latency=60)
+        x = Stream('x')
+        publisher.publish(x)
+        for i in range(12):
+            x.extend([i, i])
+            run()
+        # Messages of 10 and 10 elements, and the rest of the batch
+        # when the publisher is closed.
+        publisher.close()
+        messages = get_messages(q)
+        assert [content_type for body, content_type in messages] == \
+          [JSON_CONTENT_TYPE]*3
+        assert [json.loads(body) for body, content_type in messages] == \
+          [[i for i in range(j, min(j+5, 12)) for _ in range(2)]
+           for j in [0, 5, 10]]
+
+    def test_binary_arrays(self):
+        broker = LocalBroker()
+        q = broker.bind('publications', 'y')
+        publisher = PikaPublisher('y', broker=broker, encoding='binary',
+                                  max_batch_size=4, max_batch_latency=60)
+        y = StreamArray('y', dimension=2, dtype=np.int32)
+        publisher.publish(y)
+        for i in range(4):
+            y.extend(np.array([[i, -i]], dtype=np.int32))
+            run()
+        publisher.close()
+        messages = get_messages(q)
+        assert len(messages) == 1
+        body, content_type = messages[0]
+        assert content_type == SEGMENT_CONTENT_TYPE
+        segment = decode_segment(body)
+        assert segment.dtype == np.int32
+        assert segment.tolist() == [[i, -i] for i in range(4)]
+
+    def test_latency(self):
+        # A small batch is published after max_batch_latency.
+        broker = LocalBroker()
+        q = broker.bind('publications', 'x')
+        publisher = PikaPublisher('x', broker=broker, max_batch_latency=0.01)
+        publisher.publish_list([1, 2])
+        body, content_type = q.get(timeout=10)
+        assert json.loads(body) == [1, 2]
+        publisher.close()
+
+    def test_shared_connection(self):
+        # Publishers on a host share a connection.
+        with mock.patch.object(message_broker, 'pika') as pika:
+            first = PikaPublisher('x', host='h')
+            second = PikaPublisher('y', host='h')
+            assert first.broker is second.broker
+            assert pika.BlockingConnection.call_count == 1
+            first.publish_list([1])
+            second.publish_list([2])
+            first.close()
+            second.close()
+            assert pika.BlockingConnection.return_value.close.call_count == 1
+            # A new connection is made after the last publisher closes.
+            broker = get_pika_broker('h')
+            assert broker is not first.broker
+            broker.close()
+
+if __name__ == '__main__':
+    unittest.main()
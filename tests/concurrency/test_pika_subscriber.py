@@ -0,0 +1,76 @@
+import threading
+import time
+import unittest
+import numpy as np
+
+from IoTPy.core.stream import Stream, StreamArray
+from IoTPy.core.compute_engine import ComputeEngine
+from IoTPy.agent_types.sink import sink_list
+from IoTPy.concurrency.message_broker import LocalBroker
+from IoTPy.concurrency.pika_publication_agent import PikaPublisher
+from IoTPy.concurrency.pika_subscribe_agent import PikaBatchSubscriber
+from IoTPy.concurrency.pika_subscribe_agent import copy_to_source
+from IoTPy.concurrency.pika_subscribe_agent import put_in_input_queue
+from IoTPy.helper_functions.recent_values import recent_values
+
+class CopyStreamRecorder(object):
+    # Records the calls of copy_stream of a MulticoreProcess.
+    def __init__(self):
+        self.copies = []
+    def copy_stream(self, data, stream_name):
+        self.copies.append((stream_name, list(data)))
+
+def run_subscriber(subscriber, is_done):
+    # Runs the subscriber in a thread until is_done() is True.
+    thread = threading.Thread(target=subscriber.start)
+    thread.start()
+    start_time = time.time()
+    while not is_done() and time.time() - start_time < 10:
+        time.sleep(0.001)
+    subscriber.stop()
+    thread.join()
+
+class test_pika_subscriber(unittest.TestCase):
+
+    def test_batches(self):
+        broker = LocalBroker()
+        proc = CopyStreamRecorder()
+        subscriber = PikaBatchSubscriber(
+            copy_to_source(proc, 'x'), 'x', broker=broker, prefetch_count=32,
+            max_batch_latency=0.01)
+        # Each segment is published in its own message.
+        publisher = PikaPublisher('x', broker=broker, max_batch_size=1)
+        for i in range(100):
+            publisher.publish_list([i])
+        run_subscriber(subscriber, lambda: len(proc.copies) == 4)
+        assert [len(data) for stream_name, data in proc.copies] == \
+          [32, 32, 32, 4]
+        assert [v for stream_name, data in proc.copies for v in data] == \
+          list(range(100))
+        assert subscriber.num_batches == broker.num_acknowledgements == 4
+
+    def test_input_queue(self):
+        # Binary segments of a StreamArray extend a stream of a
+        # ComputeEngine in one step per batch.
+        broker = LocalBroker()
+        engine = ComputeEngine()
+        y = StreamArray('y', dimension=2, scheduler=engine)
+        engine.name_to_stream['y'] = y
+        segment_lengths = []
+        sink_list(lambda segment: segment_lengths.append(len(segment)), y)
+        subscriber = PikaBatchSubscriber(
+            put_in_input_queue(engine.input_queue, 'y'), 'y', broker=broker,
+            max_batch_latency=0.01)
+        publisher = PikaPublisher('y', broker=broker, encoding='binary',
+                                  max_batch_size=1)
+        for i in range(50):
+            publisher.publish_list(np.array([[i, 2.0*i]]))
+        run_subscriber(subscriber, lambda: subscriber.num_batches == 1)
+        engine.start()
+        engine.stop()
+        engine.join()
+        assert segment_lengths == [50]
+        assert recent_values(y).tolist() == [[i, 2.0*i] for i in range(50)]
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import multiprocessing
+import os
+import unittest
+
+from IoTPy.agent_types.sink import sink_element
+from IoTPy.concurrency.multicore import make_spec_from_multicore_specification
+from IoTPy.concurrency.multicore import make_multicore_processes
+from IoTPy.concurrency.placement import parse_cpu_list, cpu_domains
+from IoTPy.concurrency.placement import make_placement, observed_traffic
+
+class test_placement(unittest.TestCase):
+
+    def test_parse_cpu_list(self):
+        assert parse_cpu_list('0-3,8,10-11\n') == [0, 1, 2, 3, 8, 10, 11]
+        assert parse_cpu_list('5') == [5]
+
+    def test_cpu_domains(self):
+        domains = cpu_domains()
+        assert len(domains) >= 1
+        cpus = [cpu for domain in domains for cpu in domain]
+        assert len(cpus) == len(set(cpus))
+        if hasattr(os, 'sched_getaffinity'):
+            assert set(cpus) == os.sched_getaffinity(0)
+
+    def test_make_placement(self):
+        # Two pairs of processes, a-b and c-d, with a lot of traffic
+        # within each pair, and little traffic between b and c.
+        connect_streams = [('a', 'x', 'b', 'x'), ('b', 'y', 'c', 'y'),
+                           ('c', 'z', 'd', 'z')]
+        traffic = {('a', 'x'): 1000, ('b', 'y'): 1, ('c', 'z'): 1000}
+        domains = [[0, 1], [2, 3]]
+        placement = make_placement(
+            ['a', 'b', 'c', 'd'], connect_streams, traffic, domains)
+        assert placement['a'] == placement['b']
+        assert placement['c'] == placement['d']
+        assert placement['a'] != placement['c']
+
+        placement = make_placement(
+            ['a', 'b', 'c', 'd'], connect_streams, traffic, domains,
+            one_cpu_per_process=True)
+        assert sorted([placement[p][0] for p in 'abcd']) == [0, 1, 2, 3]
+        assert set(placement['a'] + placement['b']) in [set([0, 1]), set([2, 3])]
+
+        # Without observed traffic, every connection has the same
+        # traffic and each domain still gets two processes.
+        placement = make_placement(
+            ['a', 'b', 'c', 'd'], connect_streams, domains=domains)
+        assert sorted([tuple(placement[p]) for p in 'abcd']) == \
+          [(0, 1), (0, 1), (2, 3), (2, 3)]
+
+    def test_pinned_processes(self):
+        q = multiprocessing.Queue()
+
+        def h(proc):
+            proc.copy_stream(data=list(range(10)), stream_name='x')
+            proc.finished_source(stream_name='x')
+
+        def g(in_streams, out_streams, q):
+            if hasattr(os, 'sched_getaffinity'):
+                q.put(sorted(os.sched_getaffinity(0)))
+            sink_element(lambda v: q.put(int(v)), in_streams[0])
+
+        multicore_specification = [
+            [('x', 'i')],
+            [{'name': 'p0', 'agent': lambda in_streams, out_streams: None,
+              'sources': ['x'], 'source_functions':[h]},
+             {'name': 'p1', 'agent': g, 'inputs': ['x'], 'args': [q],
+              'output_queues': [q]}]]
+        connect_streams, process_specs = make_spec_from_multicore_specification(
+            multicore_specification)
+        processes, procs = make_multicore_processes(
+            process_specs, connect_streams, placement='auto')
+        for process in processes: process.start()
+        output = []
+        while True:
+            v = q.get(timeout=60)
+            if v == '_finished': break
+            output.append(v)
+        for process in processes: process.join()
+        if hasattr(os, 'sched_getaffinity'):
+            assert output[0] == sorted(procs['p1'].cpus)
+            output = output[1:]
+        assert output == list(range(10))
+        assert observed_traffic(procs) == {('p0', 'x'): 10}
+
+if __name__ == '__main__':
+    unittest.main()
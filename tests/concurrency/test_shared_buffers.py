@@ -0,0 +1,115 @@
+import unittest
+from unittest import mock
+import numpy as np
+
+from IoTPy.concurrency import shared_buffers
+from IoTPy.concurrency.shared_buffers import SharedArrayBuffer, SharedObjectBuffer
+from IoTPy.concurrency.shared_buffers import SharedNDArrayBuffer, dtype_and_shape
+
+class test_shared_buffers(unittest.TestCase):
+
+    def test_shared_object_buffer(self):
+        buffer = SharedObjectBuffer(num_readers=0, size=256)
+        start, end = buffer.write([1, (2, 'two'), {'three': 3}])
+        assert start == 0
+        assert buffer.read(start, end) == [1, (2, 'two'), {'three': 3}]
+
+        # Records with NumPy payloads that wrap around the end of
+        # the circular buffer.
+        for i in range(10):
+            start, end = buffer.write([np.arange(8)+i, 'x'])
+            segment = buffer.read(start, end)
+            assert np.array_equal(segment[0], np.arange(8)+i)
+            assert segment[1] == 'x'
+        # The last record wraps around the end of the buffer.
+        assert end % buffer.size < start % buffer.size
+
+        # Several records are read by a single call to read().
+        start, middle = buffer.write([1, 2])
+        middle, end = buffer.write([3])
+        assert buffer.read(start, end) == [1, 2, 3]
+
+        # An array read from the buffer does not change when the
+        # buffer is overwritten.
+        start, end = buffer.write([np.zeros(4)])
+        a = buffer.read(start, end)[0]
+        for i in range(10):
+            buffer.write([np.ones(4)])
+        assert np.array_equal(a, np.zeros(4))
+
+    def test_shared_object_buffer_without_shared_memory(self):
+        # Before Python 3.8 the buffer is a multiprocessing.Array of
+        # bytes and segments are pickled in-band with protocol 4.
+        with mock.patch.object(shared_buffers, 'shared_memory', None), \
+          mock.patch.object(shared_buffers, 'PICKLE_PROTOCOL', 4), \
+          mock.patch.object(shared_buffers, 'OUT_OF_BAND', False):
+            buffer = SharedObjectBuffer(num_readers=0, size=256)
+            assert buffer.shm is None
+            for i in range(10):
+                start, end = buffer.write([np.arange(8)+i, 'x'])
+                segment = buffer.read(start, end)
+                assert np.array_equal(segment[0], np.arange(8)+i)
+                assert segment[1] == 'x'
+
+    def test_shared_array_buffer(self):
+        buffer = SharedArrayBuffer('d', num_readers=2, size=10)
+        assert buffer.write([1.0, 2.0, 3.0]) == (0, 3)
+        assert buffer.free_space() == 7
+        buffer.set_read_ptr(0, 3)
+        # Reader 1 has not read anything. So no space is freed.
+        assert buffer.free_space() == 7
+        buffer.set_read_ptr(1, 2)
+        assert buffer.free_space() == 9
+        buffer.set_read_ptr(1, 3)
+
+        # A segment that wraps around the end of the buffer is read
+        # as two views.
+        start, end = buffer.write(np.arange(9.0))
+        views = buffer.read(start, end)
+        assert len(views) == 2
+        assert np.array_equal(np.concatenate(views), np.arange(9.0))
+        assert buffer.free_space() == 1
+        assert buffer.stall_statistics()['num_stalls'] == 0
+
+    def test_shared_ndarray_buffer(self):
+        assert dtype_and_shape('i') == (np.dtype('i'), ())
+        assert dtype_and_shape((np.float64, 3)) == (np.dtype('f8'), (3,))
+        buffer = SharedNDArrayBuffer(('f4', (2, 2)), num_readers=1, size=5)
+        assert buffer.view.shape == (5, 2, 2)
+        data = np.arange(16, dtype='f4').reshape(4, 2, 2)
+        start, end = buffer.write(data)
+        buffer.set_read_ptr(0, end)
+        # A segment that wraps around the end of the buffer.
+        start, end = buffer.write(data[:3])
+        views = buffer.read(start, end)
+        assert len(views) == 2
+        assert np.array_equal(np.concatenate(views), data[:3])
+
+    def test_notifications(self):
+        # A reader is notified of the first write, but not of writes
+        # made while its notification is outstanding. When it
+        # acknowledges the notification it gets the latest position.
+        buffer = SharedArrayBuffer('i', num_readers=2, size=16)
+        buffer.write([0, 1])
+        assert buffer.notify(0)
+        buffer.write([2])
+        assert not buffer.notify(0)
+        assert buffer.notify(1)
+        assert buffer.acknowledge(0) == 3
+        buffer.write([3])
+        assert buffer.notify(0)
+        assert not buffer.notify(1)
+        assert buffer.acknowledge(1) == 4
+
+    def test_max_wait_time(self):
+        # A write into a full buffer whose reader does not read
+        # raises an error instead of waiting forever.
+        buffer = SharedArrayBuffer('i', num_readers=1, size=4,
+                                   name='s', max_wait_time=0.05)
+        buffer.write([0, 1, 2, 3])
+        with self.assertRaises(RuntimeError):
+            buffer.write([4])
+        assert buffer.stall_statistics()['num_stalls'] == 1
+
+if __name__ == '__main__':
+    unittest.main()
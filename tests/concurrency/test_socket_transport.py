@@ -0,0 +1,105 @@
+import threading
+import time
+import unittest
+import numpy as np
+
+from IoTPy.core.stream import Stream, StreamArray, run
+from IoTPy.concurrency.segment_encoding import encode_segment, decode_segment
+from IoTPy.concurrency.socket_transport import SocketPublisher, SocketSubscriber
+
+class test_socket_transport(unittest.TestCase):
+
+    def test_segment_encoding(self):
+        segment = [1, 'a', (2, 3)]
+        assert decode_segment(encode_segment(segment)) == segment
+        for segment in [np.arange(5.0), np.zeros((0, 3)),
+                        np.ones((4, 2, 3), dtype=np.int16),
+                        np.zeros(3, dtype=[('t', 'f8'), ('v', 'i4')])]:
+            decoded = decode_segment(encode_segment(segment))
+            assert decoded.dtype == segment.dtype
+            assert np.array_equal(decoded, segment)
+        # A slice that is not contiguous.
+        segment = np.arange(12).reshape(3, 4)[:, 1]
+        assert np.array_equal(decode_segment(encode_segment(segment)), segment)
+
+    def test_publish_streams(self):
+        received = {}
+        finished = threading.Event()
+        def callback(stream_name, segment):
+            received.setdefault(stream_name, []).extend(list(segment))
+        subscriber = SocketSubscriber(
+            callback, finished=lambda stream_name: finished.set())
+        subscriber.start()
+        x = Stream('x')
+        y = StreamArray('y', dimension=2, dtype=int)
+        publisher_x = SocketPublisher('x', port=subscriber.port)
+        publisher_y = SocketPublisher('y', port=subscriber.port)
+        publisher_x.publish(x)
+        publisher_y.publish(y)
+        for i in range(10):
+            x.extend([i, 'a'])
+            y.extend(np.array([[i, i+1]]))
+            run()
+        publisher_x.close()
+        publisher_y.close()
+        assert finished.wait(10)
+        subscriber.close()
+        assert received['x'] == [v for i in range(10) for v in [i, 'a']]
+        assert [list(row) for row in received['y']] == \
+          [[i, i+1] for i in range(10)]
+
+    def test_reconnect(self):
+        # The connection is closed repeatedly while data is sent.
+        # No segment is lost or duplicated.
+        received = []
+        subscriber = SocketSubscriber(
+            lambda stream_name, segment: received.extend(segment))
+        subscriber.start()
+        publisher = SocketPublisher('x', port=subscriber.port)
+        for i in range(200):
+            publisher.publish_list([i])
+            if i % 50 == 25:
+                subscriber.loop.call_soon_threadsafe(
+                    subscriber.close_connections)
+                time.sleep(0.01)
+        publisher.close()
+        subscriber.close()
+        assert received == list(range(200))
+        assert publisher.num_connections > 1
+
+    def test_flow_control(self):
+        # A slow subscriber limits the data that is not acknowledged.
+        received = []
+        def callback(stream_name, segment):
+            time.sleep(0.002)
+            received.append(segment)
+        subscriber = SocketSubscriber(callback)
+        subscriber.start()
+        segment = np.arange(1000, dtype=np.float64)
+        frame_size = len(encode_segment(segment)) + 13
+        publisher = SocketPublisher('x', port=subscriber.port,
+                                    window=3*frame_size)
+        for i in range(30):
+            publisher.publish_list(segment)
+            assert publisher.num_unacked_bytes <= 3*frame_size
+        publisher.close()
+        subscriber.close()
+        assert len(received) == 30
+
+    def test_no_subscriber(self):
+        # The publisher raises an exception if its data is not
+        # acknowledged.
+        subscriber = SocketSubscriber(lambda stream_name, segment: None)
+        subscriber.start()
+        port = subscriber.port
+        subscriber.close()
+        publisher = SocketPublisher('x', port=port, window=10,
+                                    max_wait_time=0.2)
+        publisher.publish_list([1])
+        with self.assertRaises(RuntimeError):
+            publisher.publish_list([2])
+        with self.assertRaises(RuntimeError):
+            publisher.close()
+
+if __name__ == '__main__':
+    unittest.main()
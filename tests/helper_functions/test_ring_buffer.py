@@ -0,0 +1,71 @@
+import unittest
+import numpy as np
+
+from IoTPy.helper_functions.ring_buffer import RingBuffer
+from IoTPy.helper_functions.Buffer import Buffer
+from IoTPy.helper_functions.incremental_buffer import incremental_buffer
+from IoTPy.agent_types.timed_array import timed_dtype
+
+class test_ring_buffer(unittest.TestCase):
+
+    def test_extend_and_view(self):
+        b = RingBuffer(5)
+        b.extend(np.arange(3))
+        assert np.array_equal(b.view(), [0, 1, 2])
+        # Extend past the end of the array many times; the view is
+        # always the most recent max_size elements in order.
+        expected = list(range(3))
+        for i in range(3, 100, 4):
+            b.extend(np.arange(i, i+4))
+            expected.extend(range(i, i+4))
+            assert np.array_equal(b.view(), expected[-5:])
+        b.append(1000)
+        assert np.array_equal(b.view(), expected[-4:] + [1000])
+        # An extension longer than max_size keeps its last elements.
+        b.extend(np.arange(12))
+        assert np.array_equal(b.view(), [7, 8, 9, 10, 11])
+        # The view is not a copy.
+        assert np.shares_memory(b.view(), b.data)
+
+    def test_rows(self):
+        b = RingBuffer(3, dtype=float, shape=(2,))
+        for i in range(10):
+            b.append([i, -i])
+        assert np.array_equal(b.view(), [[7, -7], [8, -8], [9, -9]])
+        assert np.array_equal(b.get_up_to_time(8), [[7, -7], [8, -8]])
+        assert np.array_equal(b.view(), [[9, -9]])
+
+    def test_time_bounded_reads(self):
+        b = RingBuffer(100, dtype=timed_dtype())
+        a = np.zeros(10, dtype=timed_dtype())
+        a['time'] = np.arange(0, 20, 2)
+        a['value'] = np.arange(10)
+        b.extend(a)
+        assert len(b.read_up_to_time(7)) == 4
+        assert len(b) == 10
+        assert list(b.get_up_to_time(7)['value']) == [0, 1, 2, 3]
+        assert len(b) == 6
+        assert len(b.get_up_to_time(100)) == 6
+        assert len(b) == 0
+
+    def test_buffer(self):
+        b = Buffer(3)
+        b.extend([[1, 'a'], [2, 'b']])
+        b.append([5, 'c'])
+        b.append([7, 'd'])
+        assert b.read_all() == [[2, 'b'], [5, 'c'], [7, 'd']]
+        assert b.get_up_to_time(5) == [[2, 'b'], [5, 'c']]
+        assert b.get_earliest() == [7, 'd']
+        assert b.get_earliest() is None
+        assert b.get_all() == []
+
+    def test_incremental_buffer(self):
+        z = incremental_buffer(4)
+        for i in range(5):
+            z.extend(np.array([[i, i], [i, -i]]))
+        assert z.num_samples == 4
+        assert z.num_features == 2
+        assert np.array_equal(z.value, [[3, 3], [3, -3], [4, 4], [4, -4]])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -301,6 +301,28 @@ class test_stream(unittest.TestCase):
         t.extend(np.array([2.0, 3.0]))
         np.array_equal(t.recent[:t.stop], np.array([1.0, 2.0, 3.0]))
 
+        # A list is converted to the dtype of a StreamArray only if
+        # the conversion is within the same kind.
+        w = StreamArray('w', dtype='i')
+        w.extend([1, 2])
+        assert np.array_equal(w.recent[:w.stop], np.array([1, 2]))
+        assert w.recent.dtype == np.dtype('i')
+        t.extend([4, 5])
+        assert np.array_equal(t.recent[:t.stop], np.array([1.0, 2.0, 3.0, 4.0, 5.0]))
+        with self.assertRaises(AssertionError):
+            w.extend([1.5])
+
+    def test_stream_array_with_dimension_shifts_recent(self):
+        # The rows of a StreamArray with a positive dimension are
+        # shifted to the start of recent when recent is full.
+        v = StreamArray('v', dimension=3, dtype=float, num_in_memory=8)
+        data = np.arange(60.0).reshape(20, 3)
+        for i in range(0, 20, 4):
+            v.extend(data[i:i+4])
+        assert v.offset > 0
+        assert np.array_equal(v.recent[:v.stop], data[v.offset:])
+        assert not np.any(v.recent[v.stop:])
+
 
 if __name__ == '__main__':
     unittest.main()